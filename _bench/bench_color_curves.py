@@ -0,0 +1,37 @@
+"""
+color_curves and color_regions, which go through _color_object
+"""
+
+import numpy as np
+import pytest
+
+import pychips
+from chips_contrib.lut.color_curves import color_curves, color_regions
+
+
+NOBJECTS = [ 10, 100, 1000 ]
+
+
+@pytest.mark.parametrize( "ncurves", NOBJECTS )
+def bench_color_curves( bench, luts, ncurves, ncolors ):
+    xx = np.arange( 10 )
+
+    def setup():
+        pychips._reset()
+        for ii in range( ncurves ):
+            pychips.add_curve( xx, xx+ii )
+        return (), {}
+
+    bench( lambda: color_curves( luts.path( ncolors ), skip=1 ), setup=setup )
+
+
+@pytest.mark.parametrize( "nregions", NOBJECTS )
+def bench_color_regions( bench, luts, nregions ):
+    def setup():
+        pychips._reset()
+        pychips.add_curve( [1], [1] )
+        for ii in range( nregions ):
+            pychips.add_region( 4, ii, ii, 1 )
+        return (), {}
+
+    bench( lambda: color_regions( luts.path( 256 )), setup=setup )
@@ -0,0 +1,304 @@
+"""
+BoxWhiskerPlot: filling the grid (_fill_grid), plot, and colorize,
+and checks of the statistics and the plot
+"""
+
+import numpy as np
+import pytest
+
+import pychips
+from chips_contrib.lut.lutbox_whisker import BoxWhiskerPlot
+
+
+def _data( npoints, seed=1 ):
+    rng = np.random.RandomState( seed )
+    xx = rng.normal( 50, 10, size=npoints )
+    return xx, rng.poisson( np.abs(xx) ).astype( float )
+
+
+NBINS = [ 10, 100, 1000 ]
+
+
+@pytest.mark.parametrize( "nbin", NBINS )
+def bench_create( bench, npoints, nbin ):
+    """
+    The constructor sorts the data by X and fills the grid
+    """
+    xx, yy = _data( npoints )
+    bench( lambda: BoxWhiskerPlot( xx, yy, nbin=nbin ))
+
+
+@pytest.mark.parametrize( "nbin", NBINS )
+def bench_fill_grid( bench, npoints, nbin ):
+    """
+    A new grid reuses the X sort
+    """
+    xx, yy = _data( npoints )
+    bw = BoxWhiskerPlot( xx, yy, nbin=7 )
+    bench( lambda: bw.set_grid( nbin=nbin ))
+
+
+@pytest.mark.parametrize( "nbin", NBINS )
+@pytest.mark.parametrize( "options", [ "default", "whis", "notch" ] )
+def bench_plot( bench, npoints, nbin, options ):
+    xx, yy = _data( npoints )
+    kwargs = { "default" : {}, "whis" : { "whis" : 1.5 }, "notch" : { "notch" : True, "n_boot" : 100, "seed" : 1 } }[options]
+
+    def setup():
+        pychips._reset()
+        return ( BoxWhiskerPlot( xx, yy, nbin=nbin ), ), {}
+
+    bench( lambda bw: bw.plot( **kwargs ), setup=setup )
+
+
+@pytest.mark.parametrize( "nbin", NBINS )
+def bench_colorize( bench, luts, nbin, ncolors ):
+    xx, yy = _data( 10**5 )
+
+    def setup():
+        pychips._reset()
+        bw = BoxWhiskerPlot( xx, yy, nbin=nbin )
+        bw.plot()
+        return ( bw, ), {}
+
+    bench( lambda bw: bw.colorize( luts.path( ncolors )), setup=setup )
+
+
+#
+# Checks that the statistics and the plot are the same as the
+# original one-mask-per-bin code, for fixed inputs.
+#
+
+CHECK_POINTS = 20000
+
+
+def _reference_stats( xx, yy, grid, qlo, qhi ):
+    """
+    count, min, max, median, mean, std, and the qlo, qhi quantiles of
+    each grid bin (lo <= x < hi), one bin at a time as
+    BoxWhiskerPlot.plot did before it was vectorized.
+    """
+    rows = []
+    for xlo, xhi in grid:
+        y0 = np.sort( yy[ (xx >= xlo) & (xx < xhi) ] )
+        sz = y0.size
+        if 0 == sz:
+            rows.append( [0] + [np.nan]*7 )
+            continue
+        rows.append( [ sz, y0[0], y0[-1], np.median(y0), np.mean(y0), np.std(y0),
+                       y0[ max( int(qlo*sz+0.5), 0 ) ], y0[ min( int(qhi*sz+0.5), sz-1 ) ] ] )
+    return np.array( rows )
+
+
+def _stats_table( stats ):
+    return np.column_stack( [ stats[f] for f in [ "count", "min", "max", "median", "mean", "std" ] ] + [ stats["quantiles"] ] )
+
+
+def _check_stats( bw, xx, yy, qlo=0.25, qhi=0.75 ):
+    want = _reference_stats( xx, yy, bw.grid, qlo, qhi )
+    got = _stats_table( bw._get_stats( qlo, qhi ))
+    np.testing.assert_array_equal( got[:,[0,1,2,3,6,7]], want[:,[0,1,2,3,6,7]] )
+    np.testing.assert_allclose( got[:,[4,5]], want[:,[4,5]], rtol=1e-10, atol=1e-12 )
+
+
+def _overlapping_grid( xx ):
+    lo, hi = np.min(xx), np.max(xx)
+    edges = np.linspace( lo, hi, 9 )
+    return [ ( edges[ii], edges[min(ii+2, 8)] ) for ii in range(8) ] + [ ( lo-1.0, lo+1.0 ), ( hi+1.0, hi+2.0 ) ]
+
+
+@pytest.mark.parametrize( "mode", [ "equal_width", "equal_count", "overlapping" ] )
+@pytest.mark.parametrize( "workers", [ 0, 2 ] )
+def check_statistics( mode, workers ):
+    xx, yy = _data( CHECK_POINTS )
+    if "overlapping" == mode:
+        bw = BoxWhiskerPlot( xx, yy, grid=_overlapping_grid( xx ), workers=workers )
+    else:
+        bw = BoxWhiskerPlot( xx, yy, nbin=25, mode=mode, workers=workers )
+    _check_stats( bw, xx, yy )
+    _check_stats( bw, xx, yy, qlo=0.1, qhi=0.9 )
+
+
+def check_whiskers():
+    """
+    Tukey whiskers go to the last values within whis*IQR of the box
+    and the values beyond are drawn as fliers
+    """
+    xx, yy = _data( CHECK_POINTS )
+    bw = BoxWhiskerPlot( xx, yy, nbin=25 )
+    bw.plot( whis=1.5 )
+
+    lines = []
+    fliers = []
+    for (xlo, xhi), row in zip( bw.grid, _reference_stats( xx, yy, bw.grid, 0.25, 0.75 )):
+        y0 = yy[ (xx >= xlo) & (xx < xhi) ]
+        if 0 == y0.size:
+            continue
+        iqr = row[7] - row[6]
+        inside = ( y0 >= row[6] - 1.5*iqr ) & ( y0 <= row[7] + 1.5*iqr )
+        xmid = (xhi+xlo)/2.0
+        lines.append( ( xmid, np.min( y0[inside] ), xmid, np.max( y0[inside] )))
+        fliers += [ ( xmid, y ) for y in y0[~inside] ]
+
+    drawn = _drawn_objects()
+    assert drawn["Line"] == sorted( lines )
+    assert sorted( zip( *drawn["Curve"][0][:2] ) if drawn["Curve"] else [] ) == sorted( fliers )
+
+
+def _drawn_objects():
+    """
+    The data of every drawn region, line, point, and curve, sorted,
+    so plots made in different ways can be compared.
+    """
+    retval = {}
+    for kind in [ "Region", "Line", "Point", "Curve" ]:
+        retval[kind] = sorted( tuple( tuple( np.atleast_1d(a).tolist() ) if np.ndim(a) else float(a) for a in obj["args"] )
+                               for oid, obj in pychips._drawn( kind ))
+    return retval
+
+
+@pytest.mark.parametrize( "regrid", [ "nbin", "shared" ] )
+@pytest.mark.parametrize( "kwargs", [ {}, { "whis" : 1.5, "sdev" : True } ] )
+def check_regrid( regrid, kwargs ):
+    """
+    Changing the grid of a plot only redraws the bins that changed,
+    which must give the same plot as drawing the new grid from scratch
+    """
+    xx, yy = _data( CHECK_POINTS )
+    edges = np.linspace( np.min(xx), np.max(xx)+1e-6, 21 )
+    first = [ ( edges[ii], edges[ii+1] ) for ii in range(20) ]
+    if "nbin" == regrid:
+        second = dict( nbin=15 )
+    else:
+        # keep every other bin and merge the rest in pairs
+        second = dict( grid=first[:10] + [ ( edges[ii], edges[ii+2] ) for ii in range(10, 20, 2) ] )
+
+    bw = BoxWhiskerPlot( xx, yy, grid=first )
+    bw.plot( **kwargs )
+    bw.set_grid( **second )
+    regridded = _drawn_objects()
+
+    pychips._reset()
+    fresh = BoxWhiskerPlot( xx, yy, **second )
+    fresh.plot( **kwargs )
+    assert regridded == _drawn_objects()
+
+
+@pytest.mark.parametrize( "regrid", [ False, True ] )
+def check_colorize( luts, regrid ):
+    """
+    The regions of each bin get color floor(N*(count-min)/(max-min)),
+    the last color for the max, also after the grid changes
+    """
+    xx, yy = _data( CHECK_POINTS )
+    bw = BoxWhiskerPlot( xx, yy, nbin=40 )
+    bw.plot()
+    bw.colorize( luts.path( 16 ))
+    if regrid:
+        bw.set_grid( nbin=25 )
+
+    counts = _reference_stats( xx, yy, bw.grid, 0.25, 0.75 )[:,0]
+    cmin = np.min( counts[counts > 0] )
+    cmax = np.max( counts )
+    contents = dict( pychips._drawn( "Region" ))
+    for g, nn in zip( bw.grid, counts ):
+        if 0 == nn:
+            continue
+        ii = min( int( np.floor( 16 * (nn-cmin)/(cmax-cmin) )), 15 )
+        for rr in bw._bin_objects[g]['region']:
+            colors = [ a for a in contents[rr]["attrs"] if isinstance( a, str ) and a.startswith( "*.color=" ) ]
+            assert colors[-1] == "*.color={}".format( bw.hex_codes[ii] )
+
+
+def _chunks( xx, yy, rows ):
+    return ( ( xx[lo:lo+rows], yy[lo:lo+rows] ) for lo in range( 0, len(xx), rows ))
+
+
+def _plot_without_data( source ):
+    """
+    The same 5 bins made from chunks or from a summary
+    """
+    xx, yy = _data( CHECK_POINTS )
+    bw = BoxWhiskerPlot( xx, yy, nbin=5 )
+    if "chunks" == source:
+        return BoxWhiskerPlot.from_chunks( _chunks( xx, yy, 3000 ), grid=bw.grid, seed=1 )
+    st = bw._get_stats( 0.25, 0.75 )
+    return BoxWhiskerPlot.from_summary( bw.grid, st['quantiles'][:,0], st['median'], st['quantiles'][:,1],
+                                        st['min'], st['max'], mean=st['mean'], std=st['std'], count=st['count'] )
+
+
+@pytest.mark.parametrize( "source", [ "chunks", "summary" ] )
+@pytest.mark.parametrize( "kwargs", [ { "notch" : True }, { "whis" : 1.5 } ] )
+def check_plot_needs_data( source, kwargs ):
+    """
+    Notches and whis are refused without the raw data before
+    anything is changed: the plot, the options, and the undo blocks
+    stay as they were
+    """
+    import _fakecalls
+
+    bw = _plot_without_data( source )
+    bw.plot()
+    before = _drawn_objects()
+    options = ( bw.notch, bw.whis )
+
+    _fakecalls.reset()
+    with pytest.raises( RuntimeError ):
+        bw.plot( **kwargs )
+    calls = _fakecalls.snapshot()
+    assert calls.get( "pychips.open_undo_block", 0 ) == calls.get( "pychips.close_undo_block", 0 )
+    assert _drawn_objects() == before and 10 == len( before["Region"] )
+    assert ( bw.notch, bw.whis ) == options
+
+
+@pytest.mark.parametrize( "k", [ 50, 200 ] )
+def check_from_chunks( k ):
+    """
+    The count, min, max, mean, and std of chunked data are exact and
+    the sketch quantiles are within a few 1/k in rank of the exact
+    ones
+    """
+    rng = np.random.RandomState( 3 )
+    xx = rng.uniform( 0, 100, size=10*CHECK_POINTS )
+    yy = rng.normal( xx/10.0, 2.0 )
+    exact = BoxWhiskerPlot( xx, yy, nbin=8 )
+    bw = BoxWhiskerPlot.from_chunks( _chunks( xx, yy, 7000 ), grid=exact.grid, k=k, seed=2 )
+
+    want = _stats_table( exact._get_stats( 0.1, 0.9 ))
+    got = _stats_table( bw._get_stats( 0.1, 0.9 ))
+    np.testing.assert_array_equal( got[:,:3], want[:,:3] )
+    np.testing.assert_allclose( got[:,[4,5]], want[:,[4,5]], rtol=1e-9 )
+
+    for (xlo, xhi), row in zip( exact.grid, got ):
+        y0 = np.sort( yy[ (xx >= xlo) & (xx < xhi) ] )
+        for qq, val in zip( [ 0.5, 0.1, 0.9 ], row[[3,6,7]] ):
+            lo = np.searchsorted( y0, val, side="left" ) / float( y0.size )
+            hi = np.searchsorted( y0, val, side="right" ) / float( y0.size )
+            assert max( lo - qq, qq - hi, 0 ) <= 3.0/k
+
+
+@pytest.mark.parametrize( "mode", [ "equal_count", "log", "bayesian_blocks" ] )
+@pytest.mark.parametrize( "degenerate", [ False, True ] )
+def check_grid_modes( mode, degenerate ):
+    """
+    The automatic grids do not overlap, put every value in one bin
+    (also when all X are equal), and plot
+    """
+    npoints = 2000 if "bayesian_blocks" == mode else CHECK_POINTS
+    xx, yy = _data( npoints )
+    xx = np.full( npoints, 3.0 ) if degenerate else np.abs(xx) + 1
+    bw = BoxWhiskerPlot( xx, yy, nbin=20, mode=mode )
+
+    grid = np.array( bw.grid )
+    assert grid.shape[0] >= 1
+    assert np.all( grid[1:,0] >= grid[:-1,1] )
+    want = _reference_stats( xx, yy, bw.grid, 0.25, 0.75 )
+    assert np.sum( want[:,0] ) == npoints
+    _check_stats( bw, xx, yy )
+    if "equal_count" == mode and not degenerate:
+        assert np.max( want[:,0] ) - np.min( want[:,0] ) <= 2
+    if degenerate and "log" != mode:
+        assert 1 == len( bw.grid )
+
+    bw.plot()
+    assert len( pychips._drawn( "Line" )) == np.count_nonzero( want[:,0] )
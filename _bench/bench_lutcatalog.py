@@ -0,0 +1,100 @@
+"""
+Checks of the LUT catalog queries (find_luts, similar, duplicates)
+against one table at a time loops
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from chips_contrib.lut.lutcatalog import build_catalog, find_luts, similar_luts, duplicate_luts
+
+
+@pytest.fixture
+def catalog( luts, tmp_path ):
+    """
+    A catalog of 8 picker tables, the 16 color table, an exact copy
+    of the first table, and a copy of the second with the colors
+    moved slightly
+    """
+    top = str( tmp_path )
+    files = luts.picker_luts( 8 ) + [ luts.path( 16 ) ]
+    for ff in files:
+        shutil.copy( ff, top )
+    shutil.copy( files[0], os.path.join( top, "zcopy.lut" ))
+    rgb = np.loadtxt( files[1] )
+    np.savetxt( os.path.join( top, "znear.lut" ), np.clip( rgb + 0.002, 0, 1 ), fmt="%.6f" )
+
+    filename = os.path.join( top, "catalog.npz" )
+    return build_catalog( top, filename ), filename
+
+
+def _distance( cat, ii, jj ):
+    return np.mean( [ np.sqrt( np.sum( ( cat.lab[ii][ss] - cat.lab[jj][ss] )**2 )) for ss in range( cat.lab.shape[1] ) ] )
+
+
+def check_find_luts( catalog ):
+    cat, filename = catalog
+    delta_e = np.median( cat.metrics['delta_e'] )
+    want = [ n for n, row in zip( cat.names, cat.metrics ) if row['delta_e'] >= delta_e and row['l_range'] <= 90 ]
+    want.sort( key=lambda n: -cat.metrics[ cat.index(n) ]['l_range'] )
+    assert want
+    assert cat.find_luts( min_delta_e=delta_e, max_l_range=90, sort_by="-l_range" ) == want
+    assert find_luts( filename, min_delta_e=delta_e, max_l_range=90, sort_by="-l_range" ) == want
+
+    mono = cat.find_luts( monotonic=True )
+    assert mono == [ n for n, row in zip( cat.names, cat.metrics ) if row['monotonic'] ]
+    with pytest.raises( ValueError ):
+        cat.find_luts( min_nothing=1 )
+
+
+@pytest.mark.parametrize( "k", [ 1, 3, 100 ] )
+def check_similar( catalog, k ):
+    """
+    The k nearest tables by mean dE, closest first; a table in the
+    catalog is nearest to itself
+    """
+    cat, filename = catalog
+    query = cat.index( [ n for n in cat.names if n.endswith( "map002.lut" ) ][0] )
+    dist = [ _distance( cat, ii, query ) for ii in range( len(cat) ) ]
+    order = sorted( range( len(cat) ), key=lambda ii: dist[ii] )[:k]
+
+    got = cat.similar( cat.names[query], k=k )
+    assert [ n for n, d in got ] == [ cat.names[ii] for ii in order ]
+    np.testing.assert_allclose( [ d for n, d in got ], [ dist[ii] for ii in order ], atol=1e-6 )
+    assert got[0] == ( cat.names[query], pytest.approx( 0, abs=1e-6 ))
+    assert [ n for n, d in similar_luts( cat.names[query], k=k, catalog=filename ) ] == [ n for n, d in got ]
+
+
+@pytest.mark.parametrize( "k", [ 0, -2 ] )
+def check_similar_bad_k( catalog, k ):
+    cat, filename = catalog
+    with pytest.raises( ValueError ):
+        cat.similar( cat.names[0], k=k )
+
+
+@pytest.mark.parametrize( "tol", [ None, 1.0 ] )
+def check_duplicates( catalog, tol ):
+    """
+    Identical files are always grouped, and with tol the tables
+    within tol mean dE of each other
+    """
+    cat, filename = catalog
+    groups = {}
+    for ii in range( len(cat) ):
+        groups[ii] = set( [ii] )
+    for ii in range( len(cat) ):
+        for jj in range( ii+1, len(cat) ):
+            if cat.hashes[ii] == cat.hashes[jj] or ( tol is not None and _distance( cat, ii, jj ) < tol ):
+                merged = groups[ii] | groups[jj]
+                for mm in merged:
+                    groups[mm] = merged
+    want = set( frozenset( cat.names[ii] for ii in gg ) for gg in groups.values() if len(gg) > 1 )
+
+    got = set( frozenset( gg ) for gg in cat.duplicates( tol=tol ))
+    assert got == want
+    assert any( any( n.endswith( "zcopy.lut" ) for n in gg ) for gg in got )
+    assert ( tol is not None ) == any( any( n.endswith( "znear.lut" ) for n in gg ) for gg in got )
+    assert set( frozenset( gg ) for gg in duplicate_luts( filename, tol=tol )) == got
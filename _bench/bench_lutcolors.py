@@ -0,0 +1,14 @@
+"""
+lut_colors, building color lookup tables from named colors
+"""
+
+import pytest
+
+from chips_contrib.lut.lutcolors import lut_colors
+
+
+@pytest.mark.parametrize( "colorsys", [ "rgb", "hsv", "hls" ] )
+@pytest.mark.parametrize( "ncolors", [ 16, 256, 1024, 4096 ] )
+def bench_lut_colors( bench, luts, ncolors, colorsys ):
+    names = [ "black", "slateblue", "red", "orange", "yellow", "white" ]
+    bench( lambda: lut_colors( names, num_colors=ncolors, colorsys=colorsys ))
@@ -0,0 +1,105 @@
+"""
+Checks of apply_lut and colorize_image against colors worked out by
+hand and a PNG decoded with zlib
+"""
+
+import zlib
+import struct
+
+import numpy as np
+import pytest
+
+from chips_contrib.lut.lutmap import apply_lut, colorize_image
+
+
+# 4 colors and the bad color
+TABLE = np.array( [ [0,0,0], [80,0,0], [160,0,0], [240,0,0], [1,2,3] ], dtype=np.uint8 )
+
+
+def check_apply_lut():
+    """
+    color = floor( 4 * (v-vmin)/(vmax-vmin) ), clipped to the table,
+    with the bad color for NaN and infinities
+    """
+    values = np.array( [ 0, 0.5, 2.5, 4.99, 5, 9.99, 10, -1, 11, np.nan, np.inf ] )
+    want = [ 0, 0, 1, 1, 2, 3, 3, 0, 3, 4, 4 ]
+    np.testing.assert_array_equal( apply_lut( values, TABLE, vmin=0, vmax=10 ), TABLE[want] )
+
+    # the range defaults to that of the finite values
+    np.testing.assert_array_equal( apply_lut( values[:7], TABLE ), TABLE[ want[:7] ] )
+
+    out = np.zeros( values.shape+(3,), dtype=np.uint8 )
+    assert apply_lut( values, TABLE, vmin=0, vmax=10, out=out ) is out
+    np.testing.assert_array_equal( out, TABLE[want] )
+
+
+def check_apply_lut_log():
+    values = np.array( [ 1, 3, 5, 10, 31, 100, 1000, 0, -5 ] )
+    want = [ 0, 0, 1, 2, 2, 3, 3, 4, 4 ]   # floor( 4*log10(v)/2 ), bad for v <= 0
+    np.testing.assert_array_equal( apply_lut( values, TABLE, vmin=1, vmax=100, scale="log" ), TABLE[want] )
+
+
+def check_apply_lut_equal_range():
+    """
+    With vmin == vmax every good value gets the middle color
+    """
+    values = np.array( [ 1, 2, 3, np.nan ] )
+    np.testing.assert_array_equal( apply_lut( values, TABLE, vmin=2, vmax=2 ), TABLE[[2,2,2,4]] )
+    np.testing.assert_array_equal( apply_lut( np.full( 5, 7.0 ), TABLE ), TABLE[[2]*5] )
+
+
+def check_apply_lut_bad_range( tmp_path ):
+    with pytest.raises( ValueError ):
+        apply_lut( np.arange(10.), TABLE, vmin=5, vmax=1 )
+    with pytest.raises( ValueError ):
+        colorize_image( np.ones( (4,4) ), str( tmp_path / "bad.npy" ), TABLE, vmin=5, vmax=1 )
+
+
+def _read_png( filename ):
+    """
+    Decode an 8 bit RGB or RGBA PNG that uses only the Up filter
+    """
+    with open( filename, "rb" ) as fp:
+        data = fp.read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    idat = []
+    while pos < len(data):
+        size, = struct.unpack( ">I", data[pos:pos+4] )
+        tag = data[pos+4:pos+8]
+        body = data[pos+8:pos+8+size]
+        crc, = struct.unpack( ">I", data[pos+8+size:pos+12+size] )
+        assert crc == zlib.crc32( body, zlib.crc32(tag) ) & 0xffffffff
+        if b"IHDR" == tag:
+            nx, ny, depth, ctype = struct.unpack( ">IIBB", body[:10] )
+        elif b"IDAT" == tag:
+            idat.append( body )
+        pos += 12 + size
+
+    nchan = 4 if 6 == ctype else 3
+    assert 8 == depth
+    rows = np.frombuffer( zlib.decompress( b"".join( idat )), dtype=np.uint8 ).reshape( ny, 1+nx*nchan )
+    assert np.all( 2 == rows[:,0] )
+    pixels = np.cumsum( rows[:,1:], axis=0, dtype=np.uint64 ) % 256
+    return pixels.astype( np.uint8 ).reshape( ny, nx, nchan )
+
+
+@pytest.mark.parametrize( "scale", [ "linear", "log", "histeq" ] )
+@pytest.mark.parametrize( "workers", [ None, 3 ] )
+def check_colorize_png( tmp_path, luts, scale, workers ):
+    """
+    A PNG written a few rows at a time decodes to the apply_lut
+    colors of the whole image
+    """
+    rng = np.random.RandomState( 5 )
+    img = rng.lognormal( size=(61, 47) )
+    img[ 3, 5 ] = np.nan
+    filename = str( tmp_path / "img.png" )
+
+    vmin, vmax = colorize_image( img, filename, luts.path( 256 ), scale=scale, alpha=True,
+                                 block_rows=7, workers=workers )
+    want = apply_lut( img, luts.path( 256 ), scale=scale, alpha=True )
+    if scale != "histeq":
+        np.testing.assert_array_equal( apply_lut( img, luts.path( 256 ), vmin=vmin, vmax=vmax, scale=scale, alpha=True ), want )
+    np.testing.assert_array_equal( _read_png( filename ), want )
+    assert 0 == _read_png( filename )[ 3, 5, 3 ]
@@ -0,0 +1,220 @@
+"""
+LUTPlot.plot, LUTPlot.update_data, and LUTPlot2D.plot, and checks of
+the curves and colors they draw
+"""
+
+import numpy as np
+import pytest
+
+import pychips
+from chips_contrib.lut.lutplot import LUTPlot, LUTPlot2D
+from chips_contrib.lut.lutcolors import white_to_color
+
+
+def _data( npoints, seed=1 ):
+    rng = np.random.RandomState( seed )
+    return rng.rand( npoints ), rng.rand( npoints ), rng.lognormal( size=npoints )
+
+
+@pytest.mark.parametrize( "scale", [ "linear", "log", "histeq" ] )
+def bench_plot( bench, luts, npoints, ncolors, scale ):
+    xx, yy, zz = _data( npoints )
+
+    def setup():
+        pychips._reset()
+        return ( LUTPlot( luts.path( ncolors )), ), {}
+
+    bench( lambda lut: lut.plot( xx, yy, zz, scale=scale ), setup=setup )
+
+
+def bench_plot_sizes( bench, luts, npoints ):
+    xx, yy, zz = _data( npoints )
+    sizes = 1 + np.random.RandomState(2).rand( npoints ) * 8
+
+    def setup():
+        pychips._reset()
+        return ( LUTPlot( luts.path( 256 )), ), {}
+
+    bench( lambda lut: lut.plot( xx, yy, zz, sizes=sizes ), setup=setup )
+
+
+def bench_update_data( bench, luts, npoints, ncolors ):
+    xx, yy, zz = _data( npoints )
+    x1, y1, z1 = _data( npoints, seed=3 )
+
+    def setup():
+        pychips._reset()
+        lut = LUTPlot( luts.path( ncolors ))
+        lut.plot( xx, yy, zz )
+        return ( lut, ), {}
+
+    bench( lambda lut: lut.update_data( x1, y1, z1 ), setup=setup )
+
+
+@pytest.mark.parametrize( "side", [ 4, 16, 64 ] )
+def bench_plot2d( bench, npoints, side ):
+    xx, yy, z1 = _data( npoints )
+    z2 = np.random.RandomState(4).rand( npoints )
+    ramps = ( white_to_color( "red", num_colors=side ), white_to_color( "blue", num_colors=side ))
+
+    def setup():
+        pychips._reset()
+        return ( LUTPlot2D( *ramps ), ), {}
+
+    bench( lambda lut: lut.plot( xx, yy, z1, z2, scale=("log", "linear") ), setup=setup )
+
+
+#
+# Checks that the plots have the same curves and colors as the
+# original one-mask-per-bin code, for fixed inputs.
+#
+
+CHECK_POINTS = 20000
+
+
+def _reference_bins( zz, ncolors, scale, zmin=None, zmax=None ):
+    """
+    The color bin of each value (-1 if none), with one mask per bin
+    as LUTPlot.plot did before it was vectorized: ncolors bins of
+    equal width in z or log10(z) starting at the min, the last one
+    open ended, or for histeq bins that start at the data values of
+    rank i*(N-1)/ncolors.  The edges are compared in z.
+    """
+    if "histeq" == scale:
+        vals = np.sort( zz )
+        kth = np.round( np.linspace( 0, 1, ncolors+1 ) * (vals.size-1) ).astype(int)
+        tlo = vals[kth[:-1]]
+        thi = np.append( vals[kth[1:-1]], np.inf )
+        tt = zz
+    else:
+        lo = np.min(zz) if zmin is None else zmin
+        hi = np.max(zz) if zmax is None else zmax
+        if "log" == scale:
+            dt = ( np.log10(hi) - np.log10(lo) )/(ncolors-1)
+            tlo = 10**( np.log10(lo) + dt*np.arange( ncolors ))
+            tlo[0] = lo
+        else:
+            dt = float( hi - lo )/(ncolors-1)
+            tlo = lo + dt*np.arange( ncolors )
+        thi = np.append( tlo[1:], np.inf )
+        tt = zz
+
+    bins = np.full( zz.size, -1 )
+    for ii in range( ncolors ):
+        jj, = np.where( (tt >= tlo[ii]) & (tt < thi[ii]) )
+        bins[jj] = ii
+    return bins
+
+
+def _file_colors( luts, ncolors ):
+    from chips_contrib.lut._utils import get_rgb_hexcodes
+    rgb = np.loadtxt( luts.path( ncolors ))
+    return get_rgb_hexcodes( rgb[:,0], rgb[:,1], rgb[:,2] )
+
+
+def _plotted( lut, npoints ):
+    """
+    The color bin of each point (the x values are the point numbers)
+    and the curves in the order they are drawn, from the fake chips.
+    """
+    curve_bin = dict( (c, ii) for ii, cc in enumerate( lut.curves ) for c in cc )
+    bins = np.full( npoints, -1 )
+    count = np.zeros( npoints, dtype=int )
+    curves = []
+    for oid, obj in pychips._drawn( "Curve" ):
+        if oid not in curve_bin:
+            continue
+        idx = np.asarray( obj["args"][0] ).astype(int)
+        bins[idx] = curve_bin[oid]
+        count[idx] += 1
+        curves.append( ( oid, curve_bin[oid], obj["attrs"][0] ))
+    assert np.all( count <= 1 ), "points in more than one curve"
+    return bins, curves
+
+
+def _check_plot( lut, zz, ncolors, scale, luts, zmin=None, zmax=None ):
+    bins, curves = _plotted( lut, zz.size )
+    np.testing.assert_array_equal( bins, _reference_bins( zz, ncolors, scale, zmin, zmax ))
+    codes = _file_colors( luts, ncolors )
+    for oid, ii, cc in curves:
+        assert cc.symbol.color == codes[ii] and cc.line.color == codes[ii]
+    drawn = [ ii for oid, ii, cc in curves ]
+    assert drawn == sorted( drawn ), "curves are not drawn in color order"
+
+
+def _check_data( npoints, seed=1 ):
+    xx, yy, zz = _data( npoints, seed=seed )
+    return np.arange( npoints, dtype=float ), yy, zz
+
+
+@pytest.mark.parametrize( "ncolors", [ 16, 256 ] )
+@pytest.mark.parametrize( "scale", [ "linear", "log", "histeq" ] )
+def check_plot( luts, ncolors, scale ):
+    xx, yy, zz = _check_data( CHECK_POINTS )
+    lut = LUTPlot( luts.path( ncolors ))
+    lut.plot( xx, yy, zz, scale=scale )
+    _check_plot( lut, zz, ncolors, scale, luts )
+
+
+def check_plot_sizes( luts ):
+    xx, yy, zz = _check_data( CHECK_POINTS )
+    sizes = 1 + np.random.RandomState(2).rand( CHECK_POINTS ) * 8
+    lut = LUTPlot( luts.path( 16 ))
+    lut.plot( xx, yy, zz, sizes=sizes )
+    _check_plot( lut, zz, 16, "linear", luts )
+
+    # Per-point sizes are rounded into classes, one curve per (bin, size)
+    bins = _reference_bins( zz, 16, "linear" )
+    for oid, ii, cc in _plotted( lut, zz.size )[1]:
+        idx = np.asarray( dict( pychips._drawn("Curve") )[oid]["args"][0] ).astype(int)
+        assert np.all( np.maximum( np.rint( sizes[idx] ), 1 ) == cc.symbol.size )
+    classes = set( zip( bins, np.maximum( np.rint( sizes ), 1 )))
+    assert len( pychips._drawn("Curve") ) == len( classes )
+
+
+def check_plot_sizefn( luts ):
+    """
+    sizefn and thickfn values are used as they are, one per bin
+    """
+    xx, yy, zz = _check_data( CHECK_POINTS )
+    lut = LUTPlot( luts.path( 16 ))
+    lut.plot( xx, yy, zz, sizefn=lambda i: 0.4+i, thickfn=lambda i: 1.25 )
+    _check_plot( lut, zz, 16, "linear", luts )
+    for oid, ii, cc in _plotted( lut, zz.size )[1]:
+        assert cc.symbol.size == 0.4+ii and cc.line.thickness == 1.25
+
+
+@pytest.mark.parametrize( "shuffled", [ False, True ] )
+def check_update_data( luts, shuffled ):
+    """
+    After update_data the curves hold the new points in the old bins
+    and are still drawn in color order (reversed after shuffle)
+    """
+    xx, yy, zz = _check_data( CHECK_POINTS )
+    lut = LUTPlot( luts.path( 256 ))
+    lut.plot( xx[:50], yy[:50], zz[:50] )
+    if shuffled:
+        lut.shuffle()
+    lut.update_data( xx, yy, zz )
+
+    bins, curves = _plotted( lut, zz.size )
+    np.testing.assert_array_equal( bins, _reference_bins( zz, 256, "linear", lut.min_z, lut.max_z ))
+    drawn = [ ii for oid, ii, cc in curves ]
+    assert drawn == sorted( drawn, reverse=shuffled )
+
+
+@pytest.mark.parametrize( "side", [ 4, 16 ] )
+def check_plot2d( side ):
+    xx, yy, z1 = _check_data( CHECK_POINTS )
+    z2 = np.random.RandomState(4).rand( CHECK_POINTS )
+    ramps = ( white_to_color( "red", num_colors=side ), white_to_color( "blue", num_colors=side ))
+    lut = LUTPlot2D( *ramps )
+    lut.plot( xx, yy, z1, z2, scale=("log", "linear") )
+
+    b1 = _reference_bins( z1, side, "log" )
+    b2 = _reference_bins( z2, side, "linear" )
+    cells = np.where( (b1 >= 0) & (b2 >= 0), b2*side + b1, -1 )
+    bins, curves = _plotted( lut, CHECK_POINTS )
+    np.testing.assert_array_equal( bins, cells )
+    for oid, ii, cc in curves:
+        assert cc.symbol.color == lut.hex_codes[ii]
@@ -0,0 +1,95 @@
+"""
+LUT_Picker._add_images and _add_montage, with and without the
+swatch cache, and checks of the colors they show
+"""
+
+import numpy as np
+import pytest
+
+import pychips
+from chips_contrib.lut.pick_lut import LUT_Picker
+
+
+def _picker( luts, nluts, cache, montage, files=None ):
+    """
+    A picker whose window is ready for the color maps to be added
+    (the first nluts picker tables unless files are given)
+    """
+    pychips._reset()
+    if "cold" == cache:
+        luts.clear_cache()
+    pp = LUT_Picker.__new__( LUT_Picker )
+    pp.cmaps = luts.picker_luts( nluts ) if files is None else list( files )
+    pp.montage = montage
+    pp.page_size = len( pp.cmaps )
+    pp.page = 0
+    pp._pending = {}
+    pp._build_list_of_cmaps( pp.cmaps )
+    pp.lut = pp.all_lut
+    if montage:
+        pp._create_window()
+    else:
+        pp._create_window_and_grid()
+    return pp
+
+
+@pytest.mark.parametrize( "cache", [ "cold", "warm" ] )
+def bench_add_images( bench, luts, nluts, cache ):
+    _picker( luts, nluts, "cold", False )._add_images()     # fill the cache
+    setup = lambda: ( ( _picker( luts, nluts, cache, False ), ), {} )
+    bench( lambda pp: pp._add_images(), setup=setup )
+
+
+@pytest.mark.parametrize( "cache", [ "cold", "warm" ] )
+def bench_add_montage( bench, luts, nluts, cache ):
+    _picker( luts, nluts, "cold", True )._add_montage()
+    setup = lambda: ( ( _picker( luts, nluts, cache, True ), ), {} )
+    bench( lambda pp: pp._add_montage(), setup=setup )
+
+
+#
+# Checks that the swatches show the colors in the files, for tables
+# of different lengths.
+#
+
+def _check_files( luts ):
+    return luts.picker_luts( 5 ) + [ luts.path( nn ) for nn in [ 16, 4096 ] ]
+
+
+@pytest.mark.parametrize( "cache", [ "cold", "warm" ] )
+def check_add_images( luts, cache ):
+    """
+    Each image is drawn with the full table from its file
+    """
+    files = _check_files( luts )
+    _picker( luts, 0, "cold", False, files )._add_images()
+    pp = _picker( luts, 0, cache, False, files )
+    pp._add_images()
+
+    images = pychips._drawn( "Image" )
+    assert len( images ) == len( files )
+    for ( oid, obj ), fname in zip( images, pp.lut ):
+        np.testing.assert_array_equal( np.column_stack( obj["cmap"] ), np.loadtxt( fname ))
+
+
+@pytest.mark.parametrize( "cache", [ "cold", "warm" ] )
+def check_add_montage( luts, cache ):
+    """
+    Each swatch column i shows color floor(i*N/width) of its table
+    """
+    files = _check_files( luts )
+    _picker( luts, 0, "cold", True, files )._add_montage()
+    pp = _picker( luts, 0, cache, True, files )
+    pp._add_montage()
+
+    ( oid, obj ), = pychips._drawn( "Image" )
+    img = np.dstack( obj["args"][:3] )
+    width, height = pp.swatch_width, pp.swatch_height
+    for ii, fname in enumerate( pp.lut ):
+        table = np.loadtxt( fname )
+        row, col = divmod( ii, pp.nx )
+        y0 = (pp.ny-1-row)*(height+pp.swatch_gap) + pp.swatch_gap
+        x0 = col*(width+pp.swatch_gap) + pp.swatch_gap
+        want = table[ np.floor( np.arange( width ) * len(table) / float(width) ).astype(int) ]
+        swatch = img[y0:y0+height, x0:x0+width]
+        np.testing.assert_array_equal( swatch, np.broadcast_to( want, swatch.shape ))
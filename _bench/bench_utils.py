@@ -0,0 +1,32 @@
+"""
+Finding and loading color lookup tables: _try_hard_to_locate and
+get_rgb_values
+"""
+
+import os
+
+import pytest
+
+from chips_contrib.lut._utils import _try_hard_to_locate, get_rgb_values
+
+
+@pytest.mark.parametrize( "where", [ "path", "ciao", "ds9", "missing" ] )
+def bench_try_hard_to_locate( bench, luts, where ):
+    """
+    A full path is found at once, a CIAO name after one failed
+    read, and a ds9 name after trying every directory
+    """
+    name = { "path" : luts.path( 256 ), "ciao" : "lut256", "ds9" : "ds9map3", "missing" : "nosuchmap" }[where]
+
+    def locate():
+        try:
+            return _try_hard_to_locate( name )
+        except IOError:
+            return None
+
+    bench( locate )
+
+
+def bench_get_rgb_values( bench, luts, ncolors ):
+    path = luts.path( ncolors )
+    bench( lambda: get_rgb_values( path, reverse=True, invert=True ))
@@ -0,0 +1,262 @@
+"""
+Benchmarks for the hot paths of chips_contrib.lut that run without
+CIAO.
+
+The fakes/ directory has stand-ins for pychips, pycrates, and
+paramio that keep just enough state for the package to run, count
+every call, and can add a simulated latency to each call.  This
+tree is imported as chips_contrib.lut, so the benchmarks measure
+the working copy.
+
+Run from this directory (needs pytest-benchmark)
+
+    pytest                                  # up to 10^6 points
+    pytest --max-points=1e7                 # the full range
+    pytest -k lutplot --chips-latency=0.0002
+
+Timings are compared with pytest-benchmark's stored runs
+
+    pytest --benchmark-autosave
+    pytest --benchmark-compare --benchmark-compare-fail=median:20%
+
+The number of calls each benchmark makes to the fakes does not
+depend on the machine, so it is checked against baselines.json on
+every run: a benchmark fails if it makes more calls of any kind
+than its baseline (every chips call is a round trip to the chips
+server).  After an intended change, update the file with
+
+    pytest --update-baselines
+
+The check_* functions are not timed: for fixed inputs they compare
+what the fakes recorded (curve members, colors, box and whisker
+ends, swatches) with the output of the original one-bin-at-a-time
+code, so a faster path that changes the plot fails the run.
+
+"""
+
+import os
+import gc
+import sys
+import json
+import types
+import shutil
+
+import numpy as np
+import pytest
+
+HERE = os.path.dirname( os.path.abspath( __file__ ))
+ROOT = os.path.dirname( HERE )
+BASELINES = os.path.join( HERE, "baselines.json" )
+
+POINTS = [ 10**3, 10**4, 10**5, 10**6, 10**7 ]
+COLORS = [ 16, 256, 4096 ]
+PICKER_LUTS = [ 16, 64, 256 ]
+
+
+def _alias_package():
+    """
+    Import the working copy as chips_contrib.lut, with the fakes
+    ahead of any real pychips, pycrates, and paramio.
+    """
+    import importlib.util
+
+    sys.path.insert( 0, os.path.join( HERE, "fakes" ))
+    if "chips_contrib.lut" in sys.modules:
+        return
+
+    parent = types.ModuleType( "chips_contrib" )
+    parent.__path__ = []
+    sys.modules["chips_contrib"] = parent
+
+    spec = importlib.util.spec_from_file_location( "chips_contrib.lut",
+        os.path.join( ROOT, "__init__.py" ), submodule_search_locations=[ROOT] )
+    module = importlib.util.module_from_spec( spec )
+    sys.modules["chips_contrib.lut"] = module
+    spec.loader.exec_module( module )
+    parent.lut = module
+
+_alias_package()
+
+import _fakecalls
+import pychips
+import paramio
+
+
+def pytest_addoption( parser ):
+    group = parser.getgroup( "chips_contrib.lut benchmarks" )
+    group.addoption( "--max-points", type=float, default=1e6,
+        help="largest number of data points to benchmark (default 1e6)" )
+    group.addoption( "--chips-latency", type=float, default=0.0,
+        help="simulated seconds per pychips call" )
+    group.addoption( "--crates-latency", type=float, default=0.0,
+        help="simulated seconds per pycrates and paramio call" )
+    group.addoption( "--update-baselines", action="store_true", default=False,
+        help="save the call counts as the new baselines" )
+
+
+def pytest_generate_tests( metafunc ):
+    """
+    Common data sizes: npoints (skipping those above --max-points),
+    ncolors, and nluts, unless the benchmark sets its own.
+    """
+    explicit = set()
+    for mark in metafunc.definition.iter_markers( "parametrize" ):
+        names = mark.args[0]
+        explicit.update( n.strip() for n in ( names.split(",") if isinstance( names, str ) else names ))
+
+    top = metafunc.config.getoption( "max_points" )
+    for name, values in [ ( "npoints", [ n for n in POINTS if n <= top ] ),
+                          ( "ncolors", COLORS ), ( "nluts", PICKER_LUTS ) ]:
+        if name in metafunc.fixturenames and name not in explicit:
+            metafunc.parametrize( name, values )
+
+
+def write_lut( filename, ncolors, seed=0 ):
+    """
+    A random (but smooth) ASCII color lookup table
+    """
+    rng = np.random.RandomState( seed )
+    xx = np.linspace( 0, 1, ncolors )
+    rgb = [ np.clip( np.interp( xx, np.linspace( 0, 1, 6 ), rng.rand(6) ), 0, 1 ) for ii in range(3) ]
+    np.savetxt( filename, np.column_stack( rgb ), fmt="%.6f" )
+    return filename
+
+
+_colors = { "black" : "0 0 0", "white" : "1 1 1", "red" : "1 0 0", "green" : "0 1 0",
+            "blue" : "0 0 1", "yellow" : "1 1 0", "cyan" : "0 1 1", "magenta" : "1 0 1",
+            "orange" : "1 0.647 0", "pink" : "1 0.753 0.796", "cadetblue" : "0.373 0.620 0.627",
+            "slateblue" : "0.416 0.353 0.804", "darkgreen" : "0 0.392 0" }
+
+
+class LUTFiles( object ):
+    """
+    The color lookup tables made for the benchmarks
+    """
+    def __init__( self, top ):
+        self.top = top
+        self.data = os.path.join( top, "ciao", "data" )
+        self.contrib = os.path.join( top, "ciao", "contrib", "data" )
+        self.home = os.path.join( top, "home" )
+        self.cache = os.path.join( top, "cache" )
+        self.picker = os.path.join( top, "picker" )
+        for dd in [ self.data, self.contrib, self.home, self.cache, self.picker ]:
+            os.makedirs( dd )
+
+        for nn in COLORS:
+            write_lut( self.path(nn), nn, seed=nn )
+        for ii in range( max(PICKER_LUTS) ):
+            write_lut( os.path.join( self.picker, "map{:03d}.lut".format(ii) ), 256, seed=ii )
+
+        # ds9 keeps its tables in ~/.ds9/LUT/<set>/, the last place searched
+        for ii in range(4):
+            ds9 = os.path.join( self.home, ".ds9", "LUT", "set{}".format(ii) )
+            os.makedirs( ds9 )
+            write_lut( os.path.join( ds9, "ds9map{}.lut".format(ii) ), 256, seed=100+ii )
+
+    def path( self, ncolors ):
+        return os.path.join( self.data, "lut{}.lut".format( ncolors ))
+
+    def picker_luts( self, nluts ):
+        return sorted( os.path.join( self.picker, f ) for f in os.listdir( self.picker ))[:nluts]
+
+    def clear_cache( self ):
+        shutil.rmtree( self.cache )
+        os.makedirs( self.cache )
+
+
+@pytest.fixture( scope="session" )
+def luts( tmp_path_factory ):
+    top = str( tmp_path_factory.mktemp( "lut_bench" ))
+    files = LUTFiles( top )
+
+    env = { "ASCDS_INSTALL" : os.path.join( top, "ciao" ),
+            "ASCDS_CONTRIB" : os.path.join( top, "ciao", "contrib" ),
+            "HOME" : files.home,
+            "CHIPS_LUT_CACHE" : files.cache }
+    old = dict( (k, os.environ.get(k)) for k in env )
+    os.environ.update( env )
+
+    parfile = os.path.join( top, "lut.par" )
+    with open( parfile, "w" ) as fp:
+        fp.write( "fake\n" )
+    paramio._set_par( "colors.par", _colors )
+    paramio._set_par( "lut.par", dict( (os.path.basename(f)[:-4], f) for f in files.picker_luts(16) ), path=parfile )
+
+    yield files
+
+    for k, v in old.items():
+        if v is None:
+            os.environ.pop( k, None )
+        else:
+            os.environ[k] = v
+
+
+@pytest.fixture( autouse=True )
+def fake_chips( request, luts ):
+    """
+    Every benchmark starts without any chips windows
+    """
+    pychips._reset()
+    _fakecalls.set_latency( "pychips", request.config.getoption( "chips_latency" ))
+    _fakecalls.set_latency( "pycrates", request.config.getoption( "crates_latency" ))
+    _fakecalls.set_latency( "paramio", request.config.getoption( "crates_latency" ))
+    yield
+    pychips._reset()
+
+
+def _load_baselines():
+    if not os.path.exists( BASELINES ):
+        return {}
+    with open( BASELINES ) as fp:
+        return json.load( fp )
+
+
+_new_baselines = {}
+
+
+def pytest_sessionfinish( session, exitstatus ):
+    if session.config.getoption( "update_baselines", False ) and _new_baselines:
+        baselines = _load_baselines()
+        baselines.update( _new_baselines )
+        with open( BASELINES, "w" ) as fp:
+            json.dump( baselines, fp, indent=1, sort_keys=True )
+            fp.write( "\n" )
+
+
+@pytest.fixture
+def bench( request, benchmark ):
+    """
+    bench( target, setup=None, rounds=5 )
+
+    Runs setup and target once to count the calls to the fakes,
+    which are checked against the baseline and saved with the
+    benchmark, then times target.  setup returns the arguments for
+    target, as (args, kwargs) like benchmark.pedantic; without a
+    setup target takes no arguments and is timed by benchmark().
+    """
+    key = "{}::{}".format( request.node.module.__name__, request.node.name )
+
+    def run( target, setup=None, rounds=5 ):
+        args, kwargs = setup() if setup else ((), {})
+        gc.collect()
+        _fakecalls.reset()
+        retval = target( *args, **kwargs )
+        counts = _fakecalls.snapshot()
+        benchmark.extra_info["calls"] = counts
+
+        if request.config.getoption( "update_baselines" ):
+            _new_baselines[key] = counts
+        else:
+            base = _load_baselines().get( key )
+            if base is not None:
+                more = [ "{} {} -> {}".format( k, base.get(k, 0), v ) for k, v in sorted( counts.items() ) if v > base.get(k, 0) ]
+                if more:
+                    pytest.fail( "More calls than the baseline: " + ", ".join( more ))
+
+        if setup:
+            benchmark.pedantic( target, setup=setup, rounds=rounds )
+        else:
+            benchmark( target )
+        return retval
+
+    return run
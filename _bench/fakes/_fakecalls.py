@@ -0,0 +1,62 @@
+"""
+Call counting and simulated latency shared by the fake pychips,
+pycrates, and paramio modules.
+
+Each call to a fake function is counted under "module.function".  A
+per-module latency (seconds per call) can be set to mimic the round
+trip to the chips server or to disk:
+
+>>> import _fakecalls
+>>> _fakecalls.set_latency( "pychips", 0.0005 )
+>>> _fakecalls.reset()
+>>> ...
+>>> _fakecalls.calls["pychips.set_curve"]
+
+"""
+
+import time
+import functools
+from collections import Counter
+
+calls = Counter()
+latency = {}
+
+
+def reset():
+    """
+    Clear the call counts
+    """
+    calls.clear()
+
+
+def set_latency( module, seconds ):
+    """
+    Sleep this many seconds in every call to the module
+    """
+    latency[module] = float(seconds)
+
+
+def snapshot():
+    """
+    The call counts as a plain dictionary
+    """
+    return dict( calls )
+
+
+def counted( module ):
+    """
+    Decorator that counts the calls to a fake function and sleeps
+    for the module's latency.
+    """
+    def wrap( func ):
+        name = "{}.{}".format( module, func.__name__ )
+
+        @functools.wraps( func )
+        def wrapper( *args, **kwargs ):
+            calls[name] += 1
+            delay = latency.get( module )
+            if delay:
+                time.sleep( delay )
+            return func( *args, **kwargs )
+        return wrapper
+    return wrap
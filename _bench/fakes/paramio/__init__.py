@@ -0,0 +1,56 @@
+"""
+A stand-in for paramio used by the benchmarks.
+
+Parameter files are plain dictionaries registered with _set_par; a
+file name can be given so paccess finds it (the LUT pickers cache
+on its modification time).  Names may be given with or without the
+.par suffix, as with paramio.
+
+Every call is counted in _fakecalls.calls as "paramio.<name>" and
+waits for the simulated latency, if one is set.
+"""
+
+from _fakecalls import counted
+
+_call = counted( "paramio" )
+
+_pars = {}
+_paths = {}
+
+
+def _key( parfile ):
+    return parfile[:-4] if parfile.endswith( ".par" ) else parfile
+
+
+def _set_par( parfile, values, path=None ):
+    """
+    Register a parameter file: a dictionary of name to value
+    """
+    _pars[ _key(parfile) ] = dict( values )
+    if path:
+        _paths[ _key(parfile) ] = path
+
+
+def _get( parfile ):
+    try:
+        return _pars[ _key(parfile) ]
+    except KeyError:
+        raise IOError( "parameter file {} not found".format(parfile) )
+
+
+@_call
+def pget( parfile, name ):
+    pars = _get( parfile )
+    if name not in pars:
+        raise ValueError( "parameter {} not found in {}".format( name, parfile ))
+    return pars[name]
+
+
+@_call
+def plist( parfile ):
+    return list( _get( parfile ) ) + [ "mode" ]
+
+
+@_call
+def paccess( parfile ):
+    return _paths.get( _key(parfile) )
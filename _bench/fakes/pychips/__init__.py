@@ -0,0 +1,563 @@
+"""
+A stand-in for pychips used by the benchmarks.
+
+It keeps just enough state for the package to run without a chips
+server: windows, frames, and plots, and the objects in each plot.
+Ids are assigned the way chips does (explicit id=, stem=name#, or
+crv1, reg2, ...), creating a duplicate id or changing or deleting
+an object that does not exist raises a RuntimeError, and info() and
+info_current() list the objects.  Nothing is drawn, but the data
+and attributes of each object, the colormap of each image, and the
+drawing order (shuffle_curve) are kept so the checks can compare
+what would be drawn; see _drawn.
+
+Every call is counted in _fakecalls.calls as "pychips.<name>" and
+waits for the simulated latency, if one is set.
+"""
+
+import re
+import itertools
+
+from _fakecalls import counted
+
+_call = counted( "pychips" )
+
+
+chips_usercmap1 = "usercmap1"
+chips_usercmap2 = "usercmap2"
+chips_usercmap3 = "usercmap3"
+chips_back = "back"
+chips_front = "front"
+X_AXIS = "ax1"
+Y_AXIS = "ay1"
+XY_AXIS = "all"
+FRAME_NORM = "frame_norm"
+PLOT_NORM = "plot_norm"
+DATA = "data"
+
+
+class _Attributes( object ):
+    """
+    An attribute container like ChipsCurve: nested attributes
+    (eg symbol.color) are created when they are used.
+    """
+    def __getattr__( self, name ):
+        if name.startswith( "__" ):
+            raise AttributeError( name )
+        value = _Attributes()
+        object.__setattr__( self, name, value )
+        return value
+
+
+class ChipsCurve( _Attributes ): pass
+class ChipsHistogram( _Attributes ): pass
+class ChipsRegion( _Attributes ): pass
+class ChipsLine( _Attributes ): pass
+class ChipsPoint( _Attributes ): pass
+class ChipsLabel( _Attributes ): pass
+class ChipsImage( _Attributes ): pass
+class ChipsPlot( _Attributes ): pass
+class ChipsId( _Attributes ): pass
+
+
+# Default id stems, as used by chips
+_stems = { "Window" : "win", "Frame" : "frm", "Plot" : "plot",
+           "Curve" : "crv", "Histogram" : "hist", "Region" : "reg",
+           "Line" : "line", "Point" : "pnt", "Label" : "lbl",
+           "Image" : "img", "Colorbar" : "cbar" }
+
+_kinds = [ "Curve", "Histogram", "Region", "Line", "Point", "Label", "Image", "Colorbar" ]
+
+
+class _State( object ):
+    def __init__( self ):
+        self.windows = {}      # win -> { frame -> { plot -> plot info } }
+        self.objects = {}      # id -> (kind, win, frame, plot)
+        self.current = {}      # Window, Frame, Plot -> id
+        self.counters = {}
+        self.contents = {}     # id -> { "args", "attrs", "cmap" }
+        self.cmaps = {}        # usercmap1, ... -> (r, g, b)
+        self.prefs = { "plot.leftmargin" : "0.15", "plot.rightmargin" : "0.1",
+                       "plot.topmargin" : "0.1", "plot.bottommargin" : "0.15" }
+
+_state = _State()
+
+
+def _reset():
+    """
+    Forget all the windows (used between benchmarks).  Names keep
+    counting up, as in a chips session, so an object left over from
+    before (eg a LUT_Picker deleting its window when it is garbage
+    collected) cannot remove a new one.
+    """
+    global _state
+    old = _state
+    _state = _State()
+    _state.prefs = old.prefs
+    _state.counters = old.counters
+
+
+def _next_name( stem ):
+    cc = _state.counters.setdefault( stem, itertools.count(1) )
+    return "{}{}".format( stem, next(cc) )
+
+
+def _attr_id( attrs ):
+    """
+    The id (or None) and stem (or None) set in the attributes
+    """
+    if attrs is None:
+        return None, None
+    if isinstance( attrs, str ):
+        mid = re.search( r"\bid=(\S+)", attrs )
+        mstem = re.search( r"\bstem=(\S+)", attrs )
+        return ( mid.group(1) if mid else None, mstem.group(1) if mstem else None )
+    if isinstance( attrs, dict ):
+        return attrs.get( "id" ), attrs.get( "stem" )
+    if isinstance( attrs, (list, tuple) ):
+        attrs = list(attrs)
+        get = lambda k: attrs[attrs.index(k)+1] if k in attrs[:-1] else None
+        return get("id"), get("stem")
+    return attrs.__dict__.get( "id" ), attrs.__dict__.get( "stem" )
+
+
+def _is_attrs( value ):
+    if isinstance( value, (dict, _Attributes) ):
+        return True
+    if isinstance( value, str ):
+        return "=" in value
+    if isinstance( value, (list, tuple) ):
+        return len(value) > 0 and all( isinstance( v, str ) for v in value )
+    return False
+
+
+def _new_id( kind, attrs, taken=None ):
+    """
+    The id for a new object.  Frames and plots only need to be
+    unique within their parent (so each frame has a plot1); other
+    objects are unique across all plots.
+    """
+    if taken is None:
+        taken = _state.objects
+    newid, stem = _attr_id( attrs )
+    if newid is None:
+        stem = stem.rstrip("#") if stem else _stems[kind]
+        if kind in _stems and stem == _stems[kind] and kind in ( "Frame", "Plot" ):
+            nn = len(taken) + 1
+            while "{}{}".format( stem, nn ) in taken:
+                nn += 1
+            return "{}{}".format( stem, nn )
+        newid = _next_name( stem )
+        while newid in taken:
+            newid = _next_name( stem )
+    elif newid in taken:
+        raise RuntimeError( "An object with id '{}' already exists".format(newid) )
+    return newid
+
+
+def _plots():
+    return _state.windows[ _state.current["Window"] ][ _state.current["Frame"] ]
+
+
+def _add_window( attrs=None ):
+    win = _new_id( "Window", attrs, _state.windows )
+    _state.windows[win] = {}
+    _state.current = { "Window" : win }
+    return win
+
+
+def _add_frame( attrs=None ):
+    if "Window" not in _state.current:
+        _add_window()
+    frm = _new_id( "Frame", attrs, _state.windows[ _state.current["Window"] ] )
+    _state.windows[ _state.current["Window"] ][frm] = {}
+    _state.current["Frame"] = frm
+    _state.current.pop( "Plot", None )
+    return frm
+
+
+def _add_plot( box, attrs=None ):
+    if "Frame" not in _state.current:
+        _add_frame()
+    plt = _new_id( "Plot", attrs, _plots() )
+    x0, y0, x1, y1 = box
+    _plots()[plt] = { "box" : (x0, y0, x1, y1), "objects" : {}, "current" : {} }
+    _state.current["Plot"] = plt
+    return plt
+
+
+def _current_plot():
+    """
+    The current plot, created (with its window and frame) if needed
+    """
+    if "Plot" not in _state.current:
+        p = _state.prefs
+        _add_plot( ( float(p["plot.leftmargin"]), float(p["plot.bottommargin"]),
+            1-float(p["plot.rightmargin"]), 1-float(p["plot.topmargin"]) ))
+    return _plots()[ _state.current["Plot"] ]
+
+
+def _add_object( kind, args ):
+    attrs = args[-1] if args and _is_attrs( args[-1] ) else None
+    plot = _current_plot()
+    newid = _new_id( kind, attrs )
+    plot["objects"][newid] = kind
+    plot["current"][kind] = newid
+    _state.objects[newid] = ( kind, _state.current["Window"], _state.current["Frame"], _state.current["Plot"] )
+    _state.contents[newid] = { "args" : args[:-1] if attrs is not None else args,
+                               "attrs" : [] if attrs is None else [attrs], "cmap" : None }
+    if "Image" == kind:
+        cmap = re.search( r"\bcolormap=(\S+)", attrs if isinstance( attrs, str ) else "" )
+        _state.contents[newid]["cmap"] = _state.cmaps.get( cmap.group(1) if cmap else "usercmap1" )
+    return newid
+
+
+def _drawn( kind ):
+    """
+    The (id, contents) of the objects of a kind, in the order they
+    are drawn (bottom first), for the checks.  contents has the 
+    data ("args"), the attributes given when the object was made and
+    each later set_* call ("attrs"), and for images the colormap 
+    ("cmap").
+    """
+    retval = []
+    for frames in _state.windows.values():
+        for plots in frames.values():
+            for plot in plots.values():
+                retval += [ ( o, _state.contents[o] ) for o, k in plot["objects"].items() if k == kind ]
+    return retval
+
+
+def _check_object( kind, oid ):
+    if oid is None or "all" == oid:
+        return
+    if not isinstance( oid, str ):
+        return
+    if oid not in _state.objects or _state.objects[oid][0] != kind:
+        raise RuntimeError( "{} '{}' does not exist".format( kind, oid ))
+
+
+def _delete_object( kind, oid=None ):
+    if oid is None:
+        oid = _current_plot()["current"].get( kind )
+        if oid is None:
+            raise RuntimeError( "There is no current {}".format(kind.lower()) )
+    if "all" == oid:
+        ids = [ o for o, v in _state.objects.items() if v[0] == kind ]
+    else:
+        _check_object( kind, oid )
+        ids = [ oid ]
+    for oo in ids:
+        _, win, frm, plt = _state.objects.pop( oo )
+        _state.contents.pop( oo, None )
+        plot = _state.windows[win][frm][plt]
+        del plot["objects"][oo]
+        if plot["current"].get( kind ) == oo:
+            left = [ o for o, k in plot["objects"].items() if k == kind ]
+            plot["current"][kind] = left[-1] if left else None
+
+
+def _adder( kind ):
+    def add( *args ):
+        _add_object( kind, args )
+    add.__name__ = "add_{}".format( kind.lower() )
+    return _call( add )
+
+
+def _deleter( kind ):
+    def delete( oid=None ):
+        _delete_object( kind, oid )
+    delete.__name__ = "delete_{}".format( kind.lower() )
+    return _call( delete )
+
+
+def _setter( kind ):
+    def setter( *args ):
+        if len(args) > 1:
+            _check_object( kind, args[0] )
+            if args[0] in _state.contents:
+                _state.contents[ args[0] ]["attrs"].append( args[1] )
+    setter.__name__ = "set_{}".format( kind.lower() )
+    return _call( setter )
+
+
+def _noop( name ):
+    def noop( *args, **kwargs ):
+        pass
+    noop.__name__ = name
+    return _call( noop )
+
+
+add_curve = _adder( "Curve" )
+add_histogram = _adder( "Histogram" )
+add_region = _adder( "Region" )
+add_line = _adder( "Line" )
+add_hline = _adder( "Line" )
+add_vline = _adder( "Line" )
+add_point = _adder( "Point" )
+add_label = _adder( "Label" )
+add_image = _adder( "Image" )
+add_colorbar = _adder( "Colorbar" )
+
+delete_curve = _deleter( "Curve" )
+delete_histogram = _deleter( "Histogram" )
+delete_region = _deleter( "Region" )
+delete_line = _deleter( "Line" )
+delete_point = _deleter( "Point" )
+delete_label = _deleter( "Label" )
+delete_image = _deleter( "Image" )
+delete_colorbar = _deleter( "Colorbar" )
+
+set_curve = _setter( "Curve" )
+set_histogram = _setter( "Histogram" )
+set_region = _setter( "Region" )
+set_line = _setter( "Line" )
+set_point = _setter( "Point" )
+set_label = _setter( "Label" )
+set_image = _setter( "Image" )
+set_colorbar = _setter( "Colorbar" )
+hide_image = _setter( "Image" )
+
+
+@_call
+def shuffle_curve( oid, where ):
+    """
+    Move a curve to the front (drawn last) or back of its plot
+    """
+    _check_object( "Curve", oid )
+    _, win, frm, plt = _state.objects[oid]
+    objects = _state.windows[win][frm][plt]["objects"]
+    kind = objects.pop( oid )
+    if chips_back == where:
+        rest = list( objects.items() )
+        objects.clear()
+        objects[oid] = kind
+        objects.update( rest )
+    else:
+        objects[oid] = kind
+
+
+@_call
+def load_colormap( *args ):
+    """
+    load_colormap( r, g, b [, cmap] ) or load_colormap( filename [, cmap] )
+    """
+    if len(args) >= 3:
+        _state.cmaps[ args[3] if len(args) > 3 else "usercmap1" ] = tuple( args[:3] )
+    else:
+        _state.cmaps[ args[1] if len(args) > 1 else "usercmap1" ] = args[0]
+
+
+for _name in [ "limits", "set_window", "set_frame", "set_plot", "set_axis",
+               "set_label_text", "set_data_aspect_ratio", "adjust_grid_gaps", "hide_axis",
+               "hide_minor_ticks", "hide_major_ticks", "hide_frame", "set_plot_xlabel",
+               "set_plot_ylabel", "move_plot", "undo", "redo", "show_gui", "print_window" ]:
+    globals()[_name] = _noop( _name )
+
+
+@_call
+def add_window( *args ):
+    _add_window( args[-1] if args and _is_attrs( args[-1] ) else None )
+
+
+@_call
+def add_frame( *args ):
+    _add_frame( args[-1] if args and _is_attrs( args[-1] ) else None )
+
+
+@_call
+def add_plot( *args ):
+    attrs = args[-1] if args and _is_attrs( args[-1] ) else None
+    box = args[:4] if len(args) >= 4 else (0.15, 0.15, 0.9, 0.9)
+    _add_plot( box, attrs )
+
+
+@_call
+def split( ny, nx=1, *args ):
+    """
+    Replace the plots in the current frame with an ny by nx grid,
+    filled across then down
+    """
+    if "Frame" not in _state.current:
+        _add_frame()
+    plots = _plots()
+    for name in list( plots ):
+        for oid in plots[name]["objects"]:
+            _state.objects.pop( oid, None )
+        del plots[name]
+    for ii in range( ny*nx ):
+        row, col = divmod( ii, nx )
+        _add_plot( ( col/float(nx)+0.01, 1-(row+1)/float(ny)+0.01, (col+1)/float(nx)-0.01, 1-row/float(ny)-0.01 ))
+    _state.current["Plot"] = "plot1"
+
+
+def _deleter_container( kind ):
+    def delete( name=None ):
+        name = name or _state.current.get( kind )
+        if "Window" == kind:
+            if name not in _state.windows:
+                raise RuntimeError( "Window '{}' does not exist".format(name) )
+            del _state.windows[name]
+            removed = lambda v: v[1] == name
+        elif "Frame" == kind:
+            frames = _state.windows[ _state.current["Window"] ]
+            if name not in frames:
+                raise RuntimeError( "Frame '{}' does not exist".format(name) )
+            del frames[name]
+            removed = lambda v: v[2] == name
+        else:
+            plots = _plots()
+            if name not in plots:
+                raise RuntimeError( "Plot '{}' does not exist".format(name) )
+            del plots[name]
+            removed = lambda v: v[3] == name
+        for oid in [ o for o, v in _state.objects.items() if removed(v) ]:
+            del _state.objects[oid]
+        if _state.current.get( kind ) == name:
+            _set_default_current()
+    delete.__name__ = "delete_{}".format( kind.lower() )
+    return _call( delete )
+
+
+def _set_default_current():
+    _state.current = {}
+    for win, frames in _state.windows.items():
+        _state.current["Window"] = win
+        for frm, plots in frames.items():
+            _state.current["Frame"] = frm
+            for plt in plots:
+                _state.current["Plot"] = plt
+
+
+delete_window = _deleter_container( "Window" )
+delete_frame = _deleter_container( "Frame" )
+delete_plot = _deleter_container( "Plot" )
+
+
+@_call
+def clear():
+    _state.windows.clear()
+    _state.objects.clear()
+    _state.current = {}
+
+
+@_call
+def set_current_window( name ):
+    if name not in _state.windows:
+        raise RuntimeError( "Window '{}' does not exist".format(name) )
+    _state.current = { "Window" : name }
+    frames = _state.windows[name]
+    if frames:
+        set_current_frame.__wrapped__( list(frames)[-1] )
+
+
+@_call
+def set_current_frame( name ):
+    frames = _state.windows[ _state.current["Window"] ]
+    if name not in frames:
+        raise RuntimeError( "Frame '{}' does not exist".format(name) )
+    _state.current["Frame"] = name
+    _state.current.pop( "Plot", None )
+    if frames[name]:
+        _state.current["Plot"] = list( frames[name] )[-1]
+
+
+@_call
+def set_current_plot( name ):
+    if name not in _plots():
+        raise RuntimeError( "Plot '{}' does not exist".format(name) )
+    _state.current["Plot"] = name
+
+
+@_call
+def get_axis_range( axis=None ):
+    return [ 0.0, 1.0 ]
+
+
+@_call
+def get_preference( name ):
+    return _state.prefs.get( name, "" )
+
+
+@_call
+def set_preference( name, value ):
+    _state.prefs[name] = value
+
+
+@_call
+def get_plot( name=None ):
+    plot = _plots()[ name or _state.current["Plot"] ]
+    x0, y0, x1, y1 = plot["box"]
+    pp = ChipsPlot()
+    pp.leftmargin = x0
+    pp.bottommargin = y0
+    pp.rightmargin = 1-x1
+    pp.topmargin = 1-y1
+    return pp
+
+
+def _getter( kind, cls ):
+    def get( oid=None ):
+        _check_object( kind, oid )
+        obj = cls()
+        obj.id = oid
+        if "Region" == kind:
+            obj.opacity = 1.0
+        return obj
+    get.__name__ = "get_{}".format( kind.lower() )
+    return _call( get )
+
+
+get_curve = _getter( "Curve", ChipsCurve )
+get_region = _getter( "Region", ChipsRegion )
+get_line = _getter( "Line", ChipsLine )
+get_point = _getter( "Point", ChipsPoint )
+get_image = _getter( "Image", ChipsImage )
+
+
+@_call
+def get_pick( *args ):
+    x0, y0, x1, y1 = _current_plot()["box"]
+    return [ [ (x0+x1)/2.0 ], [ (y0+y1)/2.0 ] ]
+
+
+def _plot_lines( win, frm, plt, only_current=False ):
+    plot = _state.windows[win][frm][plt]
+    x0, y0, x1, y1 = plot["box"]
+    lines = [ "    Plot [{}]   ({:.2f},{:.2f}) .. ({:.2f},{:.2f})".format( plt, x0, y0, x1, y1 ) ]
+    if plot["objects"]:
+        lines += [ "      X Axis [ax1]", "      Y Axis [ay1]" ]
+    if only_current:
+        objs = [ (k, plot["current"][k]) for k in _kinds if plot["current"].get(k) ]
+    else:
+        objs = [ (k, o) for o, k in plot["objects"].items() ]
+    lines += [ "      {} [{}]".format( kind, oid ) for kind, oid in objs ]
+    return lines
+
+
+@_call
+def info():
+    lines = []
+    for win, frames in _state.windows.items():
+        lines.append( "Window [{}]".format(win) )
+        for frm, plots in frames.items():
+            lines.append( "  Frame [{}]".format(frm) )
+            for plt in plots:
+                lines += _plot_lines( win, frm, plt )
+    return "\n".join( lines ) + "\n"
+
+
+@_call
+def info_current():
+    cur = _state.current
+    if "Window" not in cur:
+        return ""
+    lines = [ "Window [{}]".format( cur["Window"] ) ]
+    if "Frame" in cur:
+        lines.append( "  Frame [{}]".format( cur["Frame"] ))
+        if "Plot" in cur:
+            lines += _plot_lines( cur["Window"], cur["Frame"], cur["Plot"], only_current=True )
+    return "\n".join( lines ) + "\n"
+
+
+__all__ = [ n for n in dir() if not n.startswith("_") and n not in ( "re", "itertools", "counted" ) ]
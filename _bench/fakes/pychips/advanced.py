@@ -0,0 +1,25 @@
+"""
+The pychips.advanced functions used by the package
+"""
+
+from _fakecalls import counted
+from . import _check_object
+
+_call = counted( "pychips" )
+
+
+@_call
+def open_undo_block():
+    pass
+
+
+@_call
+def close_undo_block():
+    pass
+
+
+@_call
+def set_data( oid, values ):
+    from . import _state
+    _check_object( "Curve", oid )
+    _state.contents[oid]["args"] = tuple( values )
@@ -0,0 +1,75 @@
+"""
+A stand-in for pycrates used by the benchmarks.
+
+read_file reads whitespace separated ASCII tables, like the .lut
+files, with optional "#" comment lines; a "#" line just before the
+data gives the column names (otherwise col1, col2, ...).  A missing
+or unreadable file raises IOError like crates does.
+
+Every call is counted in _fakecalls.calls as "pycrates.<name>" and
+waits for the simulated latency, if one is set.
+"""
+
+import numpy as np
+
+from _fakecalls import counted
+
+_call = counted( "pycrates" )
+
+
+class CrateData( object ):
+    def __init__( self, name, values ):
+        self.name = name
+        self.values = values
+
+
+class TABLECrate( object ):
+    def __init__( self, filename, names, columns ):
+        self.filename = filename
+        self._names = names
+        self._columns = columns
+
+    def get_colnames( self ):
+        return list( self._names )
+
+    def get_column( self, col ):
+        idx = col if isinstance( col, int ) else [ n.lower() for n in self._names ].index( col.lower() )
+        return CrateData( self._names[idx], self._columns[idx] )
+
+    def get_nrows( self ):
+        return len( self._columns[0] ) if self._columns else 0
+
+
+@_call
+def read_file( filename ):
+    names = None
+    rows = []
+    try:
+        with open( filename ) as fp:
+            for line in fp:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith( "#" ):
+                    names = line.lstrip( "#" ).split() or names
+                    continue
+                rows.append( [ float(v) for v in line.split() ] )
+    except (IOError, OSError, ValueError) as err:
+        raise IOError( "Unable to open {}: {}".format( filename, err ))
+    if not rows:
+        raise IOError( "{} has no data".format(filename) )
+
+    data = np.array( rows )
+    if names is None or len(names) != data.shape[1]:
+        names = [ "col{}".format(ii+1) for ii in range( data.shape[1] ) ]
+    return TABLECrate( filename, names, [ data[:,ii].copy() for ii in range( data.shape[1] ) ] )
+
+
+@_call
+def get_colvals( crate, col ):
+    return crate.get_column( col ).values
+
+
+@_call
+def get_col_names( crate ):
+    return crate.get_colnames()
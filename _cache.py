@@ -0,0 +1,195 @@
+"""
+A per-user disk cache for the color maps used by the LUT pickers.
+
+The cache lives in $CHIPS_LUT_CACHE if set, otherwise in
+$XDG_CACHE_HOME/chips_contrib_lut (~/.cache/chips_contrib_lut).
+Entries are keyed on the source file's path and modification time,
+and on a hash of its contents when the time has changed, so editing
+(or touching) a file is always picked up.  Names that are not files
+are always loaded.  Anything that goes wrong reading or writing the
+cache just falls back to loading the files.
+
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+
+def cache_dir():
+    """
+    The directory used for the cache; created if needed.  Returns
+    None if it cannot be created.
+    """
+    dd = os.environ.get("CHIPS_LUT_CACHE")
+    if not dd:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join( os.path.expanduser("~"), ".cache" )
+        dd = os.path.join( base, "chips_contrib_lut" )
+    try:
+        if not os.path.isdir(dd):
+            os.makedirs(dd)
+    except OSError:
+        return None
+    return dd
+
+
+def content_hash( path ):
+    """
+    sha1 of the contents of a file
+    """
+    hh = hashlib.sha1()
+    with open( path, "rb" ) as fp:
+        for block in iter( lambda: fp.read(1 << 20), b"" ):
+            hh.update(block)
+    return hh.hexdigest()
+
+
+def _mtime( path ):
+    try:
+        return os.path.getmtime( path )
+    except OSError:
+        return None
+
+
+def _entry_name( prefix, keys ):
+    """
+    Cache file name for a list of keys
+    """
+    hh = hashlib.sha1( "\n".join( keys ).encode("utf-8") ).hexdigest()
+    return "{}_{}".format( prefix, hh )
+
+
+def _atomic_write( filename, writer ):
+    """
+    Write to a temporary file and rename it so other processes
+    never see a partial file.
+    """
+    tmp = "{}.{}.tmp".format( filename, os.getpid() )
+    try:
+        with open( tmp, "wb" ) as fp:
+            writer(fp)
+        os.rename( tmp, filename )
+    except (IOError, OSError):
+        try:
+            os.remove( tmp )
+        except OSError:
+            pass
+
+
+def resample( table, samples ):
+    """
+    A color map, an array of shape (number of colors, 3), resampled
+    to a number of samples by nearest neighbour: sample i is color 
+    floor(x*n) at x = i/samples, so stepped or random tables keep 
+    their colors (they are not blended) and each color gets the same
+    number of samples.  Returns an array of shape (samples, 3).
+    """
+    table = np.asarray( table )
+    return table[ ( np.arange(samples) * len(table) ) // samples ]
+
+
+def load_tables( paths, loader, executor=None ):
+    """
+    The RGB values of each color map, as they are in the file: a list
+    of arrays of shape (number of colors, 3).
+
+    loader(path) returns the red, green, and blue arrays of a file.
+    All the tables for a list of files are kept in one .npz file
+    so a warm start is one read plus a stat of each file; only files
+    whose time and contents changed are loaded again.  Names that are
+    not files (eg a table found by loader in the CIAO directories)
+    have nothing to check so they are always loaded.  If an 
+    executor (eg a concurrent.futures.ThreadPoolExecutor) is given
+    the files are loaded with executor.map.
+    """
+    paths = [ os.path.abspath(p) if os.path.exists(p) else p for p in paths ]
+    mtimes = [ _mtime(p) for p in paths ]
+    on_disk = [ m is not None for m in mtimes ]
+    mtimes = np.array( [ m or 0.0 for m in mtimes ] )
+    dd = cache_dir()
+    filename = os.path.join( dd, _entry_name( "tables", paths )+".npz" ) if dd else None
+
+    old = None
+    if filename and os.path.exists( filename ):
+        try:
+            with np.load( filename ) as npz:
+                old = dict( (k, npz[k]) for k in ["mtimes", "hashes", "lengths", "values"] )
+            if old["lengths"].shape != (len(paths),):
+                old = None
+        except Exception:
+            old = None
+
+    if old is not None:
+        old["tables"] = np.split( old["values"], np.cumsum( old["lengths"] )[:-1] )
+        if all(on_disk) and np.array_equal( old["mtimes"], mtimes ):
+            return old["tables"]
+
+    tables = [ None ] * len(paths)
+    hashes = []
+    todo = []
+    for ii, pp in enumerate(paths):
+        hh = content_hash(pp) if on_disk[ii] else ""
+        hashes.append(hh)
+        if old is not None and hh and hh == old["hashes"][ii]:
+            tables[ii] = old["tables"][ii]
+        else:
+            todo.append(ii)
+
+    loaded = executor.map( loader, [paths[ii] for ii in todo] ) if executor else map( loader, [paths[ii] for ii in todo] )
+    for ii, rgb in zip( todo, loaded ):
+        tables[ii] = np.column_stack( [ np.asarray(cc, dtype=float) for cc in rgb ] )
+
+    if filename:
+        _atomic_write( filename, lambda fp: np.savez( fp, mtimes=mtimes,
+            hashes=np.array(hashes), lengths=np.array( [len(t) for t in tables] ),
+            values=np.concatenate( tables ) if tables else np.zeros((0,3)) ))
+    return tables
+
+
+def load_list( path, builder ):
+    """
+    A list of strings built from a file, eg the color map file names
+    listed in a parameter file.  builder() makes the list; it is only
+    called when the file has changed.
+    """
+    dd = cache_dir()
+    mtime = _mtime( path )
+    if dd is None or mtime is None:
+        return builder()
+    filename = os.path.join( dd, _entry_name( "list", [os.path.abspath(path)] )+".json" )
+
+    old = None
+    try:
+        with open( filename ) as fp:
+            old = json.load(fp)
+    except (IOError, OSError, ValueError):
+        pass
+
+    if old is not None and old.get("mtime") == mtime:
+        return old["values"]
+    hh = content_hash( path )
+    if old is not None and old.get("hash") == hh:
+        values = old["values"]
+    else:
+        values = builder()
+
+    blob = json.dumps( { "mtime" : mtime, "hash" : hh, "values" : values } ).encode("utf-8")
+    _atomic_write( filename, lambda fp: fp.write(blob) )
+    return values
+
+
+def par_luts( parfile ):
+    """
+    The color map files listed in a parameter file.  The list is
+    cached until the parameter file changes.
+    """
+    from paramio import plist, pget, paccess
+    build = lambda: [ pget(parfile,x) for x in plist( parfile ) if x != 'mode' ]
+    path = paccess( parfile )
+    if not path:
+        return build()
+    return load_list( path, build )
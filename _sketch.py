@@ -0,0 +1,108 @@
+"""
+Mergeable, approximate quantile sketches used to summarize data
+that do not fit in memory.
+
+"""
+
+from __future__ import absolute_import
+
+import numpy as np
+
+
+class QuantileSketch(object):
+    """
+    A KLL style quantile sketch.
+
+    Values are kept in a stack of "compactors".  An item in level h
+    represents 2**h of the input values.  When a level holds more 
+    than k items it is sorted and every other item (starting at a
+    random offset) is promoted to the next level.  The memory used is
+    a small multiple of k items regardless of the number of values, and
+    the rank error of a quantile is about 1/k (the random offsets
+    make the errors from each level tend to cancel).
+    
+    Values are only ever added in numpy arrays so a sketch can be
+    updated with large blocks of data cheaply.
+
+    >>> s = QuantileSketch()
+    >>> s.update( np.random.rand(100000) )
+    >>> s.quantile( [0.25, 0.5, 0.75] )
+
+    Sketches can be merged:
+
+    >>> s.merge( other )
+    
+    """
+
+    def __init__( self, k=1000, seed=None ):
+        if k < 2:
+            raise ValueError("k must be at least 2")
+        self.k = int(k)
+        self.levels = [ np.empty(0) ]
+        self.rng = np.random.RandomState(seed)
+
+
+    def update( self, values ):
+        """
+        Add an array of values to the sketch
+        """
+        values = np.asarray( values, dtype=float ).ravel()
+        if 0 == values.size:
+            return
+        self.levels[0] = np.concatenate( (self.levels[0], values) )
+        self._compress()
+
+
+    def merge( self, other ):
+        """
+        Add the values summarized by another sketch
+        """
+        for hh, buf in enumerate(other.levels):
+            if hh == len(self.levels):
+                self.levels.append( np.empty(0) )
+            self.levels[hh] = np.concatenate( (self.levels[hh], buf) )
+        self._compress()
+
+
+    def _compress( self ):
+        hh = 0
+        while hh < len(self.levels):
+            buf = self.levels[hh]
+            if buf.size > self.k:
+                buf = np.sort(buf)
+                # An odd item out stays in this level
+                keep = buf[-1:] if buf.size % 2 else buf[:0]
+                buf = buf[:buf.size - keep.size]
+                promote = buf[ self.rng.randint(2)::2 ]
+                self.levels[hh] = keep
+                if hh+1 == len(self.levels):
+                    self.levels.append( np.empty(0) )
+                self.levels[hh+1] = np.concatenate( (self.levels[hh+1], promote) )
+            hh += 1
+
+
+    def _weighted( self ):
+        vals = np.concatenate( self.levels )
+        wgts = np.concatenate( [ np.full( b.size, 2.0**h ) for h,b in enumerate(self.levels) ] )
+        order = np.argsort( vals, kind="mergesort" )
+        return vals[order], np.cumsum( wgts[order] )
+
+
+    def quantile( self, qq ):
+        """
+        Approximate quantile(s) of the values added.  Returns NaN if
+        the sketch is empty.
+        """
+        qq = np.asarray( qq, dtype=float )
+        vals, cwgt = self._weighted()
+        if 0 == vals.size:
+            return np.full( qq.shape, np.nan )
+        idx = np.searchsorted( cwgt, qq * cwgt[-1], side="left" )
+        return vals[ np.clip( idx, 0, vals.size-1 ) ]
+
+
+    @property
+    def size( self ):
+        """Number of items stored in the sketch"""
+        return sum( b.size for b in self.levels )
+
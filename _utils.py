@@ -5,6 +5,13 @@ Utility routines that lutplot and colorcurves share
 
 from __future__ import absolute_import
 
+import numpy as np
+
+
+def _identity( x ):
+    return x
+
+
 def _try_hard_to_locate( filename ):
     """
     Try to locate the LUT file just based on the name (eg returned
@@ -110,3 +117,180 @@ def get_rgb_values( filename, reverse=False, invert=False ):
         bb = 1.0-bb
 
     return rr, gg, bb
+
+
+#
+# Z-axis scaling used to bin data values into colors.
+#
+
+def _log10( x ):
+    return np.log10(x)
+
+def _pow10( x ):
+    return np.power(10.0, x)
+
+def _square( x ):
+    return np.square(x)
+
+
+_scale_transforms = { 'linear' : (_identity, _identity, None),
+                      'log'    : (_log10, _pow10, 'log10(z)'),
+                      'sqrt'   : (np.sqrt, _square, 'sqrt(z)'),
+                      'asinh'  : (np.arcsinh, np.sinh, 'asinh(z)') }
+
+_adaptive_scales = [ 'histeq', 'quantile' ]
+
+scales = list(_scale_transforms.keys()) + _adaptive_scales
+
+
+def _check_scale( scale ):
+    if scale not in scales:
+        raise ValueError("Unknown scale '{}'; must be one of {}".format( scale, ", ".join(scales)))
+
+
+def _data_range( zz, scale, zmin, zmax ):
+    """
+    Determine the z range, ignoring values that cannot be
+    represented in the selected scale (eg z<=0 for log).
+    """
+    if 'log' == scale:
+        good = zz[zz > 0]
+    elif 'sqrt' == scale:
+        good = zz[zz >= 0]
+    else:
+        good = zz
+
+    if (zmin is None or zmax is None) and 0 == good.size:
+        raise ValueError("No z values can be represented with the '{}' scale".format(scale))
+
+    lo = np.min(good) if zmin is None else float(zmin)
+    hi = np.max(good) if zmax is None else float(zmax)
+
+    if 'log' == scale and lo <= 0:
+        raise ValueError("zmin must be > 0 for log scale")
+    if 'sqrt' == scale and lo < 0:
+        raise ValueError("zmin must be >= 0 for sqrt scale")
+
+    return lo, hi
+
+
+def get_z_edges( zz, num_bins, scale="linear", zmin=None, zmax=None ):
+    """
+    Compute the lower and upper z edges of each color bin.
+
+    The linear, log, sqrt, and asinh scales are equally spaced
+    in the transformed z values; the histeq and quantile scales
+    use the data themselves so that each bin has (approximately)
+    the same number of values.  histeq uses exact order statistics
+    (data values) while quantile interpolates between them.
+
+    The last upper edge is always +inf so that the max value is
+    included (bins are lo <= z < hi).
+    
+    Returns the tuple (lo, hi, zmin, zmax).
+    """
+    _check_scale(scale)
+
+    zz = np.asarray(zz, dtype=float)
+    zlo, zhi = _data_range( zz, scale, zmin, zmax )
+
+    if scale in _scale_transforms:
+        fwd, inv, _ = _scale_transforms[scale]
+        tmin = fwd(zlo)
+        dt = float(fwd(zhi) - tmin)/(num_bins-1) if num_bins > 1 else 1.0
+        tlo = inv( tmin + dt * np.arange(num_bins))
+        thi = inv( tmin + dt * np.arange(1, num_bins+1))
+    else:
+        vals = zz[(zz >= zlo) & (zz <= zhi)]
+        if 0 == vals.size:
+            raise ValueError("No z values between zmin and zmax")
+        levels = np.linspace( 0.0, 1.0, num_bins+1 )
+        if 'quantile' == scale:
+            edges = np.quantile( vals, levels )
+        else:
+            kth = np.round( levels * (vals.size-1)).astype(int)
+            edges = np.partition( vals, kth )[kth]
+        tlo = edges[:-1]
+        thi = edges[1:].copy()
+
+    tlo[0] = zlo        # undo any round off from the inverse transform
+    thi[-1] = np.inf    # make sure max value is always included (< vs <= below)
+
+    return tlo, thi, zlo, zhi
+
+
+def quantize( zz, num_colors, zmin, zmax, scale="linear", clip=True, out=None ):
+    """
+    The color index of each z value.  The transformed range
+    [zmin, zmax) is split into num_colors equal bins
+
+        index = floor( num_colors * (f(z)-f(zmin)) / (f(zmax)-f(zmin)) )
+
+    Values >= zmax are given the last color.  Values < zmin are given
+    the first color if clip is True, otherwise -1.  NaN's, infinities,
+    and values that cannot be transformed (eg z<=0 for log) are -1.
+    If zmin equals zmax all values get the middle color.
+
+    Only the linear, log, sqrt, and asinh scales can be used; the 
+    result is stored in out (an integer array) if given.
+    """
+    if scale not in _scale_transforms:
+        raise ValueError("Only the {} scales can be quantized".format( ", ".join(_scale_transforms)))
+    fwd = _scale_transforms[scale][0]
+    tmin = float(fwd(zmin))
+    tmax = float(fwd(zmax))
+
+    with np.errstate( invalid="ignore", divide="ignore", over="ignore" ):
+        tt = fwd( np.asarray( zz, dtype=float ))
+        bad = ~np.isfinite( tt )
+        if tmax > tmin:
+            tt = ( tt - tmin ) * ( num_colors/(tmax-tmin) )
+        else:
+            tt = np.full( tt.shape, num_colors // 2, dtype=float )
+        below = tt < 0
+        np.floor( tt, out=tt )
+        np.clip( tt, 0, num_colors-1, out=tt )
+        tt[bad] = -1
+        if not clip:
+            tt[below] = -1
+
+    if out is None:
+        return tt.astype( np.intp )
+    out[...] = tt
+    return out
+
+
+def check_zgrid( zgrid, num_bins ):
+    """
+    Validate a user supplied z grid: a list of (lo,hi) pairs or
+    an (N,2) array.  Returns the lo and hi arrays.
+    """
+    if not isinstance( zgrid, np.ndarray ):
+        zgrid = list(zgrid)
+
+    try:
+        zgrid = np.asarray( zgrid, dtype=float )
+    except (ValueError, TypeError):
+        raise ValueError("All elements of zgrid must be numbers and have 2 elements in each slot")
+
+    if zgrid.ndim != 2 or zgrid.shape[1] != 2:
+        raise ValueError("zgrid must have 2 elements in each slot")
+    if zgrid.shape[0] != num_bins:
+        raise ValueError("zgrid must have same number of elements as number of colors")
+    if np.any(np.isnan(zgrid)):
+        raise ValueError("All elements of zgrid must be numbers")
+
+    return zgrid[:,0].copy(), zgrid[:,1].copy()
+
+
+def colorbar_range( scale, zmin, zmax ):
+    """
+    Return the range and label for a color bar drawn with the given
+    scale.  The transformed scales show the transformed z values; the
+    adaptive (histeq, quantile) scales have equal numbers of values
+    per color so the color bar shows the percentile.
+    """
+    if scale in _scale_transforms:
+        fwd, _, label = _scale_transforms[scale]
+        return fwd(zmin), fwd(zmax), label
+    return 0.0, 100.0, "percentile(z)"
@@ -28,7 +28,9 @@ Imports the following modules
   chips_contrib.lut.hexify
   chips_contrib.lut.color_curves
   chips_contrib.lut.lutbox_whisker
+  chips_contrib.lut.lutcatalog
   chips_contrib.lut.lutcolors
+  chips_contrib.lut.lutmap
   chips_contrib.lut.lutplot
   chips_contrib.lut.pick_lut
 
@@ -37,6 +39,8 @@ Imports the following modules
 from .hexify import *
 from .color_curves import *
 from .lutbox_whisker import *
+from .lutcatalog import *
 from .lutcolors import *
+from .lutmap import *
 from .lutplot import *
 from .pick_lut import *
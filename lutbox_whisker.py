@@ -29,10 +29,457 @@ import numpy as np
 from pychips.advanced import open_undo_block, close_undo_block
 from pychips import *
 from pycrates import read_file, get_colvals
-from .lutplot import LUTPlot
+from .lutplot import LUTPlot, _with_id
+from ._utils import quantize
 
 
-__all__ = ["BoxWhiskerPlot"]
+__all__ = ["BoxWhiskerPlot", "read_chunks"]
+
+
+def read_chunks( filename, xcol, ycol, rows=1000000 ):
+    """
+    Read the X and Y columns of a table in blocks of rows.  
+    
+    >>> chunks = read_chunks( "evt2.fits", "time", "energy" )
+    >>> b = BoxWhiskerPlot.from_chunks( chunks, xrange=(t0,t1) )
+    
+    The number of rows is read from the table first (crates only 
+    reads the column values when they are used) and the blocks stop
+    there; any error reading a block is raised.
+    
+    Returns a generator of (x, y) arrays.
+    """
+    nrows = read_file( filename ).get_nrows()
+    for lo in range( 1, nrows+1, rows ):
+        hi = min( lo+rows-1, nrows )
+        tab = read_file( "{}[#row={}:{}]".format( filename, lo, hi ))
+        xx = get_colvals( tab, xcol )*1.0
+        yy = get_colvals( tab, ycol )*1.0
+        yield xx, yy
+
+
+_summary_columns = [ "xlo", "xhi", "q_lo", "median", "q_hi", "min", "max", "mean", "std", "count" ]
+
+
+def _read_summary( filename ):
+    """
+    Read the summary statistics columns from a table.  Files ending
+    in .csv are read with np.genfromtxt (with a header line of column 
+    names), anything else with pycrates.  Column names are not case
+    sensitive; mean, std, and count are optional.
+    """
+    if filename.lower().endswith(".csv"):
+        tab = np.genfromtxt( filename, delimiter=",", names=True, case_sensitive="lower" )
+        names = tab.dtype.names
+        getcol = lambda n: np.atleast_1d( tab[n] )
+    else:
+        tab = read_file( filename )
+        names = [ n.lower() for n in tab.get_colnames() ]
+        getcol = lambda n: get_colvals( tab, n )*1.0
+
+    retval = {}
+    for col in _summary_columns:
+        if col in names:
+            retval[col] = getcol(col)
+        elif col not in ["mean", "std", "count"]:
+            raise ValueError("Summary table must have a '{}' column".format(col))
+    return retval
+
+
+_colorize_by = { 
+    "count" : lambda st: st['count'],
+    "median" : lambda st: st['median'],
+    "mean" : lambda st: st['mean'],
+    "std" : lambda st: st['std'],
+    "iqr" : lambda st: st['quantiles'][:,1] - st['quantiles'][:,0],
+    }
+
+
+def _edges_to_grid( edges ):
+    """
+    Convert bin edges into a list of (lo,hi) pairs.  Bins are 
+    lo <= x < hi so the last edge is nudged up to include the max.
+    """
+    edges = np.array( edges, dtype=float )
+    edges[-1] = np.nextafter( edges[-1], np.inf )
+    return list(zip( edges[:-1], edges[1:] ))
+
+
+def _bayesian_blocks( xsorted, p0=0.05 ):
+    """
+    Optimal bin edges for event data using the Bayesian Blocks 
+    dynamic program (Scargle et al. 2013, ApJ 764, 167).  
+    
+    The outer loop is over the N distinct X values; the inner loop 
+    over all possible starts of the last block is vectorized.
+    """
+    tt, counts = np.unique( xsorted, return_counts=True )
+    num = tt.size
+    if num < 2:
+        return np.array( [tt[0], tt[0]] )
+
+    edges = np.concatenate( (tt[:1], 0.5*(tt[1:]+tt[:-1]), tt[-1:]) )
+    block_length = tt[-1] - edges
+    cumcounts = np.concatenate( ([0], np.cumsum(counts)) )
+    ncp_prior = 4 - np.log( 73.53 * p0 * num**-0.478 )
+
+    best = np.zeros( num )
+    last = np.zeros( num, dtype=int )
+    for rr in range(num):
+        # Fitness of the last block starting at each k <= rr
+        width = block_length[:rr+1] - block_length[rr+1]
+        nk = cumcounts[rr+1] - cumcounts[:rr+1]
+        fit = nk * ( np.log(nk) - np.log(width) ) - ncp_prior
+        fit[1:] += best[:rr]
+        last[rr] = np.argmax(fit)
+        best[rr] = fit[last[rr]]
+
+    change_points = []
+    ind = num
+    while ind > 0:
+        change_points.append(ind)
+        ind = last[ind-1]
+    change_points.append(0)
+
+    return edges[ change_points[::-1] ]
+
+
+def _grid_edges( xx, xsorted, nbin, mode, p0=0.05 ):
+    """
+    Bin edges for the automatic grids.  
+    
+    equal_width and log only need the X range.  equal_count picks
+    the edges from the sorted X values by index (or with a single
+    np.partition if the values are not sorted); repeated values can
+    make fewer bins, down to a single bin if all X are equal.
+    bayesian_blocks chooses the number of bins.
+    """
+    lo = np.min(xx)
+    hi = np.max(xx)
+
+    if "equal_width" == mode:
+        return np.linspace( lo, hi, nbin+1 )
+
+    if "log" == mode:
+        if lo <= 0:
+            raise ValueError("X values must be > 0 to use a log grid")
+        edges = np.logspace( np.log10(lo), np.log10(hi), nbin+1 )
+        edges[[0,-1]] = lo, hi    # undo any round off so the min and max are included
+        return edges
+
+    if "equal_count" == mode:
+        kth = ( np.arange( nbin+1 ) * (len(xx)-1) ) // nbin
+        if xsorted is xx:
+            edges = np.partition( xx, kth )[kth]
+        else:
+            edges = xsorted[kth]
+        edges = np.unique( edges )
+        if edges.size < 2:
+            edges = np.array( [lo, hi], dtype=float )   # all X are equal: one bin
+        return edges
+
+    if "bayesian_blocks" == mode:
+        if xsorted is xx:
+            xsorted = np.sort(xx)
+        return _bayesian_blocks( xsorted, p0=p0 )
+
+    raise ValueError("Unknown grid mode '{}'".format(mode))
+
+
+def _bin_ranges( xsorted, glo, ghi ):
+    """
+    The rows of each grid bin in the sorted X values: bin i is rows
+    starts[i] to starts[i]+counts[i].  Also returns the offsets of
+    the bins in a buffer that holds them one after the other.
+    """
+    starts = np.searchsorted( xsorted, glo, side="left" )
+    stops = np.maximum( np.searchsorted( xsorted, ghi, side="left" ), starts )
+    counts = stops - starts
+
+    offsets = np.zeros( len(glo)+1, dtype=int )
+    np.cumsum( counts, out=offsets[1:] )
+    return starts, counts, offsets
+
+
+def _sort_into_bins( xorder, xsorted, yy, glo, ghi ):
+    """
+    Gather the Y values of each grid bin into one buffer sorted by
+    (bin, y).  
+
+    The X values are already sorted (xsorted = xx[xorder]) so each
+    bin is a contiguous range found with searchsorted; this also
+    works when the grid overlaps or has gaps.  If xorder is None
+    the Y values are already in X order.  Returns the buffer,
+    the offsets (bin i is ybuf[offsets[i]:offsets[i+1]]), and the
+    start of each bin in the sorted X values.
+    """
+    starts, counts, offsets = _bin_ranges( xsorted, glo, ghi )
+
+    # Index of each value in the X-sorted order, bin by bin
+    pos = np.repeat( starts - offsets[:-1], counts ) + np.arange( offsets[-1] )
+    binid = np.repeat( np.arange(len(glo)), counts )
+    yval = yy[pos] if xorder is None else yy[ xorder[pos] ]
+    ybuf = yval[ np.lexsort( (yval, binid) ) ]
+
+    return ybuf, offsets, starts
+
+
+def _regroup_sorted( yorder, ysorted, starts, counts, offsets ):
+    """
+    The buffer of _sort_into_bins made from Y values that were 
+    sorted once, for grids whose bins do not overlap.  
+    
+    yorder holds the X-order rows of the sorted Y values (ysorted).
+    Each row is labelled with its bin (or len(starts) if it is in
+    none) and the labels, taken in Y order, are sorted with a stable
+    sort: that groups the values by bin and keeps them sorted within
+    each bin.  Up to 65534 bins the labels are 16 bit, which numpy
+    sorts with a radix sort, so a new grid costs O(N) instead of
+    another sort of all the Y values.
+
+    Returns None if the bins overlap.
+    """
+    nbin = len(starts)
+    full, = np.where( counts > 0 )
+    first = full[ np.argsort( starts[full], kind="mergesort" ) ]
+    if np.any( starts[first[1:]] < (starts+counts)[first[:-1]] ):
+        return None
+
+    label = np.full( len(yorder), nbin, dtype=np.uint16 if nbin < 65535 else np.intp )
+    pos = np.repeat( starts - offsets[:-1], counts ) + np.arange( offsets[-1] )
+    label[pos] = np.repeat( np.arange(nbin), counts )
+    order = np.argsort( label[yorder], kind="stable" )[:offsets[-1]]
+    return ysorted[order]
+
+
+def _worker_statistics( args ):
+    """
+    Worker process: attach to the shared X and Y arrays, which are
+    sorted by X, then sort and summarize the values of a range of 
+    grid bins.  The bins only cover rows start to stop so just those
+    rows are copied.
+    """
+    from multiprocessing import shared_memory
+
+    (xname, xdtype, yname, ydtype, num, start, stop, glo, ghi, quantiles) = args
+    xshm = shared_memory.SharedMemory( name=xname )
+    yshm = shared_memory.SharedMemory( name=yname )
+    try:
+        xsub = np.ndarray( (num,), dtype=xdtype, buffer=xshm.buf )[start:stop].copy()
+        ysub = np.ndarray( (num,), dtype=ydtype, buffer=yshm.buf )[start:stop].copy()
+    finally:
+        xshm.close()
+        yshm.close()
+
+    ybuf, offsets, _ = _sort_into_bins( None, xsub, ysub, glo, ghi )
+    return _bin_statistics( ybuf, offsets, quantiles )
+
+
+def _parallel_statistics( xorder, xsorted, yy, grid, quantiles, workers ):
+    """
+    Compute the bin statistics with a pool of worker processes.
+
+    The X values were sorted once (xsorted = xx[xorder]).  The 
+    sorted X and the Y values in the same order are copied once into
+    shared memory (so they are not pickled) and the bins are split
+    into contiguous groups, a few per worker so that uneven bins
+    balance out.  Each group covers one range of rows of the sorted
+    arrays, found with searchsorted, and its worker only reads those
+    rows.  Each worker returns just the statistics of its bins.
+    """
+    from multiprocessing import Pool
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise RuntimeError("workers requires python 3.8 or newer (multiprocessing.shared_memory)")
+
+    glo = np.array( [g[0] for g in grid], dtype=float )
+    ghi = np.array( [g[1] for g in grid], dtype=float )
+    starts = np.searchsorted( xsorted, glo, side="left" )
+    stops = np.maximum( np.searchsorted( xsorted, ghi, side="left" ), starts )
+    groups = [ g for g in np.array_split( np.arange(len(grid)), 4*workers ) if g.size ]
+
+    yy = np.asarray( yy )
+    xshm = shared_memory.SharedMemory( create=True, size=max(xsorted.nbytes,1) )
+    yshm = shared_memory.SharedMemory( create=True, size=max(yy.nbytes,1) )
+    try:
+        np.ndarray( xsorted.shape, dtype=xsorted.dtype, buffer=xshm.buf )[:] = xsorted
+        np.take( yy, xorder, out=np.ndarray( yy.shape, dtype=yy.dtype, buffer=yshm.buf ))
+
+        tasks = [ (xshm.name, xsorted.dtype.str, yshm.name, yy.dtype.str, xsorted.size, 
+                   int(np.min(starts[g])), int(np.max(stops[g])), glo[g], ghi[g], quantiles) for g in groups ]
+        pool = Pool( workers )
+        try:
+            results = pool.map( _worker_statistics, tasks )
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        xshm.close()
+        xshm.unlink()
+        yshm.close()
+        yshm.unlink()
+
+    return np.concatenate( results )
+
+
+# Memory used by each block of bootstrap resamples
+_BOOT_BLOCK_BYTES = 32*1024*1024
+
+
+def _bootstrap_median( yy, n_boot, seed, conf ):
+    """
+    Bootstrap confidence interval on the median of one bin.
+
+    The resamples are drawn as a matrix of random indices, one row
+    per resample, in blocks small enough to stay under 
+    _BOOT_BLOCK_BYTES.  Since yy is sorted, the middle values of a
+    resample are at the middle indices, so the medians of a whole
+    block are found with one partition of the indices.
+    """
+    rng = np.random.RandomState( seed )
+    nn = len(yy)
+    per_block = max( 1, _BOOT_BLOCK_BYTES // (4*nn) )
+    mid = [ (nn-1)//2, nn//2 ]
+    
+    medians = np.empty( n_boot )
+    for lo in range( 0, n_boot, per_block ):
+        hi = min( lo+per_block, n_boot )
+        idx = rng.randint( 0, nn, size=(hi-lo, nn), dtype=np.int32 )
+        idx.partition( mid, axis=1 )
+        medians[lo:hi] = 0.5*( yy[idx[:,mid[0]]] + yy[idx[:,mid[1]]] )
+
+    alpha = (1.0-conf)/2.0
+    return np.percentile( medians, [100*alpha, 100*(1-alpha)] )
+
+
+def _bootstrap_notches( ybuf, offsets, n_boot, seed, conf=0.95, workers=None ):
+    """
+    Bootstrap confidence intervals on the median of every bin.
+
+    Each bin gets its own seed drawn from seed so the results are 
+    the same with or without workers.  With workers the bins are
+    spread over a pool of threads (numpy releases the GIL while 
+    indexing and sorting), largest bins first.
+    """
+    nbin = len(offsets)-1
+    counts = np.diff(offsets)
+    seeds = np.random.RandomState( seed ).randint( 0, 2**31-1, size=nbin )
+    retval = np.full( (nbin, 2), np.nan )
+
+    todo = [ ii for ii in np.argsort( -counts, kind="mergesort" ) if counts[ii] > 0 ]
+    args = [ (ybuf[offsets[ii]:offsets[ii+1]], n_boot, seeds[ii], conf) for ii in todo ]
+    boot = lambda a: _bootstrap_median( *a )
+
+    if workers and len(todo) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool( workers )
+        try:
+            results = pool.map( boot, args, chunksize=1 )
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = list(map( boot, args ))
+
+    for ii, ci in zip( todo, results ):
+        retval[ii] = ci
+    return retval
+
+
+def _empty_statistics( nbin, nquantiles ):
+    """
+    Structured array to hold the statistics of each bin
+    """
+    dtype = [ ('count', int), ('min', float), ('max', float), 
+              ('median', float), ('mean', float), ('std', float),
+              ('quantiles', float, (nquantiles,)) ]
+    retval = np.zeros( nbin, dtype=dtype )
+    for f in ['min', 'max', 'median', 'mean', 'std', 'quantiles']:
+        retval[f] = np.nan
+    return retval
+
+
+def _bin_statistics( ybuf, offsets, quantiles ):
+    """
+    Compute the statistics of all the bins at once.  
+    
+    ybuf holds the values of each bin, sorted, one bin after the
+    other; bin i is ybuf[offsets[i]:offsets[i+1]].  Sums come from
+    np.add.reduceat and the order statistics are picked out by
+    index, so there is no loop over bins.
+    
+    Returns a structured array with count, min, max, median, mean,
+    std (population) and the requested quantiles for each bin.  
+    Empty bins have count 0 and NaN for everything else.
+    """
+    quantiles = np.atleast_1d( np.asarray( quantiles, dtype=float ))
+    retval = _empty_statistics( len(offsets)-1, quantiles.size )
+
+    counts = np.diff(offsets)
+    retval['count'] = counts
+    good, = np.where( counts > 0 )
+    if 0 == good.size:
+        return retval
+
+    nn = counts[good]
+    lo = offsets[:-1][good]
+    hi = offsets[1:][good]
+
+    retval['min'][good] = ybuf[lo]
+    retval['max'][good] = ybuf[hi-1]
+    retval['median'][good] = ( ybuf[lo+(nn-1)//2] + ybuf[lo+nn//2] ) / 2.0
+
+    # Empty bins contribute no values so the non-empty starts
+    # split ybuf exactly.
+    mean = np.add.reduceat( ybuf, lo ) / nn
+    dev = ybuf[:hi[-1]] - np.repeat( mean, nn )
+    retval['mean'][good] = mean
+    retval['std'][good] = np.sqrt( np.add.reduceat( dev*dev, lo ) / nn )
+
+    idx = np.floor( quantiles[np.newaxis,:] * nn[:,np.newaxis] + 0.5 ).astype(int)
+    idx = np.clip( idx, 0, (nn-1)[:,np.newaxis] )
+    retval['quantiles'][good] = ybuf[ lo[:,np.newaxis] + idx ]
+
+    return retval
+
+
+def _tukey_whiskers( ybuf, offsets, qlo, qhi, whis ):
+    """
+    Tukey style whiskers for all the bins at once.
+    
+    The whiskers go to the most extreme values within whis times
+    the inter-quantile range (qhi-qlo) of the box; anything beyond
+    is a flier.  Every value is compared to the fences of its own
+    bin (np.repeat) and the whisker ends come from 
+    np.minimum/maximum.reduceat over the values inside them.
+    
+    Returns the whisker ends for each bin and the bin index and value
+    of each flier.
+    """
+    nbin = len(offsets)-1
+    counts = np.diff(offsets)
+    wlo = np.full( nbin, np.nan )
+    whi = np.full( nbin, np.nan )
+    good, = np.where( counts > 0 )
+    if 0 == good.size:
+        return wlo, whi, np.zeros(0, dtype=int), np.zeros(0)
+    
+    iqr = qhi - qlo
+    fence_lo = np.repeat( (qlo - whis*iqr)[good], counts[good] )
+    fence_hi = np.repeat( (qhi + whis*iqr)[good], counts[good] )
+    yy = ybuf[:offsets[-1]]
+    inside = (yy >= fence_lo) & (yy <= fence_hi)
+
+    # The box is always inside the fences so each bin has values left
+    starts = offsets[:-1][good]
+    wlo[good] = np.minimum.reduceat( np.where( inside, yy, np.inf ), starts )
+    whi[good] = np.maximum.reduceat( np.where( inside, yy, -np.inf ), starts )
+    
+    outside, = np.where( ~inside )
+    fbin = good[ np.searchsorted( starts, outside, side="right" ) - 1 ]
+    return wlo, whi, fbin, yy[outside]
+
 
 class BoxWhiskerPlot(LUTPlot):
     """
@@ -106,19 +553,36 @@ class BoxWhiskerPlot(LUTPlot):
     >>> b.set_region( "opacity=0.3")
     >>> b.add_colorbar()
     >>> b.colorize("bb")
+
+    Data that are too large to fit in memory can be summarized one
+    block at a time; the quantiles are then approximate
+    
+    >>> chunks = read_chunks( "evt2.fits", "time", "energy" )
+    >>> b = BoxWhiskerPlot.from_chunks( chunks, xrange=(t0,t1), nbin=50 )
+    >>> b.plot()
         
     """
 
 
     
-    def __init__( self, xx, yy, curve=None, point=None, line=None, region=None, grid=None, nbin=10 ):
+    def __init__( self, xx, yy, curve=None, point=None, line=None, region=None, grid=None, nbin=10, workers=None, mode="equal_width" ):
         """
         Create a BoxWhiskerPlot object
         
         Data in the X and Y arrays are copied.  Default grid
         and plot properties are setup.
         
+        For very large datasets the binning and statistics can be
+        split across a pool of worker processes
         
+        >>> b = BoxWhiskerPlot( xx, yy, workers=8 )
+        
+        The X values are sorted once; the sorted X and Y arrays are
+        placed in shared memory and each worker sorts and summarizes
+        a range of the bins, reading only the rows in those bins;
+        only the statistics are returned.  Since the sorted values
+        are not kept, each new set of quantiles is computed by the
+        workers again.
         """
         if xx is None or yy is None:
             raise ValueError("X and Y must be specified (cannot contain None's")        
@@ -127,17 +591,29 @@ class BoxWhiskerPlot(LUTPlot):
         if len(xx) < 1:
             raise ValueError("Must have 1 or more value")
     
+        self._init_plot_state( curve, point, line, region )
+        self.xx = np.array(xx)
+        self.yy = np.array(yy)
+        self._xorder = None
+        self._xsorted = None
+        self._yorder = None
+        self._ysorted = None
+        self.set_grid( grid, nbin, workers=workers, mode=mode )
+
+
+    def _init_plot_state( self, curve, point, line, region ):
+        """
+        Check the plot properties and setup the default state
+        """
         if curve and not isinstance( curve, ChipsCurve ):
             raise ValueError("curve must be a ChipsCurve object")
-        if point and not isinstance( symbol, ChipsPoint ):
+        if point and not isinstance( point, ChipsPoint ):
             raise ValueError("point must be a ChipsSymbol object")
         if line and not isinstance( line, ChipsLine ):
             raise ValueError("line must be a ChipsLine object")
         if region and not isinstance(region, ChipsRegion ):
             raise ValueError("region must be a ChipsRegion object")
         
-        self.xx = np.array(xx)
-        self.yy = np.array(yy)
         self.curve = curve if curve else ChipsCurve()
         self.point = point if point else ChipsPoint()
         self.line = line if line else ChipsLine()
@@ -156,22 +632,196 @@ class BoxWhiskerPlot(LUTPlot):
         self.limit=None
         self.mean=None
         self.sdev=None       
-        self.set_grid( grid, nbin)
-
+        self.grid_regions = {}
+        self._bin_objects = {}
+        self.hex_codes = None
+        self.by = "count"
+        self._region_colors = {}
         self.image = None
         self.min_z = None
         self.max_z = None
-        self.lut_win = None
-        self.lut_frame = None
-        self.lut_plot = None
         self.old_win = None
         self.old_frame = None
         self.old_plot = None
         self.order = None
         self.cmap = None
+        self.xx = None
+        self.yy = None
+        self._sketches = None
+        self._summary = None
+        self._stats = {}
+        self._notches = {}
+        self._whiskers = {}
+        self._ybuf = None
+        self._members = None
+        self.workers = None
+        self.notch = None
+        self.n_boot = None
+        self.seed = None
+        self.whis = None
+        self.flier = "line.style=none symbol.style=circle symbol.size=2"
+        self._flier_curve = None
+
+
+    @classmethod
+    def from_chunks( cls, chunks, grid=None, xrange=None, nbin=10, k=1000, seed=None, curve=None, point=None, line=None, region=None ):
+        """
+        Create a BoxWhiskerPlot from data that are too large to fit
+        in memory.  
+        
+        The chunks are an iterable that returns (x, y) pairs of 
+        arrays, for example the rows of a table read in blocks
+
+        >>> chunks = read_chunks( "evt2.fits", "time", "energy" )
+        >>> b = BoxWhiskerPlot.from_chunks( chunks, xrange=(t0, t1), nbin=50 )
+        >>> b.plot()
+        
+        Since the data are only read once, the grid must be known
+        ahead of time: either an explicit grid or the X range to 
+        split into nbin equal bins.
+        
+        Each bin keeps the exact count, min, max, mean, and standard
+        deviation, and a quantile sketch (see _sketch.QuantileSketch)
+        which gives the median and quantiles used for plot(qlo, qhi)
+        with a rank error of about 1/k.  Memory use is proportional
+        to the number of bins times k, not the number of values.
+        
+        The grid cannot be changed later with set_grid and bins 
+        cannot be plotted with options that need the raw data.
+        """
+        from ._sketch import QuantileSketch
+
+        if grid is None:
+            if xrange is None:
+                raise ValueError("Either the grid or the xrange must be supplied")
+            grid = _edges_to_grid( np.linspace( float(xrange[0]), float(xrange[1]), nbin+1 ))
+
+        retval = cls.__new__(cls)
+        retval._init_plot_state( curve, point, line, region )
+        retval._check_grid( grid )
+        retval.grid = [ (l,h) for l,h in grid ]
+
+        nb = len(retval.grid)
+        glo = np.array( [g[0] for g in retval.grid], dtype=float )
+        ghi = np.array( [g[1] for g in retval.grid], dtype=float )
+
+        mom = { 'count' : np.zeros( nb, dtype=int ), 
+                'mean'  : np.zeros( nb ), 
+                'm2'    : np.zeros( nb ),
+                'min'   : np.full( nb, np.inf ),
+                'max'   : np.full( nb, -np.inf ) }
+        rng = np.random.RandomState( seed )
+        sketches = [ QuantileSketch( k=k, seed=rng.randint(2**31) ) for ii in range(nb) ]
+
+        for xc, yc in chunks:
+            xc = np.asarray( xc, dtype=float ).ravel()
+            yc = np.asarray( yc, dtype=float ).ravel()
+            if xc.size != yc.size:
+                raise ValueError("X and Y arrays must be same length")
+
+            xorder = np.argsort( xc, kind="mergesort" )
+            ybuf, offsets, _ = _sort_into_bins( xorder, xc[xorder], yc, glo, ghi )
+            st = _bin_statistics( ybuf, offsets, [] )
+            good, = np.where( st['count'] > 0 )
+
+            # Combine the mean and sum of squared deviations of this
+            # chunk with the totals (Chan et al.) 
+            na = mom['count'][good]
+            nb_ = st['count'][good]
+            ntot = na + nb_
+            delta = st['mean'][good] - mom['mean'][good]
+            mom['mean'][good] += delta * nb_ / ntot
+            mom['m2'][good] += nb_ * st['std'][good]**2 + delta**2 * na * nb_ / ntot
+            mom['count'][good] = ntot
+            mom['min'][good] = np.minimum( mom['min'][good], st['min'][good] )
+            mom['max'][good] = np.maximum( mom['max'][good], st['max'][good] )
+
+            for ii in good:
+                sketches[ii].update( ybuf[offsets[ii]:offsets[ii+1]] )
+
+        retval._moments = mom
+        retval._sketches = sketches
+        retval.y0 = None
+        return retval
+
+
+    @classmethod
+    def from_summary( cls, grid, q_lo=None, median=None, q_hi=None, min=None, max=None, mean=None, std=None, count=None, quantiles=(0.25, 0.75), curve=None, point=None, line=None, region=None ):
+        """
+        Create a BoxWhiskerPlot from statistics that have already been
+        computed for each bin, so the raw data are not needed.
+        
+        >>> b = BoxWhiskerPlot.from_summary( grid, q_lo, median, q_hi, ymin, ymax )
+        >>> b.plot()
+        
+        The grid is the list of (low, high) X bins and the other 
+        arrays have one value per bin.  The mean, std, and count are
+        optional; without a mean no point is drawn, without a std
+        sdev is not drawn, and without the counts every bin is
+        plotted (bins with a count of 0 are skipped).
+        
+        The statistics can also be read from a table with columns
+        xlo, xhi, q_lo, median, q_hi, min, max, and optionally mean, 
+        std, and count.  CSV files need a header row of column names.
+        
+        >>> b = BoxWhiskerPlot.from_summary( "stats.fits" )
+        >>> b = BoxWhiskerPlot.from_summary( "stats.csv", quantiles=(0.1,0.9) )
+        
+        The quantiles give the fractions that q_lo and q_hi represent;
+        plot must be called with the same qlo and qhi.  
+        
+        The grid cannot be changed with set_grid and options that need
+        the raw data (notch, whis) are not available.  Coloring and 
+        the other set_* methods work as usual.
+        """
+        if isinstance( grid, str ):
+            cols = _read_summary( grid )
+            grid = list(zip( cols["xlo"], cols["xhi"] ))
+            q_lo, median, q_hi = cols["q_lo"], cols["median"], cols["q_hi"]
+            min, max = cols["min"], cols["max"]
+            mean, std, count = cols.get("mean"), cols.get("std"), cols.get("count")
+            
+        if any( x is None for x in [q_lo, median, q_hi, min, max] ):
+            raise ValueError("q_lo, median, q_hi, min, and max must be specified")
+
+        retval = cls.__new__(cls)
+        retval._init_plot_state( curve, point, line, region )
+        retval._check_grid( grid )
+        retval.grid = [ (l,h) for l,h in grid ]
+
+        nb = len(retval.grid)
+        stats = _empty_statistics( nb, 2 )
+        def _column( vals, name ):
+            vals = np.asarray( vals, dtype=float ).ravel()
+            if vals.size != nb:
+                raise ValueError("{} must have one value per grid bin".format(name))
+            return vals
+
+        stats['count'] = 1 if count is None else _column( count, "count" )
+        for name, vals in [ ("median", median), ("min", min), ("max", max), ("mean", mean), ("std", std) ]:
+            if vals is not None:
+                stats[name] = _column( vals, name )
+        stats['quantiles'][:,0] = _column( q_lo, "q_lo" )
+        stats['quantiles'][:,1] = _column( q_hi, "q_hi" )
+
+        retval._summary = ( tuple(quantiles), stats )
+        retval.y0 = None
+        return retval
 
 
-    def set_grid( self, grid=None, nbin=10 ):
+    @staticmethod
+    def _check_grid( grid ):
+        """
+        Just run some sanity checks
+        """
+        _grid = np.asarray( grid, dtype=float )
+        if _grid.ndim != 2 or _grid.shape[1] != 2:
+            raise ValueError("Grid must be a list of (low, high) pairs")
+        if np.any( _grid[:,1] < _grid[:,0] ):
+            raise ValueError("High grid value cannot be less than low")
+
+
+    def set_grid( self, grid=None, nbin=10, workers=None, mode="equal_width", p0=0.05 ):
         """
         Set the grid for the X-axis.
         
@@ -181,6 +831,23 @@ class BoxWhiskerPlot(LUTPlot):
         The number of bins can be changed using the nbin parameter
         
         >>> b.set_grid(nbin=20)
+
+        For skewed X distributions the bins can be chosen so that
+        each has the same number of values, or so they are equally
+        spaced in log(X) (X must be > 0)
+        
+        >>> b.set_grid(nbin=20, mode="equal_count")
+        >>> b.set_grid(nbin=20, mode="log")
+        
+        The number of bins can also be chosen from the data using 
+        Bayesian Blocks (Scargle et al. 2013) which finds the 
+        optimal piecewise constant density of the X values.  The nbin
+        parameter is ignored; p0 is the false alarm probability used
+        to penalize extra bins.  This is O(N^2) in the number of 
+        distinct X values so it is only practical for up to ~10^4
+        values.
+        
+        >>> b.set_grid(mode="bayesian_blocks")
         
         or an explicity grid can be supplied:
         
@@ -188,48 +855,190 @@ class BoxWhiskerPlot(LUTPlot):
         
         The grid can overlap, have gaps, extend beyond and or not
         include the ends of the data.        
-        """
+        
+        If the data have already been plotted, only the boxes for 
+        bins that changed are redrawn.
 
-        if None == grid:
-            lo=np.min(self.xx)
-            hi=np.max(self.xx)
-            binwidth=(hi-lo+1)/nbin
+        In all modes the bins do not overlap and the last bin includes
+        the max X value.
+        
+        The binning can be done by a pool of worker processes
+        
+        >>> b.set_grid(nbin=200, workers=8)
 
-            _lo = np.arange(nbin)*binwidth
-            _hi = (1+np.arange(nbin))*binwidth
-            grid = list(zip( _lo, _hi ))
+        If workers is not given the current setting is kept; 
+        workers=0 turns them off.
+
+        The grid of an object created from_chunks cannot be changed.
+        """
+        if self.xx is None:
+            raise RuntimeError("The grid can only be changed when the X and Y data are available")
+
+        if grid is None:
+            if mode in ["equal_count", "bayesian_blocks"]:
+                xsorted = self._xsorted if self._xsorted is not None else self.xx
+            else:
+                xsorted = None
+            grid = _edges_to_grid( _grid_edges( self.xx, xsorted, nbin, mode, p0 ))
 
         else:
-            # just run some sanity checks
-            for l,h in grid:
-                if h < l:
-                    raise ValueError("High grid value cannot be less than low")
+            self._check_grid( grid )
         
-        self.grid = grid
-        #self.y0 = dict(zip(self.grid, [None]*len(self.grid)))
-
-        self.y0 = { g:None for g in self.grid }
+        # tuples so they can be used as dictionary keys
+        self.grid = [ (l,h) for l,h in grid ]
+        if workers is not None:
+            self.workers = workers
         self._fill_grid()
         
         if self.lut_plot:
-            self.plot( qlo=self.qlo, qhi=self.qhi, limit=self.limit, mean=self.mean, sdev=self.sdev )
+            self._regrid_plot()
         
 
     def _fill_grid( self ):
         """
         Save the Y values in each X bin.  Data are sorted so that
         that quartiles can be easily extracted.
+        
+        The X values were sorted once, so each bin is a contiguous 
+        range found with searchsorted (this also works when the grid 
+        overlaps or has gaps).  The Y values are also sorted once; 
+        for each grid they are only regrouped by bin (see 
+        _regroup_sorted), or sorted by (bin, y) with a single lexsort
+        if the bins overlap.  They go into one buffer; bin i is 
+        the slice _ybuf[_offsets[i]:_offsets[i+1]].  y0 holds views
+        into that buffer.
         """        
-        for g in self.grid:
-            xlo = g[0]
-            xhi = g[1]
-            rng,=np.where( (self.xx>=xlo) & ( self.xx<xhi ))
-            sz=rng.size
-            if 0 == sz:
-                continue
-            self.y0[g] = self.yy[rng]
-            self.y0[g].sort()
+        self._stats = {}
+        self._notches = {}
+        self._whiskers = {}
+        if self._xorder is None:
+            # Data are sorted by X once; grids only need to find their edges
+            self._xorder = np.argsort( self.xx, kind="mergesort" )
+            self._xsorted = self.xx[self._xorder]
+
+        glo = np.array( [g[0] for g in self.grid], dtype=float )
+        ghi = np.array( [g[1] for g in self.grid], dtype=float )
+        starts, counts, offsets = _bin_ranges( self._xsorted, glo, ghi )
+        self._members = ( starts, counts )
+
+        if self.workers:
+            # Workers compute the statistics directly; see _get_stats
+            self._ybuf = None
+            self._offsets = None
+            self.y0 = None
+            return
+
+        if self._yorder is None:
+            self._yorder = np.argsort( self.yy[self._xorder], kind="mergesort" )
+            self._ysorted = self.yy[ self._xorder[self._yorder] ]
+        self._ybuf = _regroup_sorted( self._yorder, self._ysorted, starts, counts, offsets )
+        if self._ybuf is None:
+            self._ybuf = _sort_into_bins( self._xorder, self._xsorted, self.yy, glo, ghi )[0]
+        self._offsets = offsets
+
+        self.y0 = {}
+        for ii, g in enumerate(self.grid):
+            self.y0[g] = self._ybuf[offsets[ii]:offsets[ii+1]] if counts[ii] else None
+
+
+    def _get_stats( self, qlo, qhi ):
+        """
+        Statistics for all the bins, cached for each set of quantiles
+        so plotting again with different options is free.
+        """
+        key = (qlo, qhi)
+        if self._summary is not None:
+            if key != self._summary[0]:
+                raise ValueError("The summary only has the {} quantiles".format(self._summary[0]))
+            return self._summary[1]
+        if key not in self._stats:
+            if self._sketches is not None:
+                self._stats[key] = self._sketch_statistics( [qlo, qhi] )
+            elif self._ybuf is None:
+                self._stats[key] = _parallel_statistics( self._xorder, self._xsorted, self.yy, self.grid, [qlo, qhi], self.workers )
+            else:
+                self._stats[key] = _bin_statistics( self._ybuf, self._offsets, [qlo, qhi] )
+        return self._stats[key]
+
+
+    def _get_notches( self, n_boot, seed ):
+        """
+        Bootstrap confidence interval on the median of each bin,
+        cached for each n_boot and seed.  
+        """
+        key = (n_boot, seed)
+        if key not in self._notches:
+            ybuf, offsets = self._sorted_bins("Notches")
+            self._notches[key] = _bootstrap_notches( ybuf, offsets, n_boot, seed, workers=self.workers )
+        return self._notches[key]
+
+
+    def _get_whiskers( self, qlo, qhi, whis ):
+        """
+        Whisker ends and fliers, cached for each set of quantiles and
+        whis
+        """
+        key = (qlo, qhi, whis)
+        if key not in self._whiskers:
+            ybuf, offsets = self._sorted_bins("Whiskers")
+            qq = self._get_stats( qlo, qhi )['quantiles']
+            self._whiskers[key] = _tukey_whiskers( ybuf, offsets, qq[:,0], qq[:,1], whis )
+        return self._whiskers[key]
+
+
+    def _sorted_bins( self, what ):
+        """
+        The sorted Y values of all bins and their offsets.  In workers
+        mode they are not kept so they are sorted again.
+        """
+        if self.xx is None:
+            raise RuntimeError("{} need the X and Y values; they cannot be computed from chunks or a summary".format(what))
+        if self._ybuf is not None:
+            return self._ybuf, self._offsets
+
+        glo = np.array( [g[0] for g in self.grid], dtype=float )
+        ghi = np.array( [g[1] for g in self.grid], dtype=float )
+        ybuf, offsets, _ = _sort_into_bins( self._xorder, self._xsorted, self.yy, glo, ghi )
+        return ybuf, offsets
+
+
+    def _sketch_statistics( self, quantiles ):
+        """
+        Statistics from the streaming summaries.  The count, min, max,
+        mean, and std are exact; the median and quantiles come from
+        the quantile sketches.
+        """
+        mom = self._moments
+        retval = _empty_statistics( len(self.grid), len(quantiles) )
+        good, = np.where( mom['count'] > 0 )
+        retval['count'] = mom['count']
+        for f in ['min', 'max', 'mean']:
+            retval[f][good] = mom[f][good]
+        retval['std'][good] = np.sqrt( mom['m2'][good] / mom['count'][good] )
+        for ii in good:
+            qq = self._sketches[ii].quantile( [0.5] + list(quantiles) )
+            qq = np.clip( qq, mom['min'][ii], mom['max'][ii] )
+            retval['median'][ii] = qq[0]
+            retval['quantiles'][ii] = qq[1:]
+        return retval
+
         
+    def _data_extent( self, qlo, qhi ):
+        """
+        The data used to setup the axes.  Without the raw data the
+        ends of the grid and the min/max of the bins are used.
+        """
+        if self.xx is not None:
+            return self.xx, self.yy
+
+        stats = self._get_stats( qlo, qhi )
+        good = stats['count'] > 0
+        if not np.any(good):
+            raise ValueError("There are no values in any of the grid bins")
+        xx = [ min( g[0] for g in self.grid ), max( g[1] for g in self.grid ) ]
+        yy = [ np.min( stats['min'][good] ), np.max( stats['max'][good] ) ]
+        return xx, yy
+
     def _restore_plot( self ):
         """
         Make sure the chips window/frame/plot are set before
@@ -259,6 +1068,7 @@ class BoxWhiskerPlot(LUTPlot):
         if self.all_regions:
             for xx in self.all_regions: 
                 set_region( xx, prop )
+            self._region_colors = {}
             self.region = get_region( self.all_regions[0] )
         else:
             self.region = prop
@@ -352,7 +1162,28 @@ class BoxWhiskerPlot(LUTPlot):
 
 
                 
-    def plot( self, qlo=0.25, qhi=0.75,  limit=True, mean=True, sdev=False) :
+    def set_flier( self, prop ):
+        """
+        Set the properties of the curve used to draw the fliers
+        (see plot's whis option).
+        
+        >>> b.set_flier("symbol.color=red")
+        >>> b.set_flier( { 'symbol.style' : 'cross' })
+        
+        """
+        open_undo_block()
+        self._restore_plot()
+        
+        if self._flier_curve:
+            set_curve( self._flier_curve, prop )
+            self.flier = get_curve( self._flier_curve )
+        else:
+            self.flier = prop
+            
+        close_undo_block()
+
+
+    def plot( self, qlo=0.25, qhi=0.75,  limit=True, mean=True, sdev=False, notch=False, n_boot=1000, seed=None, whis=None) :
         """        
         Box and whiskers plot
         
@@ -376,8 +1207,44 @@ class BoxWhiskerPlot(LUTPlot):
         
         >>> b.plot( mean=False)
         
+        Notches showing the 95% bootstrap confidence interval on the
+        median can be drawn as a narrower region around the median.
+        Boxes whose notches do not overlap have significantly 
+        different medians.  The number of bootstrap resamples and 
+        the random seed can be set
+        
+        >>> b.plot( notch=True )
+        >>> b.plot( notch=True, n_boot=5000, seed=42 )
+        
+        By default the whiskers go from the min to the max value.
+        With whis set they stop at the last value within whis times 
+        the box height (qhi-qlo) of the box, Tukey style, and the 
+        values beyond them are drawn as points (fliers).  All the
+        fliers are drawn as a single curve.
+        
+        >>> b.plot( whis=1.5 )
+        >>> b.set_flier("symbol.color=red")
+
+        whis must be >= 0 (0 puts the whiskers at the box).
+        
+        Notches and whis require the X and Y values; they are not
+        available when the plot was made with from_chunks or
+        from_summary (a RuntimeError is raised before the plot is
+        changed).  If workers were given, the bins are resampled in
+        a pool of threads.
         
         """
+        if whis is not None:
+            try:
+                whis = float(whis)
+            except (TypeError, ValueError):
+                whis = np.nan
+            if not whis >= 0:
+                raise ValueError("whis must be a number >= 0")
+        if ( notch or whis is not None ) and self.xx is None:
+            raise RuntimeError("Notches and whis need the X and Y values; they cannot be computed from chunks or a summary")
+
+        xd, yd = self._data_extent( qlo, qhi )
 
         open_undo_block()
 
@@ -388,74 +1255,201 @@ class BoxWhiskerPlot(LUTPlot):
             pass
 
         # setup axes
-        add_curve( self.xx, self.yy, "stem=delme line.style=none symbol.style=none")
-        delete_curve(self._get_current_object_name("Curve"))
+        delname = self._new_id("delme")
+        add_curve( xd, yd, "id={} line.style=none symbol.style=none".format(delname))
+        delete_curve(delname)
 
         # save plot info
-        self.lut_win = self._get_current_object_name("Window")
-        self.lut_frame = self._get_current_object_name("Frame")
-        self.lut_plot = self._get_current_object_name("Plot")
-
-        self.all_regions = []
-        self.all_points = []
-        self.all_lines = []
-        self.all_curves = []
-    
+        self.lut_win, self.lut_frame, self.lut_plot = self._get_window_info()
+
         self.qlo = qlo
         self.qhi = qhi
         self.limit = limit
         self.mean = mean
         self.sdev = sdev
+        self.notch = notch
+        self.n_boot = n_boot
+        self.seed = seed
+        self.whis = whis
         
-        self.grid_regions = {}
-    
-        for g in self.grid:
+        self._bin_objects = {}
+        self._draw_bins( self.grid )
+        self._draw_fliers()
+
+        close_undo_block()
+
+
+    def _drawn_values( self ):
+        """
+        The statistics, notches, and whisker ends that are drawn for
+        each bin.
+        """
+        stats = self._get_stats( self.qlo, self.qhi )
+        notches = self._get_notches( self.n_boot, self.seed ) if self.notch else None
+        if self.whis is not None:
+            wlo, whi = self._get_whiskers( self.qlo, self.qhi, self.whis )[:2]
+        else:
+            wlo, whi = stats['min'], stats['max']
+        return stats, notches, wlo, whi
+
+
+    def _bin_keys( self ):
+        """
+        A key for each grid bin made from its edges, its rows in the
+        sorted X values, and everything drawn for it, so bins with 
+        the same key have the same plot objects.
+        """
+        stats, notches, wlo, whi = self._drawn_values()
+        nbin = len(self.grid)
+        starts, counts = self._members if self._members is not None else ( np.full(nbin, -1), stats['count'] )
+        cols = [ np.asarray( self.grid, dtype=float ), starts, counts, wlo, whi, 
+                 stats['median'], stats['mean'], stats['std'], stats['quantiles'] ]
+        if notches is not None:
+            cols.append( notches )
+        table = np.column_stack( [ np.asarray( c, dtype=float ).reshape(nbin,-1) for c in cols ] )
+        return [ row.tobytes() for row in table ]
+
+
+    def _draw_bins( self, bins ):
+        """
+        Create the plot objects for the listed grid bins.  The ids of
+        the objects are saved for each bin, with its key (see 
+        _bin_keys), so that individual bins can be removed or 
+        replaced later.
+        """
+        stats, notches, wlo, whi = self._drawn_values()
+        keys = self._bin_keys()
+        index = dict( (g,ii) for ii,g in enumerate(self.grid) )
+
+        for g in bins:
+            st = stats[index[g]]
+            if 0 == st['count']:
+                continue
+
             xlo = g[0]
             xhi = g[1]
-            y0 = self.y0[g]
-            if y0 is None:
-                continue
-            sz = len(y0)
-            if 0 == sz:
-                continue
-            
-            # TODO move this into the fill grid method?  qlo and qhi
-            # would need to move to different i/f
-            q000=np.min(y0)
-            q100=np.max(y0)
-            q050=np.median(y0)
-            qmid=np.mean(y0)
-            qstd =np.std(y0)
-            q033=y0[np.max([int(qlo*sz+0.5),0])]
-            q066=y0[np.min([int(qhi*sz+0.5),sz-1])]
+            q000=wlo[index[g]]
+            q100=whi[index[g]]
+            q050=st['median']
+            qmid=st['mean']
+            qstd=st['std']
+            q033,q066=st['quantiles']
             xmid = (xhi+xlo)/2.0
 
-            self.grid_regions[g] = []
+            objs = { 'region' : [], 'point' : [], 'line' : [], 'curve' : [], 'key' : keys[index[g]] }
+            self._bin_objects[g] = objs
         
             if q033 != q050:
-                add_region( [xlo, xhi, xhi, xlo], [q033, q033, q050, q050], self.region )
-                self.all_regions.append( self._get_current_object_name("Region"))
-                self.grid_regions[g].append(self._get_current_object_name("Region"))
+                rid = self._new_id("bwregion")
+                add_region( [xlo, xhi, xhi, xlo], [q033, q033, q050, q050], _with_id(self.region, rid) )
+                objs['region'].append( rid )
 
             if q050 != q066:
-                add_region( [xlo, xhi, xhi, xlo], [q050, q050, q066, q066], self.region )
-                self.all_regions.append( self._get_current_object_name("Region"))
-                self.grid_regions[g].append(self._get_current_object_name("Region"))
-
-            if True == mean:
-                add_point( xmid, qmid, self.point )
-                self.all_points.append(self._get_current_object_name("Point"))
-            if True == limit:
-                add_line( xmid, q000, xmid, q100 )
-                self.all_lines.append(self._get_current_object_name("Line"))
-            if True == sdev:
-                add_curve( [xmid], [qmid], [qstd], self.curve )
-                self.all_curves.append(self._get_current_object_name("Curve"))
+                rid = self._new_id("bwregion")
+                add_region( [xlo, xhi, xhi, xlo], [q050, q050, q066, q066], _with_id(self.region, rid) )
+                objs['region'].append( rid )
+
+            if notches is not None:
+                nlo, nhi = notches[index[g]]
+                if nlo != nhi:
+                    nx0 = xlo + (xhi-xlo)/4.0
+                    nx1 = xhi - (xhi-xlo)/4.0
+                    rid = self._new_id("bwnotch")
+                    add_region( [nx0, nx1, nx1, nx0], [nlo, nlo, nhi, nhi], _with_id(self.region, rid) )
+                    objs['region'].append( rid )
+
+            if True == self.mean and np.isfinite(qmid):
+                pid = self._new_id("bwpoint")
+                add_point( xmid, qmid, _with_id(self.point, pid) )
+                objs['point'].append( pid )
+            if True == self.limit:
+                lid = self._new_id("bwline")
+                add_line( xmid, q000, xmid, q100, _with_id(self.line, lid) )
+                objs['line'].append( lid )
+            if True == self.sdev and np.isfinite(qmid) and np.isfinite(qstd):
+                cid = self._new_id("bwcurve")
+                add_curve( [xmid], [qmid], [qstd], _with_id(self.curve, cid) )
+                objs['curve'].append( cid )
+
+        self._collect_objects()
+
+
+    def _draw_fliers( self ):
+        """
+        Draw all the fliers as one curve.  The curve is replaced 
+        when the grid changes.
+        """
+        if self._flier_curve:
+            delete_curve( self._flier_curve )
+            self._flier_curve = None
+        if self.whis is None:
+            return
+
+        wlo, whi, fbin, fy = self._get_whiskers( self.qlo, self.qhi, self.whis )
+        if 0 == fy.size:
+            return
+        xmid = np.array( [ (g[0]+g[1])/2.0 for g in self.grid ] )
+        self._flier_curve = self._new_id("bwflier")
+        add_curve( xmid[fbin], fy, _with_id(self.flier, self._flier_curve) )
+
+
+    def _collect_objects( self ):
+        """
+        Update the lists of all the objects, in grid order
+        """
+        bins = [ self._bin_objects[g] for g in self.grid if g in self._bin_objects ]
+        self.all_regions = [ r for b in bins for r in b['region'] ]
+        self.all_points = [ r for b in bins for r in b['point'] ]
+        self.all_lines = [ r for b in bins for r in b['line'] ]
+        self.all_curves = [ r for b in bins for r in b['curve'] ]
+        self.grid_regions = dict( (g, self._bin_objects[g]['region']) for g in self._bin_objects )
+
+
+    def _delete_bin( self, g ):
+        """
+        Delete the plot objects for one grid bin
+        """
+        objs = self._bin_objects.pop(g)
+        for d in objs['region']:
+            delete_region(d)
+            self._region_colors.pop(d, None)
+        for d in objs['line']: delete_line(d)
+        for d in objs['point']: delete_point(d)
+        for d in objs['curve']: delete_curve(d)
+
+
+    def _regrid_plot( self ):
+        """
+        After the grid changes only the bins that changed are redrawn.
+        A bin keeps its plot objects when an old bin has the same key:
+        the same rows of the sorted X values (membership), the same
+        statistics, and the same edges, which the box is drawn across.
+        The other old bins are deleted and the other new bins drawn.
+        """
+        open_undo_block()
+        self._restore_plot()
+
+        old = dict( (objs['key'], g) for g, objs in self._bin_objects.items() )
+        kept = {}
+        for g, key in zip( self.grid, self._bin_keys() ):
+            if key in old and g not in kept:
+                kept[g] = self._bin_objects.pop( old.pop(key) )
+        gone = list( self._bin_objects )
+        for g in gone:
+            self._delete_bin(g)
+        self._bin_objects = kept
+        new = [ g for g in self.grid if g not in kept ]
+        self._draw_bins( new )
+        if gone or new:
+            self._draw_fliers()
+
+        if self.hex_codes:
+            self._apply_colors()
 
         close_undo_block()
 
-        
-    def colorize( self,  filename, cmap=chips_usercmap1, reverse=False, invert=False ):
+
+    def colorize( self,  filename, cmap=chips_usercmap1, reverse=False, invert=False, by="count" ):
         """
         Color each histogram bin based on the number of values in the bin.
         
@@ -470,6 +1464,19 @@ class BoxWhiskerPlot(LUTPlot):
         be updated.  You can specify the full path or if just the
         name it will try to locate the file in common CIAO dirs.
 
+        The bins can be colored by other statistics using the by
+        parameter: "count", "median", "mean", "std", or "iqr" (the 
+        difference between the upper and lower quantiles that are
+        plotted).  
+        
+        >>> b.colorize("bb", by="median")
+        
+        It can also be a function that takes the array of statistics
+        for all the bins (with fields count, min, max, median, mean, 
+        std, and quantiles) and returns one value per bin
+        
+        >>> b.colorize("bb", by=lambda s: s['max']-s['min'])
+
         After the data are color coded a color bar can be attached:
         
         >>> b.add_colorbar()
@@ -491,6 +1498,8 @@ class BoxWhiskerPlot(LUTPlot):
 
         if cmap not in [chips_usercmap1,chips_usercmap2,chips_usercmap3]:
             raise ValueError("Invalid color map selected")
+        if not callable(by) and by not in _colorize_by:
+            raise ValueError("Unknown statistic '{}', must be one of {} or a function".format(by, sorted(_colorize_by)))
 
         rr,gg,bb = get_rgb_values( filename, reverse=reverse, invert=invert )
         self.hex_codes = get_rgb_hexcodes( rr, gg, bb )
@@ -498,38 +1507,57 @@ class BoxWhiskerPlot(LUTPlot):
         self.num_colors = len(self.hex_codes)
         self.filename = filename
         self.cmap = cmap
+        self.by = by
 
-        counts = []
-        for g in self.grid:
-            y0 = self.y0[g]
-            if y0 is None:
-                continue
-            sz = len(y0)
-            if 0 == sz:
-                continue
-            counts.append( sz )
-        cmin = float(min(counts))
-        cmax = float(max(counts))
-        dc = cmax - cmin
+        open_undo_block()
+        self._apply_colors()
+        close_undo_block()
 
-        self.min_z = cmin
-        self.max_z = cmax
+
+    def _color_values( self ):
+        """
+        The statistic used to color each bin, NaN for bins that are
+        not drawn
+        """
+        qlo = self.qlo if self.qlo is not None else 0.25
+        qhi = self.qhi if self.qhi is not None else 0.75
+        stats = self._get_stats( qlo, qhi )
+        by = self.by if callable(self.by) else _colorize_by[self.by]
+
+        vals = np.array( by(stats), dtype=float )
+        if vals.shape != (len(self.grid),):
+            raise ValueError("The statistic must have one value per bin")
+        vals[ stats['count'] == 0 ] = np.nan
+        return vals
+
+
+    def _apply_colors( self ):
+        """
+        Set the region colors from the statistic in each bin.
         
+        The color index for all the bins is computed at once.  The
+        color of each region is remembered so only the regions whose
+        color changed are updated.
+        """
+        vals = self._color_values()
+        good = np.isfinite(vals)
+        if not np.any(good):
+            return
+        vmin = float(np.min(vals[good]))
+        vmax = float(np.max(vals[good]))
+
+        self.min_z = vmin
+        self.max_z = vmax
         
-        for g in self.grid:
-            y0 = self.y0[g]
-            if y0 is None:
-                continue
-            sz = len(y0)
-            if 0 == sz:
-                continue
-            
-            nn = (sz-cmin)/(dc) if dc > 0 else 0.5
-            ii = int(np.floor(self.num_colors * nn))
-            ii = ii-1 if ii == self.num_colors else ii
-            
-            for rr in self.grid_regions[g]:
-                set_region(rr, "*.color={}".format( self._get_color_code( ii) ))
+        idx = quantize( vals[good], self.num_colors, vmin, vmax )
+
+        codes = [ self._get_color_code(ii) for ii in idx ]
+        bins = [ g for g, ok in zip( self.grid, good ) if ok ]
+        for g, code in zip( bins, codes ):
+            for rr in self.grid_regions.get(g, []):
+                if self._region_colors.get(rr) != code:
+                    set_region(rr, "*.color={}".format( code ))
+                    self._region_colors[rr] = code
         
         if self.image:
             al = get_region(self.all_regions[0]).opacity
@@ -551,14 +1579,12 @@ class BoxWhiskerPlot(LUTPlot):
         open_undo_block()
         
         self._restore_plot()
-        if self.all_regions:
-            for d in self.all_regions: delete_region(d)
-        if self.all_lines:
-            for d in self.all_lines: delete_line(d)
-        if self.all_points:
-            for d in self.all_points: delete_point(d)
-        if self.all_curves:
-            for d in self.all_curves: delete_curve(d)
+        for g in list(self._bin_objects):
+            self._delete_bin(g)
+        self._collect_objects()
+        if self._flier_curve:
+            delete_curve( self._flier_curve )
+            self._flier_curve = None
 
         close_undo_block()
 
@@ -0,0 +1,493 @@
+#
+#  Copyright (C) 2026  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+from __future__ import absolute_import, print_function
+
+"""
+Search a library of color lookup tables by their perceptual properties
+
+A catalog is built from the LUT files listed in the ds9, ImageJ and
+XImage parameter files (lut.par, imagej_lut.par, ximage_lut.par) and/or
+directories of .lut files.  Each table is converted to CIE L*a*b*
+and a set of metrics is computed for all the tables at once:
+
+  monotonic      True if the lightness (L*) only increases or decreases
+  monotonicity   fraction of the steps in L* that go the same way
+  delta_e        mean color difference (CIE76 dE) between neighboring
+                 colors, with the table resampled to 256 colors
+  delta_e_min    smallest neighboring dE
+  delta_e_max    largest neighboring dE
+  uniformity     std/mean of the neighboring dE; 0 is perfectly uniform
+  l_min, l_max   lightness range
+  l_range        l_max - l_min
+  hue_span       range of hue angles (degrees) of the colorful entries
+  grayscale      how well the order survives printing in grayscale:
+                 |L*[-1]-L*[0]| / total L* variation times l_range/100
+  num_colors     number of distinct (8 bit) colors in the file
+
+The catalog is saved as a compressed .npz index so queries need no
+chips window and no LUT files:
+
+>>> cat = build_catalog()
+>>> cat.find_luts( monotonic=True, min_delta_e=0.3 )
+['/soft/ciao/data/gray.lut', ... ]
+
+Any metric can be used with a min_ or max_ prefix
+
+>>> find_luts( min_hue_span=180, max_uniformity=0.5 )
+
+The catalog can also find the tables that look most like a given
+table, and tables that are duplicated in the library
+
+>>> similar_luts( "mycmap.lut", k=5 )
+[('/soft/ciao/data/heat.lut', 1.2), ... ]
+>>> duplicate_luts( tol=1.0 )
+
+find_luts uses a default catalog of the three parameter files which
+is kept in the per-user cache directory and rebuilt when any of the
+files change.
+
+"""
+
+import os
+import numpy as np
+
+
+__all__ = [ "LUTCatalog", "build_catalog", "load_catalog", "find_luts", 
+            "similar_luts", "duplicate_luts" ]
+
+# Memory used by each block of the pairwise distances
+_BLOCK_BYTES = 64*1024*1024
+
+
+_default_sources = [ "lut", "imagej_lut", "ximage_lut" ]
+
+
+def _rgb_to_lab( rgb ):
+    """
+    Convert sRGB values (0 to 1, last axis is r,g,b) to CIE L*a*b*
+    with a D65 white point.
+    """
+    rgb = np.clip( np.asarray( rgb, dtype=float ), 0.0, 1.0 )
+    lin = np.where( rgb <= 0.04045, rgb/12.92, ((rgb+0.055)/1.055)**2.4 )
+    mat = np.array( [[0.4124564, 0.3575761, 0.1804375],
+                     [0.2126729, 0.7151522, 0.0721750],
+                     [0.0193339, 0.1191920, 0.9503041]] )
+    xyz = lin.dot( mat.T ) / np.array( [0.95047, 1.0, 1.08883] )
+
+    eps = (6.0/29.0)**3
+    ff = np.where( xyz > eps, np.cbrt(xyz), xyz/(3*(6.0/29.0)**2) + 4.0/29.0 )
+    lab = np.empty_like( ff )
+    lab[...,0] = 116.0*ff[...,1] - 16.0
+    lab[...,1] = 500.0*( ff[...,0] - ff[...,1] )
+    lab[...,2] = 200.0*( ff[...,1] - ff[...,2] )
+    return lab
+
+
+def _hue_span( lab, chroma_min=10.0 ):
+    """
+    Range of hue angles, in degrees, of the entries with chroma above
+    chroma_min, for each table.  The span is 360 minus the largest
+    gap between the sorted angles (going around the circle).
+    """
+    hue = np.degrees( np.arctan2( lab[...,2], lab[...,1] )) % 360.0
+    chroma = np.hypot( lab[...,1], lab[...,2] )
+    hue = np.where( chroma > chroma_min, hue, np.nan )
+    hue.sort( axis=1 )  # NaN's go to the end
+
+    nvalid = np.sum( np.isfinite(hue), axis=1 )
+    rows = np.arange( hue.shape[0] )
+    gaps = np.diff( hue, axis=1 )
+    gaps[ ~np.isfinite(gaps) ] = 0
+    last = hue[ rows, np.maximum( nvalid-1, 0 ) ]
+    wrap = hue[:,0] + 360.0 - last
+    biggest = np.maximum( np.max( gaps, axis=1 ) if gaps.shape[1] else 0, wrap )
+
+    span = 360.0 - biggest
+    span[ nvalid < 2 ] = 0.0
+    return span
+
+
+def _lut_metrics( lab, num_colors ):
+    """
+    Compute the metrics for all the tables at once; lab has shape
+    (number of tables, number of samples, 3)
+    """
+    dtype = [ ('monotonic', bool), ('monotonicity', float),
+              ('delta_e', float), ('delta_e_min', float), ('delta_e_max', float),
+              ('uniformity', float), ('l_min', float), ('l_max', float),
+              ('l_range', float), ('hue_span', float), ('grayscale', float),
+              ('num_colors', int) ]
+    retval = np.zeros( lab.shape[0], dtype=dtype )
+
+    ll = lab[...,0]
+    dl = np.diff( ll, axis=1 )
+    steps = np.abs(dl) > 1e-3
+    nsteps = np.maximum( np.sum( steps, axis=1 ), 1 )
+    nup = np.sum( steps & (dl > 0), axis=1 )
+    ndown = np.sum( steps & (dl < 0), axis=1 )
+    retval['monotonicity'] = np.maximum( nup, ndown ) / nsteps.astype(float)
+    retval['monotonic'] = ( 0 == nup ) | ( 0 == ndown )
+
+    de = np.sqrt( np.sum( np.diff( lab, axis=1 )**2, axis=2 ))
+    retval['delta_e'] = np.mean( de, axis=1 )
+    retval['delta_e_min'] = np.min( de, axis=1 )
+    retval['delta_e_max'] = np.max( de, axis=1 )
+    retval['uniformity'] = np.std( de, axis=1 ) / np.maximum( retval['delta_e'], 1e-12 )
+
+    retval['l_min'] = np.min( ll, axis=1 )
+    retval['l_max'] = np.max( ll, axis=1 )
+    retval['l_range'] = retval['l_max'] - retval['l_min']
+    retval['hue_span'] = _hue_span( lab )
+
+    total = np.maximum( np.sum( np.abs(dl), axis=1 ), 1e-12 )
+    retval['grayscale'] = np.abs( ll[:,-1]-ll[:,0] ) / total * retval['l_range'] / 100.0
+    retval['num_colors'] = num_colors
+    return retval
+
+
+def _resolve_sources( sources ):
+    """
+    Expand the parameter file names and directories into a sorted
+    list of LUT files (duplicate paths removed)
+    """
+    from glob import glob
+
+    if isinstance( sources, str ):
+        sources = [ sources ]
+
+    files = []
+    for src in sources:
+        if os.path.isdir( src ):
+            files.extend( glob( os.path.join( src, "*.lut" )))
+        elif src.endswith(".lut") or os.path.isfile( src ):
+            files.append( src )
+        else:
+            from ._cache import par_luts
+            files.extend( par_luts( src.replace(".par","") ))
+
+    return sorted( set( files ))
+
+
+class LUTCatalog(object):
+    """
+    The metrics of a set of color lookup tables.
+
+    names holds the LUT file names, metrics a structured array
+    with one row per table (see the module help for the fields) and
+    lab the tables resampled to the same length in CIE L*a*b*.
+
+    >>> cat = build_catalog( "/soft/ciao/data/" )
+    >>> cat.find_luts( monotonic=True )
+    >>> cat.metrics[ cat.index("/soft/ciao/data/hsv.lut") ]['hue_span']
+
+    """
+
+    def __init__( self, names, metrics, lab, mtimes=None, hashes=None ):
+        self.names = list(names)
+        self.metrics = metrics
+        self.lab = lab
+        self.mtimes = mtimes if mtimes is not None else np.zeros( len(self.names) )
+        self.hashes = hashes if hashes is not None else np.array( [""]*len(self.names) )
+
+
+    def __len__( self ):
+        return len(self.names)
+
+
+    def index( self, name ):
+        """
+        Row of a table in the catalog
+        """
+        return self.names.index( name )
+
+
+    def save( self, filename ):
+        """
+        Write the catalog to a compressed .npz file
+        """
+        np.savez_compressed( filename, names=np.array(self.names),
+            metrics=self.metrics, lab=self.lab.astype(np.float32),
+            mtimes=self.mtimes, hashes=self.hashes )
+
+
+    def is_current( self ):
+        """
+        True if none of the LUT files have changed since the catalog
+        was made
+        """
+        from ._cache import _mtime
+        mtimes = np.array( [ _mtime(n) or 0.0 for n in self.names ] )
+        return np.array_equal( mtimes, self.mtimes )
+
+
+    def find_luts( self, sort_by=None, **criteria ):
+        """
+        Return the names of the tables that meet all the criteria.
+
+        monotonic=True/False selects on lightness monotonicity.
+        Any other metric can be limited with min_<metric> or
+        max_<metric>
+
+        >>> cat.find_luts( monotonic=True, min_delta_e=0.3, max_uniformity=0.5 )
+        >>> cat.find_luts( min_num_colors=200, sort_by="-l_range" )
+
+        The results can be sorted by a metric (prefix with - for
+        largest first); tables with the same value stay in catalog
+        order.
+        """
+        fields = self.metrics.dtype.names
+        keep = np.ones( len(self.names), dtype=bool )
+        for key, val in criteria.items():
+            if key in fields:
+                keep &= ( self.metrics[key] == val )
+            elif key.startswith("min_") and key[4:] in fields:
+                keep &= ( self.metrics[key[4:]] >= val )
+            elif key.startswith("max_") and key[4:] in fields:
+                keep &= ( self.metrics[key[4:]] <= val )
+            else:
+                raise ValueError("Unknown criteria '{}'".format(key))
+
+        rows, = np.where( keep )
+        if sort_by:
+            field = sort_by.lstrip("-")
+            if field not in fields:
+                raise ValueError("Unknown metric '{}'".format(field))
+            vals = self.metrics[field][rows]
+            if sort_by.startswith("-"):
+                # largest first, ties kept in catalog order
+                order = ( len(vals)-1 - np.argsort( vals[::-1], kind="mergesort" ))[::-1]
+            else:
+                order = np.argsort( vals, kind="mergesort" )
+            rows = rows[order]
+
+        return [ self.names[ii] for ii in rows ]
+
+
+    def distances( self, lut, reverse=False ):
+        """
+        Mean color difference (CIE76 dE, averaged over the samples)
+        between a table and every table in the catalog, computed
+        with one array operation.  lut is anything get_rgb_values
+        accepts (a file name or an (r,g,b) tuple).  With reverse=True
+        the reversed table is also tried and the smaller distance
+        is used.
+        """
+        from ._utils import get_rgb_values
+
+        rgb = np.column_stack( get_rgb_values( lut ) )
+        nn = self.lab.shape[1]
+        xx = np.linspace( 0, 1, nn )
+        pos = np.linspace( 0, 1, len(rgb) )
+        qq = _rgb_to_lab( np.column_stack( [ np.interp( xx, pos, rgb[:,jj] ) for jj in range(3) ] ))
+
+        lab = self.lab.astype(float)
+        dist = np.mean( np.sqrt( np.sum( (lab - qq)**2, axis=2 )), axis=1 )
+        if reverse:
+            rdist = np.mean( np.sqrt( np.sum( (lab - qq[::-1])**2, axis=2 )), axis=1 )
+            dist = np.minimum( dist, rdist )
+        return dist
+
+
+    def similar( self, lut, k=5, reverse=False ):
+        """
+        The k tables closest to lut, as a list of (name, distance)
+        with the closest first (ties in catalog order).  See
+        distances.  k must be at least 1.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        dist = self.distances( lut, reverse=reverse )
+        k = min( k, len(dist) )
+        cut = np.partition( dist, k-1 )[k-1]
+        best, = np.where( dist <= cut )
+        best = best[ np.argsort( dist[best], kind="mergesort" ) ][:k]
+        return [ (self.names[ii], float(dist[ii])) for ii in best ]
+
+
+    def duplicates( self, tol=None ):
+        """
+        Groups of tables that are the same.  Files with identical
+        contents (same hash) are always grouped.  With tol, tables
+        whose mean dE (see distances) is less than tol are also 
+        grouped; the pairwise distances are computed in blocks of 
+        rows to limit the memory used.
+        
+        Returns a list of lists of names.
+        """
+        num = len(self.names)
+        parent = np.arange( num )
+
+        def _find( ii ):
+            while parent[ii] != ii:
+                parent[ii] = parent[parent[ii]]
+                ii = parent[ii]
+            return ii
+
+        def _union( ii, jj ):
+            ri, rj = _find(ii), _find(jj)
+            if ri != rj:
+                parent[ max(ri,rj) ] = min(ri,rj)
+
+        # Exact duplicates
+        hashes = np.asarray( self.hashes )
+        order = np.argsort( hashes, kind="mergesort" )
+        same, = np.where( hashes[order][1:] == hashes[order][:-1] )
+        for ss in same:
+            if hashes[order[ss]]:
+                _union( order[ss], order[ss+1] )
+
+        # Near duplicates
+        if tol is not None and num > 1:
+            lab = self.lab.astype(float)
+            per_block = max( 1, _BLOCK_BYTES // ( lab[0].nbytes * num ))
+            for lo in range( 0, num, per_block ):
+                blk = lab[lo:lo+per_block]
+                dist = np.mean( np.sqrt( np.sum( (blk[:,np.newaxis] - lab[np.newaxis])**2, axis=3 )), axis=2 )
+                ii, jj = np.where( dist < tol )
+                for aa, bb in zip( ii+lo, jj ):
+                    if aa < bb:
+                        _union( aa, bb )
+
+        groups = {}
+        for ii in range(num):
+            groups.setdefault( _find(ii), [] ).append( self.names[ii] )
+        return [ gg for gg in groups.values() if len(gg) > 1 ]
+
+
+def build_catalog( sources=None, filename=None, samples=256 ):
+    """
+    Compute the metrics of all the LUT files in the sources:
+    parameter file names ("lut", "imagej_lut", "ximage_lut"),
+    directories, or file names.  The default is the three parameter
+    files.
+
+    >>> cat = build_catalog()
+    >>> cat = build_catalog( ["lut", "/home/me/my_luts/"], "mine.npz" )
+
+    Each table is read once and resampled to samples colors; the
+    metrics are then computed for all the tables together.  If a
+    filename is given the catalog is saved there.
+    """
+    from ._utils import get_rgb_values
+    from ._cache import content_hash, _mtime
+
+    names = _resolve_sources( _default_sources if sources is None else sources )
+    if 0 == len(names):
+        raise ValueError("No color lookup tables found")
+
+    xx = np.linspace( 0, 1, samples )
+    rgb = np.empty( (len(names), samples, 3) )
+    num_colors = np.empty( len(names), dtype=int )
+    for ii, nn in enumerate( names ):
+        tab = np.column_stack( get_rgb_values( nn ) )
+        pos = np.linspace( 0, 1, len(tab) )
+        rgb[ii] = np.column_stack( [ np.interp( xx, pos, tab[:,jj] ) for jj in range(3) ] )
+        codes = np.round( tab*255 ).astype(np.int64).dot( [65536, 256, 1] )
+        num_colors[ii] = np.unique( codes ).size
+
+    lab = _rgb_to_lab( rgb )
+    mtimes = np.array( [ _mtime(n) or 0.0 for n in names ] )
+    hashes = np.array( [ content_hash(n) if os.path.isfile(n) else "" for n in names ] )
+    retval = LUTCatalog( names, _lut_metrics( lab, num_colors ), lab, mtimes, hashes )
+    if filename:
+        retval.save( filename )
+    return retval
+
+
+def load_catalog( filename ):
+    """
+    Read a catalog saved by build_catalog
+
+    >>> cat = load_catalog( "mine.npz" )
+    """
+    with np.load( filename ) as npz:
+        return LUTCatalog( [str(n) for n in npz["names"]], npz["metrics"],
+            npz["lab"], npz["mtimes"], npz["hashes"] )
+
+
+def _default_catalog():
+    """
+    The catalog of the ds9, ImageJ, and XImage tables, kept in the
+    cache directory and rebuilt when the files change.
+    """
+    from ._cache import cache_dir
+
+    dd = cache_dir()
+    filename = os.path.join( dd, "catalog.npz" ) if dd else None
+    if filename and os.path.exists( filename ):
+        try:
+            cat = load_catalog( filename )
+            if cat.is_current() and cat.names == _resolve_sources( _default_sources ):
+                return cat
+        except Exception:
+            pass
+
+    cat = build_catalog()
+    if filename:
+        try:
+            cat.save( filename )
+        except (IOError, OSError):
+            pass
+    return cat
+
+
+def _get_catalog( catalog ):
+    if catalog is None:
+        return _default_catalog()
+    if isinstance( catalog, str ):
+        return load_catalog( catalog )
+    return catalog
+
+
+def similar_luts( lut, k=5, catalog=None, reverse=False ):
+    """
+    Find the k tables in the catalog that look most like lut (a file
+    name or (r,g,b) tuple).  Returns a list of (name, distance), 
+    closest first, where the distance is the mean CIE76 dE between
+    the tables.  With reverse=True, reversed tables also match.
+
+    >>> similar_luts( "from_collaborator.lut" )
+    >>> similar_luts( lut_colors(["black","red","yellow"]), k=3 )
+
+    """
+    return _get_catalog( catalog ).similar( lut, k=k, reverse=reverse )
+
+
+def duplicate_luts( catalog=None, tol=None ):
+    """
+    Groups of tables in the catalog that are the same file contents,
+    or with tol, differ by less than tol mean dE.
+
+    >>> duplicate_luts()
+    >>> duplicate_luts( tol=0.5 )
+
+    """
+    return _get_catalog( catalog ).duplicates( tol=tol )
+
+
+def find_luts( catalog=None, sort_by=None, **criteria ):
+    """
+    Find the color lookup tables that meet the criteria; see
+    LUTCatalog.find_luts.  The default catalog holds the ds9, ImageJ,
+    and XImage tables.
+
+    >>> find_luts( monotonic=True, min_l_range=80 )
+
+    """
+    return _get_catalog( catalog ).find_luts( sort_by=sort_by, **criteria )
@@ -0,0 +1,420 @@
+#
+#  Copyright (C) 2026  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+from __future__ import absolute_import, print_function
+
+"""
+Map data values to RGB colors using a color lookup table
+
+This does not use chips; the result is an array of 8 bit colors
+that can be written out or used by other packages.
+
+>>> rgb = apply_lut( img, "heat" )
+>>> rgb.shape
+(1024, 1024, 3)
+
+The values are split into the same color bins that LUTPlot and
+BoxWhiskerPlot use, with the same z scales
+
+>>> rgb = apply_lut( img, "bb", vmin=1, vmax=1000, scale="log" )
+
+An alpha channel can be added; NaN's (and values outside the scale,
+eg <= 0 for log) are given the bad color which is transparent by
+default
+
+>>> rgba = apply_lut( img, "bb", alpha=True )
+
+For repeated calls, load the table once and reuse the output array
+
+>>> tab = lut_table( "bb" )
+>>> out = np.empty( img.shape+(3,), dtype=np.uint8 )
+>>> for img in images:
+...     apply_lut( img, tab, vmin=0, vmax=100, out=out )
+
+Images too large to fit in memory can be colorized a block of rows
+at a time straight to a PNG, PPM, .npy, or raw file
+
+>>> colorize_image( "mosaic.fits", "mosaic.png", "heat", scale="log", workers=4 )
+
+"""
+
+import os
+import zlib
+import struct
+
+import numpy as np
+
+from ._utils import get_rgb_values, get_z_edges, quantize, _check_scale, _data_range, _scale_transforms
+
+
+__all__ = [ "apply_lut", "colorize_image", "lut_table" ]
+
+
+def lut_table( lut, alpha=False, bad=(0,0,0,0), reverse=False, invert=False ):
+    """
+    Load a color lookup table as an array of 8 bit colors, shape
+    (number of colors + 1, 3) or (number of colors + 1, 4) with
+    alpha.  The last row is the bad color.
+
+    lut is anything get_rgb_values accepts: a file name, the name
+    of a CIAO/ds9 table, or an (r,g,b) tuple of values 0 to 1.
+
+    >>> tab = lut_table( "heat" )
+    >>> tab = lut_table( lut_colors(["black","red","white"]), alpha=True )
+
+    """
+    rgb = np.column_stack( get_rgb_values( lut, reverse=reverse, invert=invert ))
+    ncol = 4 if alpha else 3
+    retval = np.empty( (len(rgb)+1, ncol), dtype=np.uint8 )
+    retval[:-1,:3] = np.clip( np.round( rgb*255 ), 0, 255 )
+    if alpha:
+        retval[:-1,3] = 255
+    retval[-1] = bad[:ncol]
+    return retval
+
+
+def _lut_index( values, ncolors, vmin, vmax, scale, edges=None ):
+    """
+    The row of the color table for each value; the bad color is
+    ncolors.  The adaptive scales need the lower edges of the color
+    bins (from get_z_edges).
+    """
+    if scale in _scale_transforms:
+        idx = quantize( values, ncolors, vmin, vmax, scale=scale )
+    else:
+        idx = np.searchsorted( edges, values, side="right" ) - 1
+        np.clip( idx, 0, ncolors-1, out=idx )
+        idx[ ~np.isfinite(values) ] = -1
+    idx[ idx < 0 ] = ncolors
+    return idx
+
+
+def _check_range( vmin, vmax ):
+    if not float(vmin) <= float(vmax):
+        raise ValueError("vmin must be <= vmax")
+
+
+def apply_lut( values, lut, vmin=None, vmax=None, scale="linear", out=None, alpha=False, bad=(0,0,0,0) ):
+    """
+    Map an array of values to colors.  Returns an array of 8 bit
+    colors with shape values.shape+(3,), or values.shape+(4,) with
+    alpha.
+
+    lut can be a table returned by lut_table (in which case alpha
+    and bad are taken from it) or anything lut_table accepts.
+
+    vmin and vmax default to the range of the values (that can be
+    represented with the scale); a ValueError is raised if vmin is
+    greater than vmax.  Values below vmin get the first color and
+    values above vmax the last.  The scales are the same as
+    LUTPlot.plot: linear, log, sqrt, asinh, histeq and quantile.
+
+    The color index of every value is computed with array operations
+    and then the colors are looked up with a single np.take, into out
+    if it is given (it must be uint8 with the right shape).
+    """
+    _check_scale( scale )
+
+    if isinstance( lut, np.ndarray ) and lut.dtype == np.uint8 and lut.ndim == 2:
+        table = lut
+    else:
+        table = lut_table( lut, alpha=alpha, bad=bad )
+    ncolors = len(table) - 1
+
+    values = np.asarray( values, dtype=float )
+    if vmin is None or vmax is None:
+        finite = values[ np.isfinite(values) ]
+        vmin, vmax = _data_range( finite, scale, vmin, vmax )
+    _check_range( vmin, vmax )
+
+    edges = None
+    if scale not in _scale_transforms:
+        finite = values[ np.isfinite(values) ]
+        edges, _, _, _ = get_z_edges( finite, ncolors, scale=scale, zmin=vmin, zmax=vmax )
+    idx = _lut_index( values, ncolors, vmin, vmax, scale, edges )
+
+    if out is None:
+        return np.take( table, idx, axis=0, mode="clip" )
+    if out.dtype != np.uint8 or out.shape != values.shape + (table.shape[1],):
+        raise ValueError("out must be a uint8 array with shape {}".format( values.shape + (table.shape[1],)))
+    np.take( table, idx, axis=0, out=out, mode="clip" )
+    return out
+
+
+#
+# Large images: colorize_image works a block of rows at a time so
+# memory is bounded by the block size, not the image size.
+#
+
+_BLOCK_PIXELS = 1 << 20
+_SAMPLE_PIXELS = 1 << 22
+
+_fits_dtypes = { 8 : ">u1", 16 : ">i2", 32 : ">i4", 64 : ">i8", -32 : ">f4", -64 : ">f8" }
+
+
+def _read_fits_header( fp ):
+    """
+    The keywords of the next FITS header, as strings.  Only the 
+    structural and scaling keywords are used so string values are
+    not parsed properly.
+    """
+    cards = {}
+    while True:
+        block = fp.read( 2880 )
+        if len(block) < 2880:
+            return None
+        for ii in range( 0, 2880, 80 ):
+            card = block[ii:ii+80].decode( "ascii", "replace" )
+            key = card[:8].strip()
+            if "END" == key:
+                return cards
+            if "= " == card[8:10]:
+                cards[key] = card[10:].split("/")[0].strip().strip("'").strip()
+
+
+def _open_fits( filename ):
+    """
+    Memory map the first 2-D image in a FITS file (the primary array
+    or an IMAGE extension).  Returns the array (rows are NAXIS2) and
+    the BSCALE, BZERO, and BLANK values.
+    """
+    with open( filename, "rb" ) as fp:
+        while True:
+            cards = _read_fits_header( fp )
+            if cards is None:
+                raise ValueError("No 2-D image found in {}".format(filename))
+            start = fp.tell()
+            bitpix = int( cards["BITPIX"] )
+            naxis = int( cards.get( "NAXIS", 0 ))
+            dims = [ int( cards["NAXIS{}".format(ii)] ) for ii in range(1, naxis+1) ]
+
+            is_image = cards.get( "XTENSION", "IMAGE" ) == "IMAGE"
+            if is_image and naxis >= 2 and all( 1 == d for d in dims[2:] ):
+                break
+
+            size = int( np.prod(dims) ) if naxis else 0
+            size = abs(bitpix)//8 * int( cards.get( "GCOUNT", 1 )) * ( int( cards.get( "PCOUNT", 0 )) + size )
+            fp.seek( start + 2880 * ((size + 2879)//2880) )
+
+    img = np.memmap( filename, dtype=_fits_dtypes[bitpix], mode="r", offset=start, shape=(dims[1], dims[0]) )
+    blank = int( cards["BLANK"] ) if "BLANK" in cards and bitpix > 0 else None
+    return img, float( cards.get( "BSCALE", 1 )), float( cards.get( "BZERO", 0 )), blank
+
+
+def _open_image( infile, shape=None, dtype=None, offset=0 ):
+    """
+    Memory map the input image: a .npy file, a FITS file, or a raw
+    file with the given shape, dtype, and header offset.
+    """
+    if isinstance( infile, np.ndarray ):
+        return infile, 1.0, 0.0, None
+
+    ext = os.path.splitext( infile )[1].lower()
+    if ".npy" == ext:
+        img = np.load( infile, mmap_mode="r" )
+    elif ext in [ ".fits", ".fit", ".fts", ".img" ]:
+        return _open_fits( infile )
+    else:
+        if shape is None or dtype is None:
+            raise ValueError("The shape and dtype of raw image {} must be given".format(infile))
+        img = np.memmap( infile, dtype=dtype, mode="r", offset=offset, shape=tuple(shape) )
+
+    if img.ndim != 2:
+        raise ValueError("{} is not a 2-D image".format(infile))
+    return img, 1.0, 0.0, None
+
+
+class _PNGWriter( object ):
+    """
+    Write an 8 bit RGB or RGBA PNG file a block of rows at a time.
+    Rows use the 'Up' filter, which is cheap to compute for the 
+    whole block and compresses smooth images much better than none.
+    """
+    def __init__( self, filename, nx, ny, nchan, level=6 ):
+        self.fp = open( filename, "wb" )
+        self.zz = zlib.compressobj( level )
+        self.prev = np.zeros( nx*nchan, dtype=np.uint8 )
+        self.fp.write( b"\x89PNG\r\n\x1a\n" )
+        self._chunk( b"IHDR", struct.pack( ">IIBBBBB", nx, ny, 8, 6 if 4 == nchan else 2, 0, 0, 0 ))
+
+    def _chunk( self, tag, data ):
+        self.fp.write( struct.pack( ">I", len(data) ))
+        self.fp.write( tag )
+        self.fp.write( data )
+        self.fp.write( struct.pack( ">I", zlib.crc32( data, zlib.crc32(tag) ) & 0xffffffff ))
+
+    def write( self, rgb ):
+        flat = rgb.reshape( rgb.shape[0], -1 )
+        rows = np.empty( (flat.shape[0], flat.shape[1]+1), dtype=np.uint8 )
+        rows[:,0] = 2
+        np.subtract( flat[:1], self.prev, out=rows[:1,1:] )
+        np.subtract( flat[1:], flat[:-1], out=rows[1:,1:] )
+        self.prev = flat[-1].copy()
+        data = self.zz.compress( rows.tobytes() )
+        if data:
+            self._chunk( b"IDAT", data )
+
+    def close( self ):
+        self._chunk( b"IDAT", self.zz.flush() )
+        self._chunk( b"IEND", b"" )
+        self.fp.close()
+
+
+def _open_output( outfile, ny, nx, nchan ):
+    """
+    A _PNGWriter for .png files, otherwise a writable memory map of
+    shape (ny, nx, nchan): a .npy file, a binary PPM file, or raw
+    bytes.
+    """
+    ext = os.path.splitext( outfile )[1].lower()
+    if ".png" == ext:
+        return _PNGWriter( outfile, nx, ny, nchan )
+    if ".npy" == ext:
+        return np.lib.format.open_memmap( outfile, mode="w+", dtype=np.uint8, shape=(ny, nx, nchan) )
+
+    header = b""
+    if ".ppm" == ext:
+        if 3 != nchan:
+            raise ValueError("PPM files cannot have an alpha channel")
+        header = "P6\n{} {}\n255\n".format( nx, ny ).encode("ascii")
+    with open( outfile, "wb" ) as fp:
+        fp.write( header )
+        fp.truncate( len(header) + ny*nx*nchan )
+    return np.memmap( outfile, dtype=np.uint8, mode="r+", offset=len(header), shape=(ny, nx, nchan) )
+
+
+def colorize_image( infile, outfile, lut, vmin=None, vmax=None, scale="linear", alpha=False, bad=(0,0,0,0), 
+    flip=None, block_rows=None, workers=None, shape=None, dtype=None, offset=0 ):
+    """
+    Colorize an image that may be too large to fit in memory and 
+    write the 8 bit colors to a file.  Returns the (vmin, vmax)
+    used so other images (or a colorbar) can be made to match.
+
+    >>> colorize_image( "mosaic.fits", "mosaic.png", "heat", scale="log", workers=4 )
+    (0.01, 3456.0)
+
+    The input is memory mapped: a .npy file, a FITS file (the first
+    2-D image, BSCALE/BZERO/BLANK applied; compressed files are not
+    supported), an array, or a raw file whose shape (rows, columns),
+    dtype (eg ">f4"), and header offset are given
+
+    >>> colorize_image( "img.dat", "img.ppm", "bb", shape=(40000,40000), dtype="<f4" )
+
+    The output depends on the file name: .png is written as it goes,
+    .npy, .ppm (no alpha), and anything else (raw RGB or RGBA bytes)
+    are memory mapped.
+
+    The lut and scale options are the same as apply_lut.  If vmin or
+    vmax is not given the data range is found with a first pass over 
+    the image; the histeq and quantile scales use the values of a
+    sample of rows (about 4 million values) to set the color bins.
+
+    The image is processed block_rows rows at a time (by default
+    about a million pixels); with workers the blocks are done in a 
+    thread pool, which helps since the numpy operations release the 
+    GIL.  Memory use is a few times the block size per worker.
+
+    flip writes the last row first; it defaults to True for FITS 
+    files whose first row is the bottom of the image.
+    """
+    _check_scale( scale )
+    table = lut if isinstance( lut, np.ndarray ) and lut.dtype == np.uint8 and lut.ndim == 2 else \
+        lut_table( lut, alpha=alpha, bad=bad )
+    ncolors = len(table) - 1
+
+    img, bscale, bzero, blank = _open_image( infile, shape=shape, dtype=dtype, offset=offset )
+    ny, nx = img.shape
+    if flip is None:
+        flip = not isinstance( infile, np.ndarray ) and \
+            os.path.splitext( infile )[1].lower() in [ ".fits", ".fit", ".fts", ".img" ]
+    if block_rows is None:
+        block_rows = max( 1, _BLOCK_PIXELS // max(nx, 1) )
+
+    def get_values( rows ):
+        raw = img[rows]
+        vals = np.array( raw, dtype=float )
+        if blank is not None:
+            vals[ raw == blank ] = np.nan
+        if bscale != 1 or bzero != 0:
+            vals *= bscale
+            vals += bzero
+        return vals
+
+    blocks = [ (r0, min( r0+block_rows, ny )) for r0 in range( 0, ny, block_rows ) ]
+    pool = None
+    if workers and len(blocks) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool( workers )
+    nbatch = workers or 1
+
+    def run( func ):
+        # Only nbatch blocks are in memory at a time, and results
+        # come back in order.
+        for ii in range( 0, len(blocks), nbatch ):
+            batch = blocks[ii:ii+nbatch]
+            for res in ( pool.map( func, batch, chunksize=1 ) if pool else map( func, batch )):
+                yield res
+
+    def block_range( rr ):
+        vals = get_values( slice( *rr ))
+        try:
+            return _data_range( vals[ np.isfinite(vals) ], scale, None, None )
+        except ValueError:
+            return None
+
+    out = None
+    try:
+        edges = None
+        if scale not in _scale_transforms:
+            step = max( 1, ny * nx // _SAMPLE_PIXELS )
+            sample = get_values( slice( 0, ny, step ))
+            edges, _, vmin, vmax = get_z_edges( sample[ np.isfinite(sample) ], ncolors, 
+                scale=scale, zmin=vmin, zmax=vmax )
+        elif vmin is None or vmax is None:
+            ranges = [ r for r in run( block_range ) if r is not None ]
+            if 0 == len(ranges):
+                raise ValueError("No values in {} can be represented with the '{}' scale".format(infile, scale))
+            lo, hi = np.array( ranges ).T
+            vmin, vmax = _data_range( np.array([lo.min(), hi.max()]), scale, vmin, vmax )
+        _check_range( vmin, vmax )
+
+        out = _open_output( outfile, ny, nx, table.shape[1] )
+        is_map = isinstance( out, np.ndarray )
+
+        def do_block( rr ):
+            r0, r1 = rr
+            rows = slice( ny-r0-1, ny-r1-1 if r1 < ny else None, -1 ) if flip else slice( r0, r1 )
+            idx = _lut_index( get_values( rows ), ncolors, vmin, vmax, scale, edges )
+            if is_map:
+                np.take( table, idx, axis=0, out=out[r0:r1], mode="clip" )
+                return None
+            return np.take( table, idx, axis=0, mode="clip" )
+
+        for rgb in run( do_block ):
+            if not is_map:
+                out.write( rgb )
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if isinstance( out, np.memmap ):
+            out.flush()
+        elif out is not None and not isinstance( out, np.ndarray ):
+            out.close()
+
+    return vmin, vmax
@@ -83,6 +83,12 @@ Create a color Look Up Table (LUT) coded plot in Chips.
         >>> zhi = range(1,257)
         >>> zgrid = zip(zlo, zhi)
         >>> lut.plot(x,y,z,zgrid=zgrid)
+
+        The z values can also be binned in log, sqrt, or asinh
+        scaled steps, or with equal numbers of values per color
+        
+        >>> lut.plot(x,y,z,scale="log")
+        >>> lut.plot(x,y,z,scale="histeq")
         
         
     LUTPlot.add_colorbar()
@@ -120,30 +126,88 @@ Create a color Look Up Table (LUT) coded plot in Chips.
         >>> c.symbol.style = 'circle'
         >>> lut.set_curve(c)
     
+    LUTPlot.update_data( x, y, z )
+    
+        Replace the data that were plotted with new values, eg the
+        next time step.  The existing curves are reused.
+        
+        >>> lut.update_data( x1, y1, z1 )
+
     LUTPlot.shuffle()
         
         The shuffle command can be used to shuffle the order curves
         are drawn in which can be useful when the curves overlap.
         
         >>> lut.shuffle()
+
+
+    lut = LUTPlot2D( lut1, lut2 )
+    
+        Color by two variables at once with a 2-D lookup table built
+        from two tables (or loaded from a file).  The same methods
+        are available with z1 and z2 in place of z, plus a 2-D legend.
+        
+        >>> lut = LUTPlot2D( white_to_color("red", num_colors=16),
+        ...                  white_to_color("blue", num_colors=16) )
+        >>> lut.plot( x, y, energy, time, scale=("log","linear") )
+        >>> lut.add_legend( xlabel="energy", ylabel="time" )
         
         
     
 
 """
 
+import itertools
 import numpy as np
 from pychips.advanced import open_undo_block, close_undo_block
 from pychips import *
 from .hexify import color_by_value
-from ._utils import get_rgb_hexcodes, get_rgb_values
+from ._utils import get_rgb_hexcodes, get_rgb_values, get_z_edges, check_zgrid, colorbar_range, quantize, _scale_transforms
+
+__all__ = [ "LUTPlot", "LUTPlot2D" ]
 
-__all__ = [ "LUTPlot" ]
 
+def _with_id( attrs, newid ):
+    """
+    Add the id to the attributes used to create a chips object.  The
+    attributes can be a string, list, dictionary, or a Chips object.
+    """
+    if attrs is None:
+        return "id={}".format(newid)
+    if isinstance( attrs, str ):
+        return "{} id={}".format( attrs, newid )
+    if isinstance( attrs, dict ):
+        retval = dict(attrs)
+        retval["id"] = newid
+        return retval
+    if isinstance( attrs, (list, tuple) ):
+        return list(attrs) + ["id", newid]
 
+    from copy import deepcopy
+    retval = deepcopy(attrs)
+    retval.id = newid
+    return retval
 
 
 
+
+def _z_bins( zz, nn, scale, zmin, zmax ):
+    """
+    The nn color bins of the z values: (tlo, thi, zmin, zmax, quant).
+    For the equally spaced scales quant is (scale, zlo, zhi); the last 
+    bin ends one step past the max so the same quantizer as apply_lut
+    can be used.
+    """
+    tlo, thi, zlo, zhi = get_z_edges( zz, nn, scale=scale, zmin=zmin, zmax=zmax )
+    quant = None
+    if scale in _scale_transforms and zhi > zlo:
+        fwd, inv, _ = _scale_transforms[scale]
+        tmin = fwd(zlo)
+        dt = float( fwd(zhi) - tmin )/(nn-1) if nn > 1 else 1.0
+        quant = ( scale, zlo, inv( tmin + nn*dt ))
+    return tlo, thi, zlo, zhi, quant
+
+
 class LUTPlot(object):
     """
     
@@ -178,6 +242,10 @@ class LUTPlot(object):
     old_frame = None
     old_plot = None
     order = None
+    scale = "linear"
+    colorbar = None
+    _id_prefix = None
+    _id_count = itertools.count(1)
 
 
 
@@ -285,8 +353,8 @@ class LUTPlot(object):
         for ii in range(nn) :
             # Construct the color hex value
             mycol = self._get_color_code( ii) 
-            if self.curves[ii]:
-                set_curve( self.curves[ii], "line.color={0} symbol.color={0}".format(mycol))        
+            for cc in self.curves[ii]:
+                set_curve( cc, "line.color={0} symbol.color={0}".format(mycol))        
 
         self._restore_window()
         close_undo_block()
@@ -305,11 +373,38 @@ class LUTPlot(object):
         return name
 
 
+    @staticmethod
+    def _get_current_object_names( *names ):
+        """
+        Same as _get_current_object_name but for several objects 
+        with a single call to info_current()
+        """
+        ii = info_current().split("\n")
+        retval = []
+        for name in names:
+            ff = [x for x in ii if x.strip().startswith(name)]
+            ff = ff[-1] # last one
+            retval.append( ff.split("[")[1].split("]")[0] )
+        return retval
+
+
+    def _new_id( self, stem ):
+        """
+        Objects are created with explicit ids so we do not have to
+        parse info_current() to find their names.  The ids are the 
+        stem, a number unique to this object, and a counter, eg 
+        lutpoint3_12.
+        """
+        if self._id_prefix is None:
+            self._id_prefix = next( LUTPlot._id_count )
+            self._id_counter = itertools.count(1)
+        return "{}{}_{}".format( stem, self._id_prefix, next(self._id_counter))
+
+
     def _save_limits( self ):
         # We want to save the current axis limits; they get reset when
         # we add an image to the same frame.
-        ax = self._get_current_object_name("X Axis")
-        ay = self._get_current_object_name("Y Axis")    
+        ax, ay = self._get_current_object_names("X Axis", "Y Axis")
         self.axis_names = [ ax, ay ] 
         self.rx = get_axis_range( ax )
         self.ry = get_axis_range( ay )
@@ -323,9 +418,7 @@ class LUTPlot(object):
     def _get_window_info(self):
         """
         """
-        win = self._get_current_object_name("Window") 
-        frame = self._get_current_object_name("Frame") 
-        plot = self._get_current_object_name("Plot") 
+        win, frame, plot = self._get_current_object_names("Window", "Frame", "Plot")
         return (win, frame, plot)
 
 
@@ -350,8 +443,116 @@ class LUTPlot(object):
     def _one(x):
         return 1
 
+
+    def _all_curves( self ):
+        """
+        All the curves plotted; there may be several curves for
+        each color when sizes or thickness vary.
+        """
+        for cc in self.curves:
+            for c in cc:
+                yield c
+
+
+    @staticmethod
+    def _bin_index( zz, tlo, thi ):
+        """
+        Return the index of each point and the index of the bin it 
+        falls in.  Points outside all bins are dropped.
+
+        When the grid is ordered and does not overlap, each point is
+        binned with a single searchsorted.  Overlapping grids fall back
+        to checking each bin so points can be in multiple bins.
+        """
+        if np.all( tlo[1:] >= tlo[:-1] ) and np.all( thi[:-1] <= tlo[1:] ):
+            bidx = np.searchsorted( tlo, zz, side="right" ) - 1
+            keep = bidx >= 0
+            keep[keep] = zz[keep] < thi[bidx[keep]]
+            pidx, = np.where(keep)
+            return pidx, bidx[pidx]
+
+        pidx = []
+        bidx = []
+        for ii in range(len(tlo)):
+            jj, = np.where( (zz >= tlo[ii]) & (zz < thi[ii]))
+            pidx.append(jj)
+            bidx.append( np.full( jj.size, ii, dtype=int ))
+        return np.concatenate(pidx), np.concatenate(bidx)
+
+
+    @classmethod
+    def _z_index( cls, zz, tlo, thi, quant ):
+        """
+        _bin_index using the quantizer when the bins are equally spaced.
+        Round off in the transform can put a value right at an edge
+        one bin off, so those are moved to the bin the edges give.
+        """
+        if quant is None:
+            return cls._bin_index( zz, tlo, thi )
+        scale, zlo, zhi = quant
+        bidx = quantize( zz, len(tlo), zlo, zhi, scale=scale, clip=False )
+        pidx, = np.where( bidx >= 0 )
+        bidx = bidx[pidx]
+        vals = np.asarray( zz, dtype=float )[pidx]
+        bidx -= ( vals < tlo[bidx] ) & ( bidx > 0 )
+        bidx += vals >= thi[bidx]
+        keep = vals >= tlo[bidx]
+        return pidx[keep], bidx[keep]
+
+
+    @staticmethod
+    def _point_values( values, zz ):
+        """
+        The per-point sizes or thickness: None, an array with one
+        value for each data point, a single value, or a callable
+        that takes the z array.  Returns None or a float array.
+        """
+        if values is None:
+            return None
+        if callable(values):
+            values = values(zz)
+        values = np.asarray( values, dtype=float )
+        if values.ndim == 0:
+            return np.full( zz.shape, float(values))
+        if values.shape != zz.shape:
+            raise ValueError("sizes and thickness must have one value for each data point")
+        return values
+
+
+    @staticmethod
+    def _size_classes( pidx, bidx, sizes, thickness, sizefn, thickfn ):
+        """
+        Determine the symbol size and line thickness of each point.
+
+        sizes and thickness are None or arrays with one value per 
+        data point (see _point_values); the arrays are rounded, sizes
+        to integers and thickness to 0.1, so that points are split 
+        into a small number of classes.  Otherwise the sizefn and 
+        thickfn are evaluated for each color bin that has data and 
+        their values are used as is.
+
+        Returns the size and thickness of each class and the class 
+        index of each point.
+        """
+        def _classes( values, fn, rounded ):
+            if values is None:
+                used, idx = np.unique( bidx, return_inverse=True )
+                return [ fn(int(ii)) for ii in used ], idx
+            uniq, idx = np.unique( rounded( values[pidx] ), return_inverse=True )
+            return uniq.tolist(), idx
+
+        usize, isize = _classes( sizes, sizefn, lambda v: np.maximum( np.rint(v), 1 ).astype(int) )
+        uthick, ithick = _classes( thickness, thickfn, lambda v: np.round( v, 1 ) )
+
+        nthick = len(uthick)
+        combo, cidx = np.unique( isize.reshape(-1) * nthick + ithick.reshape(-1), return_inverse=True )
+        csize = [ usize[c // nthick] for c in combo ]
+        cthick = [ uthick[c % nthick] for c in combo ]
+
+        return csize, cthick, cidx.reshape(-1)
+
     
-    def plot( self, xx, yy, zz, stem="lutpoint", zgrid=None, zmin=None, zmax=None, sizefn=lambda x: 1, thickfn=lambda x: 1 ):
+    def plot( self, xx, yy, zz, stem="lutpoint", zgrid=None, zmin=None, zmax=None, sizefn=lambda x: 1, thickfn=lambda x: 1, scale="linear", sizes=None, thickness=None ):
         """
         Plots the X, Y for each Z slice color coded by the LUT
     
@@ -372,90 +573,107 @@ class LUTPlot(object):
         >>> zhi[-1] = 999
         >>> zgrid = zip(zlo,zhi)
         >>> plot(x, y, z, zgrid=zgrid)
+
+        The zgrid can also be an (N,2) array
+        
+        >>> zgrid = np.column_stack( (zlo, zhi) )
+        >>> plot(x, y, z, zgrid=zgrid)
                 
         Note:  The color bar tick labels will not correctly 
         show the arbitrary zgrid values.
 
+        Rather than linear bins, the Z values can be scaled before
+        they are split into bins
+        
+        >>> plot(x, y, z, scale="log")
+        >>> plot(x, y, z, scale="sqrt")
+        >>> plot(x, y, z, scale="asinh")
+
+        or the bins can be chosen so that each color has about the 
+        same number of values, either by histogram equalization 
+        (bin edges are data values) or from interpolated quantiles
+        
+        >>> plot(x, y, z, scale="histeq")
+        >>> plot(x, y, z, scale="quantile")
+        
+        Values that cannot be scaled (eg z <= 0 for log) are not plotted.
+        The color bar is drawn in the scaled values, or in percentiles
+        for histeq and quantile.
+
+
+        The symbol size and line thickness can be set for each 
+        color bin using the sizefn and thickfn functions, which take 
+        the bin index
+        
+        >>> plot(x, y, z, sizefn=lambda i: 1+i//16 )
+
+        or for each data point using the sizes and thickness arrays, 
+        which lets the symbol size show a second variable
+        
+        >>> w = np.random.rand(100)
+        >>> plot(x, y, z, sizes=1+w*10)
+        
+        sizes and thickness can also be functions that are called once
+        with the full z array
+        
+        >>> plot(x, y, z, sizes=lambda z: 1+np.abs(z)/10.0)
 
-        A curve is created for each color.  All the curves have 
+        Per-point sizes are rounded to integers and thickness to 0.1;
+        the values from sizefn and thickfn are used as they are.
+
+        A curve is created for each color, and for each size and 
+        thickness within that color.  All the curves have 
         a name that starts with the prefix "lutpoint" which can
         be changed using the 'stem' argument.
 
         >>> plot(x, y, z, stem="asoldata")
         >>> info()
            ...
-              Curve [asoldata1]
+              Curve [asoldata1_1]
 
 
         """    
         if self.curves:
             raise RuntimeError("The same object cannot be used to plot multiple series")
-            
-        # All commands in the routine are undone with a single undo()
-        open_undo_block()
 
         nn = self.num_colors
-        if not zgrid:
-            # Determine the Z bins to plot; use linear/fixed bin widths
-            self.min_z = min(zz) if zmin is None else zmin
-            self.max_z = max(zz) if zmax is None else zmax
-            dt = float(self.max_z - self.min_z)/(nn-1)
-            tlo = self.min_z + dt* np.arange(nn)
-            thi = tlo  + dt
-            thi[-1] = np.inf  # make sure max value is always included (< vs <= below)
+        quant = None
+        if zgrid is None:
+            # Determine the Z bins to plot
+            tlo, thi, self.min_z, self.max_z, quant = _z_bins( zz, nn, scale, zmin, zmax )
+            self.scale = scale
         else:
-            # check zgrid to make sure is OK
-            if len(zgrid) != self.num_colors:
-                close_undo_block()
-                raise ValueError("zgrid must have same number of elements as number of colors")
-            
-            if not all( [len(zgrid[i]) == 2 for i in range(nn)] ):
-                close_undo_block()
-                raise ValueError("zgrid must have 2 elements in each slot")
+            tlo, thi = check_zgrid( zgrid, nn )
+            self.min_z = tlo[0]
+            self.max_z = thi[-1]
+            self.scale = "linear"
 
-            try:
-                tlo = np.array( [float(zgrid[i][0]) for i in range(nn) ])
-                thi = np.array( [float(zgrid[i][1]) for i in range(nn) ])
-                self.min_z = tlo[0]
-                self.max_z = thi[-1]
-            except:
-                close_undo_block()
-                raise ValueError("All elements of zgrid must be numbers")
-        
-        
+        xx = np.asarray(xx)
+        yy = np.asarray(yy)
+        zz = np.asarray(zz, dtype=float)
+        psizes = self._point_values( sizes, zz )
+        pthick = self._point_values( thickness, zz )
+
+        # All commands in the routine are undone with a single undo()
+        open_undo_block()
 
         #We add a curve w/ no line/symbol just to get axes setup
-        add_curve( xx, yy, "symbol.style=none line.style=none stem=delme")
+        delname = self._new_id("delme")
+        add_curve( xx, yy, "symbol.style=none line.style=none id={}".format(delname))
         self._save_limits()
-        delname = self._get_current_object_name("Curve")
 
         self.lut_win, self.lut_frame,self.lut_plot = self._get_window_info()
 
-        all_curves = []    
-        for ii in range(nn) :
-            # Construct the color hex value
-            mycol = self._get_color_code( ii )
+        self._zbins = (tlo, thi, quant)
+        self._stem = stem
+        self._size_args = (sizes, thickness, sizefn, thickfn)
+        self._groups = {}
 
-            # filter data in i-th range
-            jj, = np.where( (zz >= tlo[ii]) & (zz < thi[ii]))
-            if len(jj) == 0:
-                all_curves.append(None)
-                continue            
-
-            cc = ChipsCurve()
-            cc.stem=stem
-            cc.line.style=None
-            cc.symbol.style="point"
-            cc.symbol.color=mycol
-            cc.line.color=mycol
-            cc.symbol.size=sizefn(ii)
-            cc.line.thickness=thickfn(ii)
-            
-            add_curve( np.array(xx)[jj], np.array(yy)[jj], cc )
-            all_curves.append( self._get_current_object_name("Curve") )
+        for group, rng in self._group_points( zz, psizes, pthick ):
+            self._groups[group] = self._add_group_curve( group, xx[rng], yy[rng] )
     
         # save list of curves plotted
-        self.curves = all_curves 
+        self._sort_curves()
         self.order = 1  # 1st color plotted on bottom
 
         # delete initial curve used to setup axes
@@ -464,6 +682,162 @@ class LUTPlot(object):
         close_undo_block()
 
 
+    def _group_points( self, zz, sizes, thickness ):
+        """
+        Group the points by (color bin, size class) with a single
+        sort on a composite key; each group becomes one curve.
+        sizes and thickness are the per-point values, or None.
+        
+        Returns a list of ((bin, size, thickness), indexes) 
+        """
+        tlo, thi, quant = self._zbins
+        _, _, sizefn, thickfn = self._size_args
+
+        pidx, bidx = self._z_index( zz, tlo, thi, quant )
+        if 0 == pidx.size:
+            return []   # no points in any bin, so no groups (and no key[0])
+
+        csize, cthick, cidx = self._size_classes( pidx, bidx, sizes, thickness, sizefn, thickfn )
+        nclass = len(csize)
+        key = bidx * nclass + cidx
+        order = np.argsort( key, kind="mergesort" )
+        key = key[order]
+        pidx = pidx[order]
+        starts = np.concatenate( ([0], np.flatnonzero(np.diff(key))+1 ))
+        stops = np.append( starts[1:], key.size )
+
+        retval = []
+        for start, stop in zip( starts, stops ):
+            ii, jj = divmod( int(key[start]), nclass )
+            retval.append( ( (ii, csize[jj], cthick[jj]), pidx[start:stop] ))
+        return retval
+
+
+    def _add_group_curve( self, group, xd, yd ):
+        """
+        Add the curve for one (color bin, size, thickness) group
+        """
+        ii, size, thick = group
+        mycol = self._get_color_code( ii )
+
+        cc = ChipsCurve()
+        cc.id=self._new_id(self._stem)
+        cc.line.style=None
+        cc.symbol.style="point"
+        cc.symbol.color=mycol
+        cc.line.color=mycol
+        cc.symbol.size=size
+        cc.line.thickness=thick
+
+        add_curve( xd, yd, cc )
+        return cc.id
+
+
+    def _sort_curves( self, added=() ):
+        """
+        Rebuild the list of curves for each color.  
+        
+        New curves are drawn on top of the others, so when groups
+        have been added the curves from the first new one on are
+        moved to the front (or back if the plot has been shuffled)
+        in order, which puts every curve back in the color order.
+        """
+        groups = sorted( self._groups )
+        all_curves = [ [] for ii in range(self.num_colors) ]
+        for group in groups:
+            all_curves[group[0]].append( self._groups[group] )
+        self.curves = all_curves
+
+        if not added:
+            return
+        restack = groups[ groups.index( min(added) ): ]
+        if 1 == self.order and set(restack) <= set(added):
+            return    # only new curves, already added in order on top
+        where = chips_front if 1 == self.order else chips_back
+        for group in restack:
+            shuffle_curve( self._groups[group], where )
+
+
+    def update_data( self, xx, yy, zz, sizes=None, thickness=None ):
+        """
+        Replace the data plotted with new values
+        
+        >>> lut.plot( x0, y0, z0 )
+        >>> lut.update_data( x1, y1, z1 )
+        
+        The existing curves are reused; their data are replaced in
+        place.  Curves are only added for colors that were empty and
+        deleted for colors that are now empty.  The z bins (and so 
+        the color bar) are not changed so the same color still
+        represents the same z values.  New values below the original
+        minimum z are not shown and values above the maximum use
+        the last color.
+        
+        This is much faster than creating a new LUTPlot which makes
+        it useful for stepping through a time series
+        
+        >>> for t in range(10):
+        ...     lut.update_data( x[t], y[t], z[t] )
+
+        If sizes or thickness arrays were used to plot the data, 
+        new arrays must be supplied for the new data (otherwise a 
+        ValueError is raised).  Functions are reused.
+        """
+        if not self.curves:
+            raise RuntimeError("The data must be plotted before they can be updated")
+
+        xx = np.asarray(xx)
+        yy = np.asarray(yy)
+        zz = np.asarray(zz, dtype=float)
+        if not ( len(xx) == len(yy) == len(zz) ):
+            raise ValueError("X, Y, and Z arrays must be same length")
+
+        old_sizes, old_thick, _, _ = self._size_args
+        if sizes is None:
+            if old_sizes is not None and not callable(old_sizes):
+                raise ValueError("The data were plotted with a sizes array so new sizes must be supplied")
+            sizes = old_sizes
+        if thickness is None:
+            if old_thick is not None and not callable(old_thick):
+                raise ValueError("The data were plotted with a thickness array so new thickness must be supplied")
+            thickness = old_thick
+
+        sizes = self._point_values( sizes, zz )
+        thickness = self._point_values( thickness, zz )
+        self._replace_groups( self._group_points( zz, sizes, thickness ), xx, yy )
+
+
+    def _replace_groups( self, groups, xx, yy ):
+        """
+        Replace the data of the existing curves with the new groups,
+        adding and deleting curves as needed.
+        """
+        from pychips.advanced import set_data
+
+        open_undo_block()
+        self._set_lut_window()
+
+        new_groups = {}
+        added = []
+        for group, rng in groups:
+            if group in self._groups:
+                cc = self._groups.pop(group)
+                set_data( cc, [xx[rng], yy[rng]] )
+            else:
+                cc = self._add_group_curve( group, xx[rng], yy[rng] )
+                added.append( group )
+            new_groups[group] = cc
+
+        for cc in self._groups.values():
+            delete_curve( cc )
+
+        self._groups = new_groups
+        self._sort_curves( added )
+
+        self._restore_window()
+        close_undo_block()
+
+
     def set_curve( self, args ):
         """
         Loop thru curves appling the style to each
@@ -481,9 +855,8 @@ class LUTPlot(object):
         open_undo_block()
         self._set_lut_window()
 
-        for cc in self.curves:
-            if cc:
-                set_curve(cc, args)
+        for cc in self._all_curves():
+            set_curve(cc, args)
 
         self._restore_window()        
         close_undo_block()
@@ -507,7 +880,7 @@ class LUTPlot(object):
             dd = chips_front
             self.order=1
         
-        for cc in self.curves:
+        for cc in self._all_curves():
             shuffle_curve(cc, dd)
 
 
@@ -527,6 +900,8 @@ class LUTPlot(object):
         if self.image:
             raise RuntimeError("Cannot set multiple colorbars")
 
+        self.colorbar = self._new_id("lutcolorbar")
+
 
         open_undo_block()
         self._set_lut_window()
@@ -535,26 +910,28 @@ class LUTPlot(object):
         # We set alpha to all 0 so we don't get an image flahsed on screen
         tmin = self.min_z if self.min_z is not None else 0
         tmax = self.max_z if self.max_z is not None else 1
+        tmin, tmax, label = colorbar_range( self.scale, tmin, tmax )
         cmap = self.cmap if self.cmap else chips_usercmap1
-        add_image( tmin+np.arange(4)*((tmax-tmin)/3.0),2,2,
-            "colormap={0} alpha=[0,0]".format(cmap))
-
 
         # save the image name incase we want to change colormap
-        self.image = self._get_current_object_name("Image") 
+        self.image = self._new_id("lutimage")
+        add_image( tmin+np.arange(4)*((tmax-tmin)/3.0),2,2,
+            "colormap={0} alpha=[0,0] id={1}".format(cmap, self.image))
         set_data_aspect_ratio('')
-        hide_image()
+        hide_image(self.image)
 
         # then we reset alphas back to 1 so colorbar matches plotted data
-        set_image("alpha=[1,1]")
+        set_image(self.image, "alpha=[1,1]")
     
         add_colorbar(1.075,0.5, """orientation=vertical
                     ticklabel.angle=90
                     ticklabel.halign=center
                     label.angle=180
                     label.valign=base
-                    stem=lutcolorbar"""
+                    id={}""".format(self.colorbar)
                 )
+        if label:
+            set_colorbar(self.colorbar, "label.text={}".format(label))
 
         self._restore_limits()
         self._restore_window()
@@ -563,6 +940,296 @@ class LUTPlot(object):
     
 
 
+_mixes = { "multiply" : lambda a, b: a*b,
+           "screen"   : lambda a, b: 1-(1-a)*(1-b),
+           "mean"     : lambda a, b: (a+b)/2.0 }
+
+
+def _rgb_table2d( lut1, lut2=None, nx=None, mix="multiply" ):
+    """
+    The r,g,b values of a 2-D lookup table, an (ny, nx, 3) array.
+
+    With two tables (anything get_rgb_values accepts, eg from 
+    lut_colors) the colors of lut1 (along x) and lut2 (along y) are
+    mixed.  Otherwise lut1 is an (ny, nx, 3) array, a .npy file
+    holding one, or a table of ny*nx colors with x varying fastest; 
+    nx defaults to the square root of the number of colors.
+    """
+    if lut2 is not None:
+        if mix not in _mixes:
+            raise ValueError("mix must be one of {}".format( sorted(_mixes)))
+        c1 = np.column_stack( get_rgb_values( lut1 ))
+        c2 = np.column_stack( get_rgb_values( lut2 ))
+        return np.clip( _mixes[mix]( c1[np.newaxis,:,:], c2[:,np.newaxis,:] ), 0, 1 )
+
+    if isinstance( lut1, str ) and lut1.endswith(".npy"):
+        lut1 = np.load( lut1 )
+    if isinstance( lut1, np.ndarray ) and 3 == lut1.ndim:
+        if 3 != lut1.shape[2]:
+            raise ValueError("A 2-D lookup table must have shape (ny, nx, 3)")
+        return np.asarray( lut1, dtype=float )
+
+    rgb = np.column_stack( get_rgb_values( lut1 ))
+    if nx is None:
+        nx = int( np.round( np.sqrt( len(rgb) )))
+    if nx < 1 or len(rgb) % nx:
+        raise ValueError("The {} colors cannot be split into rows of {}; set nx".format( len(rgb), nx ))
+    return rgb.reshape( -1, nx, 3 )
+
+
+def _pair( value ):
+    """
+    A value for z1 and z2: either the same value or a pair
+    """
+    if isinstance( value, (list, tuple) ):
+        if 2 != len(value):
+            raise ValueError("Expected a value or a pair of values, got {}".format(value))
+        return tuple(value)
+    return (value, value)
+
+
+class LUTPlot2D( LUTPlot ):
+    """
+    A plot where the color of each point shows two values at once,
+    using a 2-D lookup table: z1 picks the column and z2 the row.
+
+    The table can be built from two 1-D tables, whose colors are 
+    multiplied (good for white-to-color ramps), screened (for 
+    black-to-color ramps), or averaged
+    
+        >>> lut = LUTPlot2D( white_to_color("red", num_colors=16),
+        ...                  white_to_color("blue", num_colors=16) )
+        >>> lut = LUTPlot2D( "red", "blue", mix="screen" )
+
+    or loaded from an (ny, nx, 3) array, a .npy file, or a color
+    table of ny*nx colors (x varying fastest)
+
+        >>> lut = LUTPlot2D( "bivariate.npy" )
+        >>> lut = LUTPlot2D( "bivariate.lut", nx=8 )
+
+    Colors are set on the curves directly, so the chips color maps
+    are not used.
+    """
+
+    nx = None
+    ny = None
+    table = None
+    legend = None
+    scale = ("linear", "linear")
+
+
+    def __init__( self, lut1, lut2=None, nx=None, mix="multiply" ):
+        self._set_table( _rgb_table2d( lut1, lut2, nx=nx, mix=mix ))
+        self.filename = lut1
+
+
+    def _set_table( self, table ):
+        self.table = table
+        self.ny, self.nx = table.shape[:2]
+        flat = table.reshape( -1, 3 )
+        self.hex_codes = get_rgb_hexcodes( flat[:,0], flat[:,1], flat[:,2] )
+        self.num_colors = len(self.hex_codes)
+
+
+    def plot( self, xx, yy, z1, z2, stem="lut2dpoint", scale="linear", zmin=None, zmax=None ):
+        """
+        Plot the X, Y values colored by both Z1 and Z2
+
+        >>> lut.plot( x, y, energy, time )
+
+        Each z is split into equally spaced bins between its min and
+        max, one per column (z1) or row (z2) of the table.  The scale,
+        zmin, and zmax can be one value for both or a (z1, z2) pair
+
+        >>> lut.plot( x, y, energy, time, scale=("log", "linear"), zmin=(500, None) )
+
+        The scales are the same as LUTPlot.plot; points whose values 
+        cannot be scaled are not plotted.  One curve is created for 
+        each cell of the table that has points.
+        """
+        if self.curves:
+            raise RuntimeError("The same object cannot be used to plot multiple series")
+
+        xx = np.asarray(xx)
+        yy = np.asarray(yy)
+        z1 = np.asarray(z1, dtype=float)
+        z2 = np.asarray(z2, dtype=float)
+        if not ( len(xx) == len(yy) == len(z1) == len(z2) ):
+            raise ValueError("X, Y, Z1, and Z2 arrays must be same length")
+
+        scales = _pair(scale)
+        self._zbins = [ _z_bins( zz, nn, ss, lo, hi ) for zz, nn, ss, lo, hi in 
+            zip( (z1, z2), (self.nx, self.ny), scales, _pair(zmin), _pair(zmax) ) ]
+        self.scale = scales
+        self.min_z = tuple( zb[2] for zb in self._zbins )
+        self.max_z = tuple( zb[3] for zb in self._zbins )
+
+        open_undo_block()
+
+        delname = self._new_id("delme")
+        add_curve( xx, yy, "symbol.style=none line.style=none id={}".format(delname))
+        self._save_limits()
+        self.lut_win, self.lut_frame,self.lut_plot = self._get_window_info()
+
+        self._stem = stem
+        self._groups = {}
+        for group, rng in self._group_points( z1, z2 ):
+            self._groups[group] = self._add_group_curve( group, xx[rng], yy[rng] )
+
+        self._sort_curves()
+        self.order = 1
+        delete_curve(delname)
+
+        close_undo_block()
+
+
+    def _cell_index( self, z1, z2 ):
+        """
+        The index of the points that are in the table and their cell,
+        row*nx + column.
+        """
+        i1 = np.full( z1.shape, -1, dtype=int )
+        i2 = np.full( z2.shape, -1, dtype=int )
+        for zz, out, (tlo, thi, _, _, quant) in zip( (z1, z2), (i1, i2), self._zbins ):
+            pidx, bidx = self._z_index( zz, tlo, thi, quant )
+            out[pidx] = bidx
+        pidx, = np.where( (i1 >= 0) & (i2 >= 0) )
+        return pidx, i2[pidx] * self.nx + i1[pidx]
+
+
+    def _group_points( self, z1, z2 ):
+        """
+        Group the points by cell.  The number in each cell comes from
+        one bincount of the cell index, and the points are ordered by
+        a stable argsort, which is a radix sort when the cell index
+        fits in 16 bits.
+
+        Returns a list of ((cell, 1, 1), indexes) like LUTPlot.
+        """
+        pidx, cell = self._cell_index( z1, z2 )
+        if 0 == pidx.size:
+            return []
+        if self.num_colors <= 65536:
+            cell = cell.astype( np.uint16 )
+        counts = np.bincount( cell, minlength=self.num_colors )
+        pidx = pidx[ np.argsort( cell, kind="mergesort" ) ]
+        stops = np.cumsum( counts )
+        return [ ( (int(kk), 1, 1), pidx[stops[kk]-counts[kk]:stops[kk]] ) for kk in np.flatnonzero(counts) ]
+
+
+    def update_data( self, xx, yy, z1, z2 ):
+        """
+        Replace the data plotted with new values; the bins (and so
+        the legend) are not changed.
+
+        >>> lut.plot( x0, y0, e0, t0 )
+        >>> lut.update_data( x1, y1, e1, t1 )
+        """
+        if not self.curves:
+            raise RuntimeError("The data must be plotted before they can be updated")
+
+        xx = np.asarray(xx)
+        yy = np.asarray(yy)
+        z1 = np.asarray(z1, dtype=float)
+        z2 = np.asarray(z2, dtype=float)
+        if not ( len(xx) == len(yy) == len(z1) == len(z2) ):
+            raise ValueError("X, Y, Z1, and Z2 arrays must be same length")
+
+        self._replace_groups( self._group_points( z1, z2 ), xx, yy )
+
+
+    def replace_cmap( self, lut1, lut2=None, nx=None, mix="multiply" ):
+        """
+        Change the 2-D lookup table of the plot, which must have the 
+        same number of rows and columns.
+
+        >>> lut.replace_cmap( "red", "green" )
+        """
+        table = _rgb_table2d( lut1, lut2, nx=nx, mix=mix )
+        if not self.curves:
+            raise RuntimeError("You can only replace a color map after it has been plotted")
+        if table.shape != self.table.shape:
+            raise IOError("New lookup table must have the same shape as the previous table")
+
+        open_undo_block()
+        self._set_lut_window()
+
+        self._set_table( table )
+        self.filename = lut1
+        for ii, cc in enumerate( self.curves ):
+            for c in cc:
+                set_curve( c, "line.color={0} symbol.color={0}".format( self._get_color_code(ii) ))
+
+        if self.legend:
+            delete_plot( self.legend )
+            self._draw_legend()
+
+        self._restore_window()
+        close_undo_block()
+
+
+    def _axis_label( self, axis, name ):
+        lo, hi, label = colorbar_range( self.scale[axis], self.min_z[axis], self.max_z[axis] )
+        if label is None:
+            return "{} {:.4g} to {:.4g}".format( name, lo, hi )
+        return "{} {:.4g} to {:.4g}".format( label.replace( "(z)", "({})".format(name) ), lo, hi )
+
+
+    def _draw_legend( self ):
+        """
+        The legend is the table drawn as a true color image in its own
+        plot.  The table is framed by a black and a white border so 
+        each color plane has the full 0 to 1 range (chips scales each
+        plane to its min and max).
+        """
+        x0, y0, size, xlabel, ylabel = self._legend_args
+        add_plot( x0, y0, x0+size, y0+size, "id={}".format( self.legend ))
+
+        img = np.ones( (self.ny+4, self.nx+4, 3) )
+        img[1:-1,1:-1] = 0
+        img[2:-2,2:-2] = self.table
+        self.image = self._new_id("lutimage")
+        add_image( img[:,:,0], img[:,:,1], img[:,:,2], "id={}".format( self.image ))
+        set_plot_xlabel( self._axis_label( 0, xlabel ))
+        set_plot_ylabel( self._axis_label( 1, ylabel ))
+
+
+    def add_legend( self, x0=0.72, y0=0.62, size=0.2, xlabel="z1", ylabel="z2" ):
+        """
+        Add the 2-D lookup table as a legend in a small plot at
+        x0, y0 (frame normalized coordinates) in the same frame.  
+        The axis labels give the range and scale of each z
+
+        >>> lut.add_legend( xlabel="energy", ylabel="time" )
+
+        Column 1 (at the left) is the lowest z1 and row 1 (at the
+        bottom) the lowest z2.
+        """
+        if self.legend:
+            raise RuntimeError("Cannot add multiple legends")
+        if not self.curves:
+            raise RuntimeError("The data must be plotted before adding a legend")
+
+        open_undo_block()
+        self._set_lut_window()
+
+        self.legend = self._new_id("lutlegend")
+        self._legend_args = ( x0, y0, size, xlabel, ylabel )
+        self._draw_legend()
+
+        self._restore_window()
+        close_undo_block()
+
+
+    def add_colorbar( self ):
+        """
+        A 2-D lookup table cannot be shown with a color bar; this 
+        adds the legend (see add_legend).
+        """
+        self.add_legend()
+
+
+
 def __test():
     """
     Commands to test above commands
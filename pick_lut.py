@@ -16,6 +16,8 @@
 #  with this program; if not, write to the Free Software Foundation, Inc.,
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
+from __future__ import absolute_import, print_function
+
 """
 Create an interactive object to select a color map
 
@@ -32,12 +34,63 @@ allows the user to click to select the desired color lookup table.
   >>> ximage = pick_ximage()
   >>> imagej = pick_imagej()
   
+All the color maps can be drawn into a single true color image,
+which is much faster to create
+
+  >>> ds9 = pick_ds9( montage=True )
+
 """
 
 
 __all__ = [ "LUT_Picker", "LUT_Picker_Chips", "pick_ds9", "pick_imagej", "pick_ximage", "pick_chips"]
 
+import numpy as np
 from pychips import *
+from ._cache import par_luts
+
+
+def _make_montage( strips, nx, ny, width=128, height=48, gap=4 ):
+    """
+    Draw the color maps into one true color image, nx by ny swatches
+    with the first color map at the top left.  strips holds the RGB
+    values of each color map, shape (number of maps, samples, 3).  
+    Each swatch is width x height pixels with a 1 pixel black border
+    and there are gap pixels of white between them (so each of the 
+    red, green, and blue planes has the full 0 to 1 range).  The 
+    strips are resampled to the width by nearest neighbour, column
+    floor(x*samples) at x = i/width, so the colors of stepped tables
+    stay distinct and equally wide.
+    
+    Returns the red, green, and blue planes.
+    """
+    cw = width+gap
+    ch = height+gap
+    img = np.ones( ( ny*ch+gap, nx*cw+gap, 3 ) )
+    cols = ( np.arange( width ) * strips.shape[1] ) // width
+    
+    for ii, strip in enumerate( strips[:,cols,:] ):
+        row, col = divmod( ii, nx )
+        y0 = (ny-1-row)*ch + gap   # image row 0 is at the bottom
+        x0 = col*cw + gap
+        img[y0-1:y0+height+1, x0-1:x0+width+1] = 0
+        img[y0:y0+height, x0:x0+width] = strip[np.newaxis,:,:]
+
+    return img[:,:,0], img[:,:,1], img[:,:,2]
+
+
+_pools = {}
+
+def _get_pool( name, workers ):
+    """
+    Shared thread pools: "background" runs whole tasks (loading a 
+    page, waiting for a pick), "files" reads the LUT files.  They are
+    separate so a background task never waits on its own pool.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if name not in _pools:
+        _pools[name] = ThreadPoolExecutor( max_workers=workers )
+    return _pools[name]
+
 
 class LUT_Picker():
     """
@@ -60,6 +113,17 @@ class LUT_Picker():
     >>> ll = LUT_Picker("/soft/ciao/data/c")
     >>> ll.pick_lut()
 
+    The color maps are shown page_size (100) at a time.  Only the 
+    current page is loaded and drawn; the next one is loaded in the 
+    background.  The files are read by a pool of threads while the 
+    window is being created.
+    
+    >>> ll = LUT_Picker( many_luts, page_size=64 )
+    >>> ll.num_pages
+    17
+    >>> ll.next_page()
+    >>> ll.pick_lut()
+
     This routine uses color map slot chips_usercmap1. The default color map
     in that slot cannot be restored.  It will be left with the last
     color map that was loaded.
@@ -68,8 +132,23 @@ class LUT_Picker():
     Please do not move or resize the Chips window while this is happening
     as it may cause the chipsServer to crash.
     
+    With montage=True all the color maps are drawn into a single true 
+    color image, built from the LUT files, so the window is created
+    with a single add_image call.  
+    
+    >>> ll = LUT_Picker("/soft/ciao/data/", montage=True)
+    
+    The color maps read from the files are saved in a per-user cache
+    directory (see _cache.py) so the next picker with the same files
+    does not have to read them again.
+    
     """
 
+    # Size of each swatch in the montage, and the gap between them
+    swatch_width = 128
+    swatch_height = 48
+    swatch_gap = 4
+
 
     @staticmethod
     def _get_current_object_name( name ):
@@ -84,16 +163,121 @@ class LUT_Picker():
         name = name.split("]")[0]
         return name
 
-    def __init__(self, cmaps):
+    def __init__(self, cmaps, montage=False, page_size=100):
         
         self.cmaps = cmaps
+        self.montage = montage
+        self.page_size = page_size
+        self.page = 0
+        self._pending = {}
         self._build_list_of_cmaps(cmaps)
-        self._create_window_and_grid()
-        self._add_images()
+        self._draw_page()
+
+
+    def _draw_page( self ):
+        """
+        Create the window with the color maps on the current page, 
+        then start loading the next page in the background.  The
+        color maps for this page are loaded in the background while
+        the window is created.
+        """
+        self.lut = self._page_luts( self.page )
+        self._drop_pending( [ self.lut, self._page_luts( self.page+1 ) ] )
+        self._start_loading( self.lut )
+        if self.montage:
+            self._create_window()
+            self._add_montage()
+        else:
+            self._create_window_and_grid()
+            self._add_images()
         if self.origplt:
             set_current_window(self.origwin)
             set_current_frame(self.origfrm)
             set_current_plot(self.origplt)
+        self._prefetch_page( self.page+1 )
+
+
+    @property
+    def num_pages( self ):
+        return max( 1, -(-len(self.all_lut) // self.page_size) )
+
+
+    def show_page( self, page ):
+        """
+        Show another page of color maps (starting at 0).  Only one
+        page is drawn at a time so any number of color maps can 
+        be browsed.
+        
+        >>> ll.show_page(2)
+        >>> ll.pick_lut()
+        
+        """
+        if page < 0 or page >= self.num_pages:
+            raise ValueError("page must be between 0 and {}".format(self.num_pages-1))
+        try:
+            delete_window( self.win_name )
+        except:
+            pass
+        self.page = page
+        self._draw_page()
+
+
+    def next_page( self ):
+        """
+        Show the next page of color maps; wraps around to the first
+        """
+        self.show_page( (self.page+1) % self.num_pages )
+
+
+    def prev_page( self ):
+        """
+        Show the previous page of color maps; wraps around to the last
+        """
+        self.show_page( (self.page-1) % self.num_pages )
+
+
+    def _page_luts( self, page ):
+        """
+        The color maps on a page (empty past the last page)
+        """
+        lo = page * self.page_size
+        return self.all_lut[lo:lo+self.page_size]
+
+
+    def _prefetch_page( self, page ):
+        """
+        Load the color maps for a page in the background so
+        they are ready when the page is shown.
+        """
+        if page < self.num_pages:
+            self._start_loading( self._page_luts( page ))
+
+
+    def _drop_pending( self, keep ):
+        """
+        Forget the background loads of pages other than those in 
+        keep (the current and next page), cancelling any that have 
+        not started, so paging around does not pile up color maps.
+        """
+        keep = set( tuple(k) for k in keep )
+        for luts in [ k for k in self._pending if k not in keep ]:
+            self._pending.pop( luts ).cancel()
+
+
+    def _start_loading( self, luts ):
+        """
+        Submit the loading of a list of color maps to the background
+        pool; the files themselves are read in parallel by the file
+        pool.  Returns a Future with the color maps.
+        """
+        from ._utils import get_rgb_values
+        from ._cache import load_tables
+
+        luts = tuple( luts )
+        if luts not in self._pending:
+            self._pending[luts] = _get_pool("background", 2).submit( load_tables, 
+                luts, get_rgb_values, _get_pool("files", 4) )
+        return self._pending[luts]
 
     def __del__( self ):
         try:
@@ -111,27 +295,24 @@ class LUT_Picker():
 
 
         if type(cmaps) == str:
-            self.lut = glob( cmaps+"*.lut" )
+            self.all_lut = glob( cmaps+"*.lut" )
         else:
-            self.lut = [ c for c in cmaps]
-
-        self.lut.sort()
+            self.all_lut = [ c for c in cmaps]
 
-        if len(self.lut) > 100:
-            print("Only the first 100 color maps will be used")
-            self.lut = self.lut[:100]
+        self.all_lut.sort()
 
-        self.nx = int(sqrt( len(self.lut)))
+        # Every page has the same layout
+        num = min( len(self.all_lut), self.page_size )
+        self.nx = int(sqrt( num ))
         self.ny = self.nx+1
-        if self.nx * self.ny < len(self.lut):
+        if self.nx * self.ny < num:
             self.ny = self.ny+1
 
 
-    def _create_window_and_grid(self):
+    def _save_current( self ):
         """
-        
+        Save the current window/frame/plot so they can be restored
         """
-
         try:
             self.origwin = self._get_current_object_name("Window")
             self.origfrm = self._get_current_object_name("Frame")
@@ -142,6 +323,12 @@ class LUT_Picker():
             self.origplt = None
 
 
+    def _create_window_and_grid(self):
+        """
+        
+        """
+        self._save_current()
+
         add_window(512,512,"pixels","stem=CMAP")
         self.win_name = self._get_current_object_name("Window")
         set_window(self.win_name, "display=0")
@@ -165,6 +352,77 @@ class LUT_Picker():
 
 
 
+    def _load_tables( self, luts=None ):
+        """
+        The RGB values of the color maps (default: those on the
+        current page), from the cache when the files have not changed
+        or from the background prefetch.
+        """
+        from ._utils import get_rgb_values
+        from ._cache import load_tables
+
+        luts = tuple( self.lut if luts is None else luts )
+        future = self._pending.pop( luts, None )
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                pass   # try again below so the error is raised here
+        return load_tables( luts, get_rgb_values )
+
+
+    def _create_window( self ):
+        """
+        A single plot for the montage
+        """
+        self._save_current()
+
+        add_window(512,512,"pixels","stem=CMAP display=0")
+        self.win_name = self._get_current_object_name("Window")
+
+
+    def _add_montage( self ):
+        """
+        Load all the color maps and add them as one true color image.
+        The layout is saved so picks can be mapped to a swatch.
+        """
+        from ._cache import resample
+
+        strips = np.array( [ resample( t, 256 ) for t in self._load_tables() ] ).reshape(-1,256,3)
+        rr, gg, bb = _make_montage( strips, self.nx, self.ny, 
+            self.swatch_width, self.swatch_height, self.swatch_gap )
+
+        add_image( rr, gg, bb, "stem=montage#" )
+        hide_axis("all")
+        hide_minor_ticks()
+        hide_major_ticks()
+        set_plot("style=open")
+        set_window(self.win_name, "display=1")
+
+
+    def _match_montage( self, xx, yy ):
+        """
+        Find the swatch at the image (data) coordinates
+        """
+        cw = self.swatch_width + self.swatch_gap
+        ch = self.swatch_height + self.swatch_gap
+        
+        # Pixels are centered on integers starting at 1
+        px = xx - 0.5 - self.swatch_gap
+        py = yy - 0.5 - self.swatch_gap
+        if px < 0 or py < 0:
+            return None
+        col = int( px // cw )
+        row = self.ny - 1 - int( py // ch )
+        if px - col*cw >= self.swatch_width or py - (self.ny-1-row)*ch >= self.swatch_height:
+            return None   # in the gap
+
+        ii = row*self.nx + col
+        if col >= self.nx or row < 0 or ii >= len(self.lut):
+            return None
+        return self.lut[ii]
+
+
     def _add_images( self ):
         """
         
@@ -182,8 +440,9 @@ class LUT_Picker():
         set_plot("style=open")
         set_window(self.win_name, "display=1")
 
-        self.locations = {}
+        self.locations = []
 
+        tables = self._load_tables()
         cbar = list(range(256))*256
         for cmap in enumerate( self.lut ):
 
@@ -195,39 +454,81 @@ class LUT_Picker():
             set_current_frame( frm_imgs )
             plt = "plot{}".format(cmap[0]+1)
             set_current_plot(plt)
-            load_colormap( cmap[1] )
+            rgb = tables[cmap[0]]
+            load_colormap( rgb[:,0], rgb[:,1], rgb[:,2], chips_usercmap1 )
 
             add_image( cbar, 256, 256, "colormap=usercmap1 stem={}#".format(iname) )
             hide_axis("all")
             hide_minor_ticks()
             hide_major_ticks()
 
-            plt_obj = get_plot()
-
-            self.locations[iname] = { 'xmin' : plt_obj.leftmargin, 
-                                      'ymin' : plt_obj.bottommargin,
-                                      'xmax' : 1.0 - plt_obj.rightmargin,
-                                      'ymax' : 1.0 - plt_obj.topmargin,
-                                      'fullpath' : cmap[1] } 
+            self._record_location( get_plot(), cmap[1] )
         hide_frame( frm_load)
         set_current_frame( frm_imgs)
+        self._set_layout()
         
         
                         
+    def _record_location( self, plt_obj, fullpath ):
+        """
+        Save the frame_norm box of the plot for the next color map.
+        Locations are kept in plot order.
+        """
+        self.locations.append( { 'xmin' : plt_obj.leftmargin, 
+                                 'ymin' : plt_obj.bottommargin,
+                                 'xmax' : 1.0 - plt_obj.rightmargin,
+                                 'ymax' : 1.0 - plt_obj.topmargin,
+                                 'fullpath' : fullpath } )
+
+
+    def _set_layout( self ):
+        """
+        The plots were made with split(ny,nx) so they are on a regular
+        grid, filled across then down.  Save where the first plot is
+        and the spacing between plots so a pick can be turned into a
+        plot number directly.
+        """
+        self._boxes = np.array( [ [ll['xmin'], ll['ymin'], ll['xmax'], ll['ymax']] for ll in self.locations ] ).reshape(-1,4)
+        if 0 == len(self._boxes):
+            self._layout = None
+            return
+
+        first = self._boxes[0]
+        dx = self._boxes[1,0]-first[0] if self.nx > 1 and len(self._boxes) > 1 else first[2]-first[0]
+        dy = first[3]-self._boxes[self.nx,3] if len(self._boxes) > self.nx else first[3]-first[1]
+        self._layout = ( first[0], first[3], dx, dy )
+
+
     def _match_location( self, winx, winy ):
         """
-        
+        Find the color map at the frame_norm location.  The cell is
+        computed from the layout and then checked against that plot's
+        box (the gaps between plots do not match anything).
         """
-        for l in self.locations:
-            ll = self.locations[l]
-            if ( ll['xmin'] <= winx <= ll['xmax'] ) & ( ll['ymin'] <= winy <= ll['ymax'] ):
-                return ll["fullpath"]
+        if self._layout is None:
+            return None
+        x0, ytop, dx, dy = self._layout
+        col = int( (winx - x0) // dx ) if dx > 0 else 0
+        row = int( (ytop - winy) // dy ) if dy > 0 else 0
+        ii = row*self.nx + col
         
-        return None
+        boxes = self._boxes
+        if 0 <= col < self.nx and 0 <= ii < len(boxes):
+            bb = boxes[ii]
+            if bb[0] <= winx <= bb[2] and bb[1] <= winy <= bb[3]:
+                return self.locations[ii]['fullpath']
+            
+        # Not on the expected grid, check all the boxes at once
+        hit, = np.where( (boxes[:,0] <= winx) & (winx <= boxes[:,2]) & 
+                         (boxes[:,1] <= winy) & (winy <= boxes[:,3]) )
+        return self.locations[hit[0]]['fullpath'] if hit.size else None
 
 
-    def pick_lut(self):
-        
+    def _begin_pick( self ):
+        """
+        Make the picker window current (recreating it if it was 
+        closed) and return the current window/frame/plot.
+        """
         try:
             oldwin = self._get_current_object_name("Window")
             oldfrm = self._get_current_object_name("Frame")
@@ -241,24 +542,46 @@ class LUT_Picker():
             set_current_window( self.win_name )
         except:
             if self.cmaps:
-                self.__init__(self.cmaps)
+                self._draw_page()
             else:
                 self.__init__()
+            set_current_window( self.win_name )
 
-        cid = ChipsId()
-        cid.coord_sys = FRAME_NORM
-        a = get_pick(cid)
+        return oldwin, oldfrm, oldplt
 
+
+    def _end_pick( self, old ):
+        oldwin, oldfrm, oldplt = old
         if oldplt:
             set_current_window( oldwin )
             set_current_frame(oldfrm)
             set_current_plot(oldplt)
-        
+
+
+    def _get_one_pick( self ):
+        """
+        Wait for a click and return the color map, or None.
+        """
+        cid = ChipsId()
+        if not self.montage:
+            cid.coord_sys = FRAME_NORM
+        a = get_pick(cid)
+
         winx = a[0][0]
         winy = a[1][0]
         
-        cmap = self._match_location( winx, winy )
+        if self.montage:
+            return self._match_montage( winx, winy )
+        return self._match_location( winx, winy )
+
 
+    def pick_lut(self):
+        
+        old = self._begin_pick()
+        try:
+            cmap = self._get_one_pick()
+        finally:
+            self._end_pick( old )
         
         if not cmap:
             raise RuntimeError("No colormap found at that location, try again")
@@ -266,6 +589,57 @@ class LUT_Picker():
         return cmap
 
 
+    def pick_lut_async( self, aio=False ):
+        """
+        Wait for the pick in a background thread and return a 
+        concurrent.futures.Future, so a script can keep working
+        while the user chooses.
+        
+        >>> fut = ll.pick_lut_async()
+        >>> ... more work, but no chips commands ...
+        >>> fut.result()
+        'cool'
+        
+        With aio=True an asyncio future is returned that can be
+        awaited (eg in a notebook)
+        
+        >>> cmap = await ll.pick_lut_async(aio=True)
+        
+        Only one pick can be pending at a time.  Since the pick
+        changes the current chips window, other chips commands should
+        not be run until it is done.
+        """
+        future = _get_pool("pick", 1).submit( self.pick_lut )
+        if aio:
+            import asyncio
+            return asyncio.wrap_future( future )
+        return future
+
+
+    def pick_many( self, num ):
+        """
+        Pick several color maps, one click each, and return the list.
+        Clicks that miss are ignored.
+        
+        >>> ll.pick_many(3)
+        ['/soft/ciao/data/cool.lut', '/soft/ciao/data/a.lut', '/soft/ciao/data/hsv.lut']
+        
+        """
+        retval = []
+        old = self._begin_pick()
+        try:
+            while len(retval) < num:
+                cmap = self._get_one_pick()
+                if cmap:
+                    retval.append( cmap )
+                else:
+                    print("No colormap found at that location, try again")
+        finally:
+            self._end_pick( old )
+        
+        return retval
+
+
 class LUT_Picker_Chips(LUT_Picker):
     """
     Create a LUT_Picker object for the internal chips color maps.
@@ -278,6 +652,9 @@ class LUT_Picker_Chips(LUT_Picker):
     def __init__(self):
         
         self.cmaps = None
+        self.montage = False
+        self.page = 0
+        self._pending = {}
         self._build_list()
         self._create_window_and_grid()
         self._add_images()
@@ -290,6 +667,8 @@ class LUT_Picker_Chips(LUT_Picker):
     def _build_list(self):
         from math import sqrt
         self.lut = ["red", "green", "blue", "grayscale", "rainbow", "hsv", "heat", "cool", "usercmap1", "usercmap2", "usercmap3" ]
+        self.all_lut = self.lut
+        self.page_size = len(self.lut)
         self.nx = int(sqrt( len(self.lut)))
         self.ny = self.nx+1
 
@@ -298,7 +677,7 @@ class LUT_Picker_Chips(LUT_Picker):
         Replace above with 
         """
 
-        self.locations = {}
+        self.locations = []
         set_window(self.win_name, "display=0")
 
         cbar = list(range(256))*256
@@ -312,20 +691,15 @@ class LUT_Picker_Chips(LUT_Picker):
             hide_minor_ticks()
             hide_major_ticks()
 
-            plt_obj = get_plot()
-
-            self.locations[iname] = { 'xmin' : plt_obj.leftmargin, 
-                                      'ymin' : plt_obj.bottommargin,
-                                      'xmax' : 1.0 - plt_obj.rightmargin,
-                                      'ymax' : 1.0 - plt_obj.topmargin,
-                                      'fullpath' : cmap[1] } 
+            self._record_location( get_plot(), cmap[1] )
 
+        self._set_layout()
         set_window(self.win_name, "display=1")
 
 
 
 
-def pick_ds9():
+def pick_ds9( montage=False ):
     """
     Create a LUT_Picker objects based on the ds9 color maps found in the
     $ASCDS_INSTALL/data directory.
@@ -333,14 +707,15 @@ def pick_ds9():
     >>> ds9 = pick_ds9()
     >>> ds9.pick_lut()
     
+    With montage=True all the color maps are drawn as one image.
+    
     """    
-    from paramio import plist, pget    
-    luts = [ pget("lut",x) for x in plist( "lut") if x != 'mode' ]
-    ds9 = LUT_Picker( luts ) 
+    luts = par_luts( "lut" )
+    ds9 = LUT_Picker( luts, montage=montage ) 
     return ds9
     
 
-def pick_ximage():
+def pick_ximage( montage=False ):
     """
     Create a LUT_Picker object based on the XImage color maps found in the
     $ASCDS_INSTALL/contrib/data directory.  The files are listed in the
@@ -349,14 +724,15 @@ def pick_ximage():
     >>> xi = pick_ximage()
     >>> xi.pick_lut()
     
+    With montage=True all the color maps are drawn as one image.
+    
     """
-    from paramio import plist, pget    
-    luts = [ pget("ximage_lut",x) for x in plist( "ximage_lut") if x != 'mode' ]
-    ximage = LUT_Picker( luts ) 
+    luts = par_luts( "ximage_lut" )
+    ximage = LUT_Picker( luts, montage=montage ) 
     return ximage
     
 
-def pick_imagej():
+def pick_imagej( montage=False ):
     """
     Create a LUT_Picker object based on the ImageJ color maps found in the
     $ASCDS_INSTALL/contrib/data directory.  The files are listed in the
@@ -365,11 +741,12 @@ def pick_imagej():
     >>> ij = pick_imagej()
     >>> ij.pick_lut()
     
+    With montage=True all the color maps are drawn as one image.
+    
     """
 
-    from paramio import plist, pget    
-    luts = [ pget("imagej_lut",x) for x in plist( "imagej_lut") if x != 'mode' ]
-    imagej = LUT_Picker( luts ) 
+    luts = par_luts( "imagej_lut" )
+    imagej = LUT_Picker( luts, montage=montage ) 
     return imagej
 
     